@@ -14,3 +14,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'roomfinder.settings')
 
 application = get_asgi_application()
+
+from rooms.apps import preload_templates  # noqa: E402
+
+preload_templates()
@@ -29,11 +29,18 @@ else:
     CLOUDINARY_API_SECRET = _strip(os.environ.get('CLOUDINARY_API_SECRET'))
 USE_CLOUDINARY = all([CLOUDINARY_CLOUD_NAME, CLOUDINARY_API_KEY, CLOUDINARY_API_SECRET])
 
-if os.environ.get('RENDER') and not USE_CLOUDINARY:
+# Where uploaded media goes (see MEDIA STORAGE below). Cloudinary is the
+# default on Render, where the local disk doesn't survive a deploy.
+MEDIA_STORAGE = os.environ.get(
+    'MEDIA_STORAGE', 'cloudinary' if USE_CLOUDINARY or os.environ.get('RENDER') else 'local'
+)
+if MEDIA_STORAGE == 'cloudinary' and not USE_CLOUDINARY:
     raise ImproperlyConfigured(
+        'MEDIA_STORAGE is cloudinary but its credentials are missing. '
         'On Render, set Environment Variables in Dashboard: '
         'CLOUDINARY_CLOUD_NAME, CLOUDINARY_API_KEY, CLOUDINARY_API_SECRET. '
-        'Get them from https://cloudinary.com/console'
+        'Get them from https://cloudinary.com/console. '
+        'To run without Cloudinary, set MEDIA_STORAGE to local or fake-cloudinary.'
     )
 
 if USE_CLOUDINARY:
@@ -74,8 +81,12 @@ INSTALLED_APPS = [
 # MIDDLEWARE
 # ======================
 MIDDLEWARE = [
+    # First, so its total covers every other middleware (rooms/instrumentation.py)
+    'rooms.instrumentation.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    # Answers If-None-Match on cached anonymous pages with a 304
+    'django.middleware.http.ConditionalGetMiddleware',
 
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -87,17 +98,26 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'roomfinder.urls'
 
+# Templates are parsed once per process by the cached loader and preloaded
+# by wsgi.py/asgi.py (rooms.apps.preload_templates). runserver's autoreloader
+# still clears it when a template changes.
+_TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            'loaders': [
+                ('django.template.loaders.cached.Loader', _TEMPLATE_LOADERS),
+            ],
         },
     },
 ]
@@ -107,14 +127,115 @@ WSGI_APPLICATION = 'roomfinder.wsgi.application'
 # ======================
 # DATABASE
 # ======================
+# Seconds a worker keeps its database connection open. Set DB_CONN_MAX_AGE=0
+# when serving ASGI: each request's sync code runs in a new thread there,
+# and every thread would hold a connection of its own (RENDER_DEPLOY.md #4)
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 600))
 DATABASES = {
     'default': dj_database_url.config(
         default='sqlite:///db.sqlite3',
-        conn_max_age=600,
+        conn_max_age=DB_CONN_MAX_AGE,
         ssl_require=bool(os.environ.get('RENDER'))
     )
 }
 
+# ======================
+# CACHE
+# ======================
+# CACHE_BACKEND: 'locmem' (default locally and in tests), 'db' (default on
+# Render, table created by `manage.py createcachetable` in build.sh) or 'file'.
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'db' if os.environ.get('RENDER') else 'locmem')
+_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'roomfinder',
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'roomfinder_cache',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CACHE_LOCATION', str(BASE_DIR / '.cache')),
+    },
+}
+CACHES = {
+    'default': {
+        **_CACHE_BACKENDS[CACHE_BACKEND],
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+}
+
+# Seconds a rendered listing card stays cached; cards are keyed on
+# updated_at, so edits show up immediately regardless.
+ROOM_CARD_CACHE_TIMEOUT = int(os.environ.get('ROOM_CARD_CACHE_TIMEOUT', 60 * 60 * 24))
+# Whole room_list/room_detail responses for anonymous visitors (rooms/cache.py)
+ANONYMOUS_PAGE_CACHE_TIMEOUT = int(os.environ.get('ANONYMOUS_PAGE_CACHE_TIMEOUT', 60 * 5))
+# How long browsers/CDNs may reuse them without asking again
+ANONYMOUS_PAGE_MAX_AGE = int(os.environ.get('ANONYMOUS_PAGE_MAX_AGE', 60))
+
+# ======================
+# REQUEST TIMING / PROFILING
+# ======================
+# Server-Timing header with DB/template/storage/total durations
+SERVER_TIMING_HEADER = os.environ.get('SERVER_TIMING_HEADER', 'True') == 'True'
+# Profile a sample of requests and keep .prof dumps of those slower than this
+PROFILE_SLOW_REQUESTS_MS = float(os.environ['PROFILE_SLOW_REQUESTS_MS']) if os.environ.get('PROFILE_SLOW_REQUESTS_MS') else None
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0.1))
+PROFILE_DIR = Path(os.environ.get('PROFILE_DIR', BASE_DIR / '.profiles'))
+
+# One JSON line per request on 'rooms.timing' (the tests silence it)
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'rooms.timing': {
+            'handlers': ['console'],
+            'level': os.environ.get('REQUEST_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+# ======================
+# SIMILAR ROOMS
+# ======================
+# room_detail's "Similar rooms" panel (rooms/similar.py): how many to show,
+# how many price neighbours to score, and how often each process pulls
+# other processes' changes into its index / rebuilds it (seconds)
+SIMILAR_ROOMS_COUNT = int(os.environ.get('SIMILAR_ROOMS_COUNT', 4))
+SIMILAR_WINDOW = int(os.environ.get('SIMILAR_WINDOW', 50))
+SIMILAR_INDEX_REFRESH = int(os.environ.get('SIMILAR_INDEX_REFRESH', 60))
+SIMILAR_INDEX_REBUILD = int(os.environ.get('SIMILAR_INDEX_REBUILD', 60 * 60))
+
+# ======================
+# HEALTH / METRICS
+# ======================
+# /healthz and /metrics reuse probe results (DB, storage, cache) for this
+# many seconds; stale results are refreshed in a background thread
+HEALTH_PROBE_TTL = int(os.environ.get('HEALTH_PROBE_TTL', 15))
+HEALTH_PROBE_MODE = os.environ.get('HEALTH_PROBE_MODE', 'thread')
+# If set, /metrics requires "Authorization: Bearer <token>"
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# ======================
+# VIEW COUNTS
+# ======================
+# room_detail views are counted in the cache (locmem/redis/memcached) or,
+# with the db/file cache, per worker, and written to Room.view_count in
+# batches at most this often (rooms/view_counts.py)
+VIEW_COUNT_FLUSH_INTERVAL = int(os.environ.get('VIEW_COUNT_FLUSH_INTERVAL', 60))
+VIEW_COUNT_FLUSH_MODE = os.environ.get('VIEW_COUNT_FLUSH_MODE', 'thread')
+
+# ======================
+# LISTING LIFECYCLE
+# ======================
+# Days a new or renewed listing stays up before sweep_expired archives it
+ROOM_LISTING_TTL_DAYS = int(os.environ.get('ROOM_LISTING_TTL_DAYS', 90))
+
 # ======================
 # PASSWORD VALIDATION
 # ======================
@@ -143,9 +264,7 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 # Use Whitenoise's recommended storage for Render
 # We use CompressedStaticFilesStorage to avoid manifest issues while still getting compression
 STORAGES = {
-    'default': {
-        'BACKEND': 'cloudinary_storage.storage.MediaCloudinaryStorage',
-    },
+    # 'default' (uploaded media) is picked under MEDIA STORAGE below
     'staticfiles': {
         'BACKEND': 'whitenoise.storage.CompressedStaticFilesStorage',
     },
@@ -154,7 +273,29 @@ STORAGES = {
 # This prevents build failure if some files (like admin icons) are missing
 WHITENOISE_MANIFEST_STRICT = False
 
-# Media settings
+# ======================
+# MEDIA STORAGE
+# ======================
+# MEDIA_STORAGE (rooms/storage.py):
+# 'cloudinary'      - uploads go to Cloudinary (needs the credentials above)
+# 'local'           - MEDIA_ROOT, files spread over MEDIA_SHARD_DEPTH levels of
+#                     hashed folders (default without Cloudinary credentials)
+# 'fake-cloudinary' - in-process stand-in with Cloudinary's names and URLs and
+#                     FAKE_CLOUDINARY_LATENCY_MS per API call: offline tests
+#                     and benchmarks, nothing leaves the process
+_MEDIA_STORAGES = {
+    'cloudinary': {'BACKEND': 'cloudinary_storage.storage.MediaCloudinaryStorage'},
+    'local': {'BACKEND': 'rooms.storage.ShardedFileSystemStorage'},
+    'fake-cloudinary': {'BACKEND': 'rooms.storage.FakeCloudinaryStorage'},
+}
+if MEDIA_STORAGE not in _MEDIA_STORAGES:
+    raise ImproperlyConfigured(f"MEDIA_STORAGE must be one of {', '.join(_MEDIA_STORAGES)}, not {MEDIA_STORAGE!r}")
+STORAGES['default'] = _MEDIA_STORAGES[MEDIA_STORAGE]
+
+MEDIA_SHARD_DEPTH = int(os.environ.get('MEDIA_SHARD_DEPTH', 2))
+FAKE_CLOUDINARY_LATENCY_MS = float(os.environ.get('FAKE_CLOUDINARY_LATENCY_MS', 0))
+FAKE_CLOUDINARY_JITTER_MS = float(os.environ.get('FAKE_CLOUDINARY_JITTER_MS', 0))
+
 if USE_CLOUDINARY:
     CLOUDINARY_STORAGE = {
         'CLOUD_NAME': CLOUDINARY_CLOUD_NAME,
@@ -162,11 +303,36 @@ if USE_CLOUDINARY:
         'API_SECRET': CLOUDINARY_API_SECRET,
         'SECURE': True,
     }
-else:
+if MEDIA_STORAGE == 'local':
     MEDIA_URL = '/media/'
     MEDIA_ROOT = BASE_DIR / 'media'
 
 
+# ======================
+# LISTINGS
+# ======================
+# Rooms per page in room_list and dashboard (keyset pagination)
+ROOMS_PAGE_SIZE = int(os.environ.get('ROOMS_PAGE_SIZE', 12))
+
+# Widths (px) offered in listing card srcsets: Cloudinary transformations,
+# or Pillow thumbnails under MEDIA_ROOT/thumbs when media is stored locally
+ROOM_IMAGE_WIDTHS = (320, 640, 960, 1280)
+
+# Gallery uploads leave the request path (rooms/uploads.py):
+# 'thread' = bounded in-process pool, 'sync' = inline after commit,
+# 'queue' = staged for a separate `manage.py process_uploads --loop` worker
+GALLERY_UPLOAD_MODE = os.environ.get('GALLERY_UPLOAD_MODE', 'thread')
+GALLERY_UPLOAD_WORKERS = int(os.environ.get('GALLERY_UPLOAD_WORKERS', 4))
+# Seconds before a failed upload is retried in the pool, doubled per attempt
+GALLERY_UPLOAD_RETRY_DELAY = float(os.environ.get('GALLERY_UPLOAD_RETRY_DELAY', 5))
+
+# Every uploaded image is resized to fit this box, re-encoded and stripped
+# of EXIF before it reaches storage (rooms/ingest.py)
+IMAGE_MAX_DIMENSION = int(os.environ.get('IMAGE_MAX_DIMENSION', 2048))
+IMAGE_INGEST_FORMAT = os.environ.get('IMAGE_INGEST_FORMAT', 'WEBP')
+IMAGE_INGEST_QUALITY = int(os.environ.get('IMAGE_INGEST_QUALITY', 82))
+
+
 # ======================
 # LOGIN / LOGOUT
 # ======================
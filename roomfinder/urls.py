@@ -28,4 +28,8 @@ urlpatterns = [
     # Rooms app
     path('', include('rooms.urls')),
    
-]
\ No newline at end of file
+]
+
+# Local media (MEDIA_STORAGE=local); static() only serves files when DEBUG is on
+if settings.MEDIA_STORAGE == 'local':
+    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
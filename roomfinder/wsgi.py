@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'roomfinder.settings')
 
 application = get_wsgi_application()
+
+from rooms.apps import preload_templates  # noqa: E402
+
+preload_templates()
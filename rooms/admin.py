@@ -1,4 +1,42 @@
 from django.contrib import admin
-from .models import Room
-# Register your models here.
-admin.site.register(Room)
+from .models import Room, RoomFacetCount, RoomImage, SavedSearch
+
+
+# Gallery rows inline on the Room page; select the room so
+# RoomImage.__str__ doesn't query once per image
+class RoomImageInline(admin.TabularInline):
+    model = RoomImage
+    extra = 0
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('room')
+
+
+@admin.register(Room)
+class RoomAdmin(admin.ModelAdmin):
+    list_display = ('title', 'property_type', 'location', 'price', 'owner', 'view_count', 'created_at')
+    list_filter = ('property_type', 'location', 'room_type')
+    list_select_related = ('owner',)
+    search_fields = ('title', 'location')
+    inlines = [RoomImageInline]
+
+
+@admin.register(RoomImage)
+class RoomImageAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'room')
+    list_select_related = ('room',)
+    raw_id_fields = ('room',)
+
+
+@admin.register(RoomFacetCount)
+class RoomFacetCountAdmin(admin.ModelAdmin):
+    list_display = ('property_type', 'location', 'room_type', 'price_bucket', 'count')
+    list_filter = ('property_type', 'location', 'room_type')
+
+
+# Read-only: the terms index is written by rooms/saved_searches.py
+@admin.register(SavedSearch)
+class SavedSearchAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'user', 'created_at', 'last_seen_at')
+    list_select_related = ('user',)
+    readonly_fields = ('user', 'query', 'property_type', 'term_count', 'created_at', 'last_seen_at')
@@ -0,0 +1,97 @@
+"""
+Read-only JSON API for listings (mounted at /api/v1/).
+
+Rows are read with .values(), never full model instances, and encoded
+compactly. Every response carries a strong ETag. A room's comes from its
+updated_at (plus Last-Modified); the list's from the page generation in
+rooms/cache.py, which every Room change bumps, and the normalised query
+string, so working it out is one cache read and no query. A matching
+If-None-Match / If-Modified-Since gets a 304 before the page is fetched or
+serialized.
+"""
+import hashlib
+
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import condition, require_GET
+
+from .cache import get_page_generation
+from .forms import filter_listings
+from .media_urls import media_url
+from .models import Room, RoomImage
+from .pagination import page_querystring, paginate_keyset
+
+API_VERSION = 'v1'
+
+LIST_FIELDS = (
+    'id', 'title', 'property_type', 'room_type', 'location', 'price',
+    'latitude', 'longitude', 'available_from', 'image', 'created_at', 'updated_at',
+)
+DETAIL_FIELDS = LIST_FIELDS + ('description', 'owner_name', 'contact_number')
+
+
+def _json(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params={'separators': (',', ':')})
+
+
+def _serialize(row):
+    row['image'] = media_url(row['image'])
+    row.pop('search_rank', None)
+    return row
+
+
+def _etag(*parts):
+    return hashlib.sha1('|'.join(map(str, (API_VERSION,) + parts)).encode()).hexdigest()
+
+
+# 📋 LIST
+
+def _list_queryset(request):
+    rooms, ordering, _filter_form = filter_listings(Room.objects.active(), request.GET)
+    return rooms, ordering
+
+
+def _list_etag(request):
+    # Sorted and blanks dropped, so ?a=1&b= and ?b=&a=1 share an ETag
+    params = sorted((name, values) for name, values in request.GET.lists() if any(values))
+    return _etag('list', get_page_generation(), params)
+
+
+@require_GET
+@condition(etag_func=_list_etag)
+def room_list(request):
+    rooms, ordering = _list_queryset(request)
+    fields = LIST_FIELDS + tuple(key.lstrip('-') for key in ordering if key.lstrip('-') not in LIST_FIELDS)
+    rows, next_cursor = paginate_keyset(rooms.values(*fields), request.GET.get('cursor'), ordering=ordering)
+    return _json({
+        'results': [_serialize(row) for row in rows],
+        'next': f'{request.path}?{page_querystring(request, next_cursor)}' if next_cursor else None,
+    })
+
+
+# 🔍 DETAIL
+
+def _get_room_row(request, id):
+    if not hasattr(request, '_api_room_row'):
+        row = Room.objects.active().filter(id=id).values(*DETAIL_FIELDS).first()
+        if row is None:
+            raise Http404('No room with that id')
+        request._api_room_row = row
+    return request._api_room_row
+
+
+@require_GET
+@condition(
+    etag_func=lambda request, id: _etag('room', id, _get_room_row(request, id)['updated_at']),
+    last_modified_func=lambda request, id: _get_room_row(request, id)['updated_at'],
+)
+def room_detail(request, id):
+    # Gallery changes bump the room's updated_at, so the ETag covers them
+    room = _serialize(dict(_get_room_row(request, id)))
+    room['gallery'] = [
+        media_url(name) for name in
+        RoomImage.objects
+        .filter(room_id=id, status=RoomImage.STATUS_READY)
+        .order_by('id')
+        .values_list('image', flat=True)
+    ]
+    return _json(room)
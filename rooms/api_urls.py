@@ -0,0 +1,7 @@
+from django.urls import path
+from . import api
+
+urlpatterns = [
+    path('rooms/', api.room_list, name='api_room_list'),
+    path('rooms/<int:id>/', api.room_detail, name='api_room_detail'),
+]
@@ -1,5 +1,23 @@
+from pathlib import Path
+
 from django.apps import AppConfig
 
 
 class RoomsConfig(AppConfig):
     name = 'rooms'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+
+def preload_templates():
+    """
+    Parse this app's templates into the cached loader, so the first
+    request a fresh worker serves doesn't pay for it. Called from the
+    WSGI/ASGI entry points.
+    """
+    from django.template.loader import get_template
+
+    root = Path(__file__).resolve().parent / 'templates'
+    for path in sorted(root.rglob('*.html')):
+        get_template(path.relative_to(root).as_posix())
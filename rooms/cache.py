@@ -0,0 +1,233 @@
+"""
+Caching for listing pages.
+
+Fragments: room_list.html and dashboard.html draw each card with
+``{% room_card room variant %}``, which renders rooms/room_card.html (and
+resolves its image URLs) once per version of the room and variant, and
+otherwise returns the HTML from the cache. The keys are those of
+``{% cache timeout room_card room.id room.updated_at variant %}``.
+``{% prefetch_room_cards rooms variant %}`` before the loop reads a whole
+page's cards with one get_many and stores the ones it had to render with
+one set_many, instead of a cache round trip (a query, on the db cache)
+per card.
+The signals in rooms/signals.py drop the current fragments when a room is
+saved or deleted and bump updated_at when its gallery changes.
+
+Whole pages: cache_anonymous_page() stores the full response of a view for
+visitors without a session, keyed on the path and the whitelisted query
+parameters. Keys include a generation number that every Room change bumps,
+so one increment retires every cached page at once.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.template.loader import get_template
+from django.utils import timezone
+from django.utils.cache import patch_cache_control, patch_vary_headers, set_response_etag
+from django.utils.safestring import mark_safe
+
+from . import metrics
+
+# Variants of rooms/room_card.html, each cached as its own fragment
+CARD_VARIANTS = ('list', 'dashboard')
+
+
+def get_card_cache_timeout():
+    return getattr(settings, 'ROOM_CARD_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+def card_cache_key(room, variant):
+    return make_template_fragment_key('room_card', [room.pk, room.updated_at, variant])
+
+
+def card_cache_keys(room):
+    return [card_cache_key(room, variant) for variant in CARD_VARIANTS]
+
+
+def render_room_cards(rooms, variant):
+    """
+    The cards' HTML, in order. Plain functions rather than {% include %} +
+    {% cache %}: the component renders with a two-variable context instead
+    of a copy of the page's, and a cache hit touches no template machinery.
+    """
+    keys = [card_cache_key(room, variant) for room in rooms]
+    cached = cache.get_many(keys)
+    rendered = {}
+    for room, key in zip(rooms, keys):
+        metrics.record_cache('card', key in cached)
+        if key not in cached:
+            rendered[key] = get_template('rooms/room_card.html').render({'room': room, 'variant': variant})
+    if rendered:
+        cache.set_many(rendered, get_card_cache_timeout())
+    return [mark_safe(cached[key] if key in cached else rendered[key]) for key in keys]
+
+
+def prefetch_room_cards(rooms, variant):
+    """Render a page's cards in one batch; render_room_card() then just returns them."""
+    rooms = list(rooms)
+    for room, html in zip(rooms, render_room_cards(rooms, variant)):
+        room.__dict__.setdefault('_room_cards', {})[variant] = html
+
+
+def render_room_card(room, variant):
+    prefetched = getattr(room, '_room_cards', {})
+    if variant in prefetched:
+        return prefetched[variant]
+    return render_room_cards([room], variant)[0]
+
+
+def invalidate_room_cards(room):
+    cache.delete_many(card_cache_keys(room))
+
+
+def touch_room(room_id):
+    """Give a room a new updated_at (and so new card keys) without a full save."""
+    from .models import Room
+    Room.objects.filter(pk=room_id).update(updated_at=timezone.now())
+    bump_page_generation()
+
+
+# 📄 FULL PAGES FOR ANONYMOUS VISITORS
+
+PAGE_GENERATION_KEY = 'rooms:page-generation'
+
+
+def get_page_generation():
+    generation = cache.get(PAGE_GENERATION_KEY)
+    if generation is None:
+        # Start from the clock, not 0, so an evicted counter can't come
+        # back to a value whose pages are still cached
+        cache.add(PAGE_GENERATION_KEY, int(time.time() * 1000), None)
+        generation = cache.get(PAGE_GENERATION_KEY)
+    return generation
+
+
+async def aget_page_generation():
+    generation = await cache.aget(PAGE_GENERATION_KEY)
+    if generation is None:
+        await cache.aadd(PAGE_GENERATION_KEY, int(time.time() * 1000), None)
+        generation = await cache.aget(PAGE_GENERATION_KEY)
+    return generation
+
+
+def bump_page_generation():
+    try:
+        cache.incr(PAGE_GENERATION_KEY)
+    except ValueError:
+        cache.set(PAGE_GENERATION_KEY, int(time.time() * 1000), None)
+
+
+def get_anonymous_page_timeout():
+    return getattr(settings, 'ANONYMOUS_PAGE_CACHE_TIMEOUT', 300)
+
+
+def get_anonymous_page_max_age():
+    return getattr(settings, 'ANONYMOUS_PAGE_MAX_AGE', 60)
+
+
+def is_anonymous_request(request, user):
+    """No session and no pending messages: every such visitor sees the same page."""
+    return (
+        request.method in ('GET', 'HEAD') and
+        settings.SESSION_COOKIE_NAME not in request.COOKIES and
+        CookieStorage.cookie_name not in request.COOKIES and
+        not user.is_authenticated
+    )
+
+
+async def aget_user(request):
+    """
+    request.user from an async view. Unlike request.auser(), this loads the
+    lazy request.user itself, so templates rendered later reuse the lookup.
+    """
+    def load():
+        request.user.is_authenticated  # evaluates the lazy object
+        return request.user
+    return await sync_to_async(load)()
+
+
+def page_digest(request, query_params):
+    # Normalise: only whitelisted params, sorted, blanks dropped, so
+    # ?utm_source=x&q=Flat and ?q=flat share one entry
+    params = []
+    for name in sorted(query_params):
+        value = request.GET.get(name, '').strip()
+        if value:
+            params.append(f'{name}={value.lower() if name == "q" else value}')
+    raw = f'{request.path}?{"&".join(params)}'
+    return hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+
+
+def anonymous_page_key(generation, digest):
+    return f'rooms:page:{generation}:{digest}'
+
+
+def _mark_private(response, user):
+    if user.is_authenticated:
+        patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+def _make_public(response):
+    """Prepare a fresh anonymous response for the cache; False if it mustn't be cached."""
+    if response.status_code != 200 or response.cookies:
+        return False
+    set_response_etag(response)
+    patch_cache_control(response, public=True, max_age=get_anonymous_page_max_age())
+    patch_vary_headers(response, ('Cookie',))
+    return True
+
+
+def cache_anonymous_page(query_params=()):
+    """
+    Serve a view from a full-response cache for anonymous visitors.
+    Logged-in users always get a fresh render marked private. Works on
+    sync and async views; the async path only uses the async cache API.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                user = await aget_user(request)
+                if not is_anonymous_request(request, user):
+                    return _mark_private(await view(request, *args, **kwargs), user)
+
+                key = anonymous_page_key(await aget_page_generation(), page_digest(request, query_params))
+                response = await cache.aget(key)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                    if _make_public(response):
+                        await cache.aset(key, response, get_anonymous_page_timeout())
+                    response['X-Page-Cache'] = 'MISS'
+                else:
+                    response['X-Page-Cache'] = 'HIT'
+                metrics.record_cache('page', response['X-Page-Cache'] == 'HIT')
+                return response
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not is_anonymous_request(request, request.user):
+                return _mark_private(view(request, *args, **kwargs), request.user)
+
+            key = anonymous_page_key(get_page_generation(), page_digest(request, query_params))
+            response = cache.get(key)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if _make_public(response):
+                    cache.set(key, response, get_anonymous_page_timeout())
+                response['X-Page-Cache'] = 'MISS'
+            else:
+                response['X-Page-Cache'] = 'HIT'
+            metrics.record_cache('page', response['X-Page-Cache'] == 'HIT')
+            return response
+        return wrapper
+    return decorator
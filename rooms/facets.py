@@ -0,0 +1,173 @@
+"""
+Facet counts for the room_list filter bar.
+
+RoomFacetCount holds one row per (property_type, location, room_type,
+price bucket) with the number of rooms in it - a few hundred rows at
+most, however many rooms there are. Room saves and deletes adjust the
+affected rows (rooms/signals.py); ``manage.py rebuild_facets`` recomputes
+the table from scratch after bulk changes that skip signals.
+
+facet_summary() reads the whole table in one query (cached until the next
+Room change) and derives every count the filter bar shows from it. Counts
+follow the property/location/room type/price selections; text, radius and
+date filters are not reflected. Archived rooms are not counted; expired
+ones are until sweep_expired archives them.
+"""
+from bisect import bisect_right
+from collections import Counter, defaultdict
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, IntegerField, Value, When
+
+from . import metrics
+from .cache import get_page_generation
+from .models import Room, RoomFacetCount
+
+# Lower bounds (Rs.) of the price histogram buckets
+PRICE_BUCKETS = (0, 5000, 10000, 15000, 20000, 30000, 50000)
+
+FACET_FIELDS = ('property_type', 'location', 'room_type')
+FACET_CHOICES = {
+    'property_type': Room.PROPERTY_TYPE_CHOICES,
+    'location': Room.LOCATION_CHOICES,
+    'room_type': Room.ROOM_TYPE_CHOICES,
+}
+
+
+def price_bucket(price):
+    return bisect_right(PRICE_BUCKETS, price or 0) - 1
+
+
+def facet_key(room):
+    """The RoomFacetCount row a room is counted in (None if archived)."""
+    if not room.is_active:
+        return None
+    return {
+        'property_type': room.property_type,
+        'location': room.location,
+        'room_type': room.room_type,
+        'price_bucket': price_bucket(room.price),
+    }
+
+
+def adjust(key, delta):
+    """Add delta to the count of one facet row, creating it if needed."""
+    if delta < 0:
+        # Never below zero, even if the table is out of date
+        RoomFacetCount.objects.filter(count__gte=-delta, **key).update(count=F('count') + delta)
+        return
+    if RoomFacetCount.objects.filter(**key).update(count=F('count') + delta):
+        return
+    try:
+        with transaction.atomic():
+            RoomFacetCount.objects.create(count=delta, **key)
+    except IntegrityError:
+        # Another request created it first
+        RoomFacetCount.objects.filter(**key).update(count=F('count') + delta)
+
+
+def move(old_key, new_key):
+    """A room moved from old_key (None if new) to new_key (None if deleted)."""
+    if old_key == new_key:
+        return
+    with transaction.atomic():
+        if old_key:
+            adjust(old_key, -1)
+        if new_key:
+            adjust(new_key, 1)
+
+
+def count_rooms(rooms, sign=1):
+    """Add (or with sign=-1 remove) rooms that skipped signals, one update per facet row."""
+    groups = Counter(tuple(key.items()) for key in map(facet_key, rooms) if key)
+    with transaction.atomic():
+        for key, count in groups.items():
+            adjust(dict(key), sign * count)
+
+
+def price_bucket_expression():
+    return Case(
+        *(When(price__gte=bound, then=Value(index)) for index, bound in reversed(list(enumerate(PRICE_BUCKETS)))),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def rebuild_facets():
+    """Recompute every facet row with one GROUP BY. Returns the row count."""
+    groups = (
+        Room.objects
+        .filter(is_active=True)
+        .annotate(price_bucket=price_bucket_expression())
+        .values(*FACET_FIELDS, 'price_bucket')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    with transaction.atomic():
+        RoomFacetCount.objects.all().delete()
+        rows = RoomFacetCount.objects.bulk_create(RoomFacetCount(**group) for group in groups)
+    return len(rows)
+
+
+def get_facet_rows():
+    """Every non-empty facet row as a tuple, cached until the next Room change."""
+    key = f'rooms:facets:{get_page_generation()}'
+    rows = cache.get(key)
+    metrics.record_cache('facets', rows is not None)
+    if rows is None:
+        rows = list(
+            RoomFacetCount.objects
+            .filter(count__gt=0)
+            .values_list(*FACET_FIELDS, 'price_bucket', 'count')
+        )
+        cache.set(key, rows, None)
+    return rows
+
+
+def facet_summary(selected):
+    """
+    Counts for the filter bar. selected maps Room fields to the chosen
+    values (RoomFilterForm.get_lookups()). Each facet counts rooms that
+    match every *other* selection, so picking "Pokhara" still shows how
+    many rooms the other locations have.
+    """
+    price_range = (selected.get('price__gte'), selected.get('price__lte'))
+    counts = {field: defaultdict(int) for field in FACET_FIELDS}
+    histogram = [0] * len(PRICE_BUCKETS)
+
+    for *values, bucket, count in get_facet_rows():
+        row = dict(zip(FACET_FIELDS, values))
+        misses = [field for field in FACET_FIELDS if selected.get(field) not in (None, row[field])]
+        in_price = _bucket_overlaps(bucket, *price_range)
+        if not misses:
+            histogram[bucket] += count
+        if len(misses) > 1 or (misses and not in_price):
+            continue
+        for field in FACET_FIELDS:
+            if in_price and (not misses or misses == [field]):
+                counts[field][row[field]] += count
+
+    tallest = max(histogram) or 1
+    return {
+        # [(value, label, count)] in the order of the model's choices
+        **{
+            field: [(value, label, counts[field][value]) for value, label in choices]
+            for field, choices in FACET_CHOICES.items()
+        },
+        'price': [
+            {
+                'min': bound,
+                'max': PRICE_BUCKETS[index + 1] - 1 if index + 1 < len(PRICE_BUCKETS) else None,
+                'count': histogram[index],
+                'height': round(100 * histogram[index] / tallest),
+            }
+            for index, bound in enumerate(PRICE_BUCKETS)
+        ],
+    }
+
+
+def _bucket_overlaps(bucket, low, high):
+    start = PRICE_BUCKETS[bucket]
+    end = PRICE_BUCKETS[bucket + 1] - 1 if bucket + 1 < len(PRICE_BUCKETS) else None
+    return (low is None or end is None or end >= low) and (high is None or start <= high)
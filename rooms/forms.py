@@ -1,5 +1,10 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
+from .geo import DEFAULT_RADIUS_KM, MAX_RADIUS_KM, NEAR_ORDERING, filter_near, parse_point
+from .ingest import IngestError, ingest_image
 from .models import Room
+from .pagination import DEFAULT_ORDERING
+from .search import SEARCH_ORDERING, search_rooms, search_terms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 
@@ -7,10 +12,126 @@ from django.contrib.auth.models import User
 class RoomForm(forms.ModelForm):
     class Meta:
         model = Room
-        exclude = ['owner', 'created_at']
+        exclude = ['owner', 'created_at', 'is_active', 'expires_at']
         widgets = {
-            'available_from': forms.DateInput(attrs={'type': 'date'})
+            'available_from': forms.DateInput(attrs={'type': 'date'}),
+            'latitude': forms.NumberInput(attrs={'step': 'any', 'placeholder': '27.7172'}),
+            'longitude': forms.NumberInput(attrs={'step': 'any', 'placeholder': '85.3240'}),
         }
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if (cleaned_data.get('latitude') is None) != (cleaned_data.get('longitude') is None):
+            raise forms.ValidationError('Give both latitude and longitude, or neither.')
+        return cleaned_data
+
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        # Only fresh uploads; an unchanged cover is already in storage
+        if isinstance(image, UploadedFile):
+            try:
+                ingested = ingest_image(image)
+            except IngestError as e:
+                raise forms.ValidationError(str(e))
+            self.instance.image_hash = ingested.content_hash
+            return ingested.content
+        return image
+
+
+class CaseInsensitiveChoiceField(forms.ChoiceField):
+    """Accept 'apartment' for 'Apartment' so old links keep working."""
+
+    def to_python(self, value):
+        value = super().to_python(value)
+        for choice, _label in self.choices:
+            if choice and choice.lower() == value.lower():
+                return choice
+        return value
+
+
+class RoomFilterForm(forms.Form):
+    """Facet filters for room_list, all optional and all ANDed together."""
+
+    property = CaseInsensitiveChoiceField(
+        required=False, choices=[('', 'All Properties')] + Room.PROPERTY_TYPE_CHOICES
+    )
+    location = CaseInsensitiveChoiceField(
+        required=False, choices=[('', 'All Locations')] + Room.LOCATION_CHOICES
+    )
+    room_type = CaseInsensitiveChoiceField(
+        required=False, choices=[('', 'Any Room Type')] + Room.ROOM_TYPE_CHOICES
+    )
+    min_price = forms.IntegerField(required=False, min_value=0)
+    max_price = forms.IntegerField(required=False, min_value=0)
+    available_from_min = forms.DateField(required=False)
+    available_from_max = forms.DateField(required=False)
+    # Move-in date: available by then and not expired before it
+    available_on = forms.DateField(required=False)
+    available_before = forms.DateField(required=False)
+    # "lat,lng" plus a radius, see rooms/geo.py
+    near = forms.CharField(required=False)
+    km = forms.FloatField(required=False, min_value=0.1, max_value=MAX_RADIUS_KM)
+
+    # form field -> Room lookup
+    LOOKUPS = {
+        'property': 'property_type',
+        'location': 'location',
+        'room_type': 'room_type',
+        'min_price': 'price__gte',
+        'max_price': 'price__lte',
+        'available_from_min': 'available_from__gte',
+        'available_from_max': 'available_from__lte',
+        'available_before': 'available_from__lt',
+    }
+
+    def get_lookups(self):
+        """Lookups for every field that parsed; bad values are just ignored."""
+        self.is_valid()
+        return {
+            lookup: self.cleaned_data[field]
+            for field, lookup in self.LOOKUPS.items()
+            if self.cleaned_data.get(field) not in (None, '')
+        }
+
+    def get_near(self):
+        """(lat, lng, km) of a radius search, or None."""
+        self.is_valid()
+        point = parse_point(self.cleaned_data.get('near'))
+        if point is None:
+            return None
+        return point + (self.cleaned_data.get('km') or DEFAULT_RADIUS_KM,)
+
+    def filter(self, queryset):
+        # One .filter() call so every condition lands in the same WHERE clause
+        lookups = self.get_lookups()
+        if lookups:
+            queryset = queryset.filter(**lookups)
+        if self.cleaned_data.get('available_on'):
+            queryset = queryset.available_on(self.cleaned_data['available_on'])
+        near = self.get_near()
+        return filter_near(queryset, *near) if near else queryset
+
+
+def filter_listings(queryset, params):
+    """
+    Apply room_list's search box (q) and facet filters to queryset.
+    Returns (queryset, ordering for paginate_keyset, bound RoomFilterForm).
+    """
+    search_query = params.get('q')
+    filter_form = RoomFilterForm(params)
+    ordering = DEFAULT_ORDERING
+
+    # Punctuation-only queries (q=*, q=") have no terms: list as if q were empty
+    if search_terms(search_query) and search_query.lower() != "none":
+        queryset = search_rooms(queryset, search_query)
+        ordering = SEARCH_ORDERING
+    elif filter_form.get_near():
+        # Ranked search keeps its ordering; a plain radius search is nearest first
+        ordering = NEAR_ORDERING
+
+    return filter_form.filter(queryset), ordering, filter_form
+
+
 class RegisterForm(UserCreationForm):
     email = forms.EmailField()
 
@@ -0,0 +1,92 @@
+"""
+"Rooms near me" without PostGIS.
+
+A radius query runs in two steps, both in SQL:
+
+1. a bounding box around the point (plain range conditions on latitude
+   and longitude) narrows the candidates via room_lat_lng_idx,
+2. the exact great-circle (haversine) distance is computed for those
+   candidates only, filtered to the radius and exposed as distance_km.
+
+The math functions are built into Postgres; on SQLite Django registers
+them on every connection, so the same queryset runs on both.
+"""
+import math
+
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import ASin, Cos, Least, Power, Radians, Sin, Sqrt
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = math.pi * EARTH_RADIUS_KM / 180
+
+DEFAULT_RADIUS_KM = 3
+MAX_RADIUS_KM = 50
+
+# Nearest first; ties fall back to newest first like everywhere else
+NEAR_ORDERING = ('distance_km', '-created_at', '-id')
+
+
+def parse_point(value):
+    """'27.7172,85.3240' -> (27.7172, 85.324), or None if it isn't a valid point."""
+    try:
+        lat, lng = (float(part) for part in (value or '').split(','))
+    except ValueError:
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return lat, lng
+
+
+def bounding_box(lat, lng, km):
+    """Q for rooms inside the lat/lng box that encloses the circle."""
+    dlat = km / KM_PER_DEGREE_LAT
+    min_lat, max_lat = lat - dlat, lat + dlat
+    box = Q(latitude__gte=max(min_lat, -90), latitude__lte=min(max_lat, 90))
+
+    # A degree of longitude shrinks towards the poles; past one the box
+    # covers every longitude
+    cos_lat = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    if min_lat <= -90 or max_lat >= 90 or cos_lat <= 0:
+        return box & Q(longitude__isnull=False)
+    dlng = km / (KM_PER_DEGREE_LAT * cos_lat)
+    if dlng >= 180:
+        return box & Q(longitude__isnull=False)
+
+    min_lng, max_lng = lng - dlng, lng + dlng
+    if min_lng < -180:
+        # Box crosses the antimeridian: two longitude ranges
+        return box & (Q(longitude__gte=min_lng + 360) | Q(longitude__lte=max_lng))
+    if max_lng > 180:
+        return box & (Q(longitude__gte=min_lng) | Q(longitude__lte=max_lng - 360))
+    return box & Q(longitude__gte=min_lng, longitude__lte=max_lng)
+
+
+def distance_expression(lat, lng):
+    """Haversine distance in km from (lat, lng) to each room, as a DB expression."""
+    lat_r = Value(math.radians(lat), output_field=FloatField())
+    lng_r = Value(math.radians(lng), output_field=FloatField())
+    room_lat = Radians(F('latitude'))
+    a = (
+        Power(Sin((room_lat - lat_r) / 2), 2) +
+        Value(math.cos(math.radians(lat))) * Cos(room_lat) *
+        Power(Sin((Radians(F('longitude')) - lng_r) / 2), 2)
+    )
+    # Rounding can push a just over 1 for antipodal points
+    return 2 * EARTH_RADIUS_KM * ASin(Sqrt(Least(a, Value(1.0))))
+
+
+def filter_near(queryset, lat, lng, km=DEFAULT_RADIUS_KM):
+    """Rooms within km of (lat, lng), annotated with distance_km."""
+    return (
+        queryset
+        .filter(bounding_box(lat, lng, km))
+        .annotate(distance_km=distance_expression(lat, lng))
+        .filter(distance_km__lte=km)
+    )
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """The same distance in Python (benchmarks, tests)."""
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
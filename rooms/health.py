@@ -0,0 +1,135 @@
+"""
+Health probes behind /healthz and /metrics.
+
+Each probe (database, media storage, cache) does one small round trip and
+records whether it worked and how long it took. Results are kept for
+HEALTH_PROBE_TTL seconds: a request that finds them stale gets the last
+results straight away and starts a refresh in a background thread, so an
+uptime checker polling every few seconds costs almost nothing.
+
+HEALTH_PROBE_MODE:
+    'thread' - refresh in a background thread (default)
+    'sync'   - refresh inline when stale (tests, debugging)
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import connection, connections
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+PROBE_CACHE_KEY = 'rooms:healthz'
+PROBE_STORAGE_NAME = 'healthz/probe.txt'
+
+_results = {}          # probe name -> {'ok': bool, 'seconds': float, 'detail': str}
+_checked_at = None     # time.monotonic() of the last completed refresh
+_refreshing = threading.Lock()
+
+
+def get_probe_ttl():
+    return getattr(settings, 'HEALTH_PROBE_TTL', 15)
+
+
+def get_probe_mode():
+    return getattr(settings, 'HEALTH_PROBE_MODE', 'thread')
+
+
+def probe_database():
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+    return connection.vendor
+
+
+def probe_storage():
+    # exists() is one metadata request: an HTTP round trip on Cloudinary
+    default_storage.exists(PROBE_STORAGE_NAME)
+    return default_storage.__class__.__name__
+
+
+def probe_cache():
+    token = str(time.time())
+    cache.set(PROBE_CACHE_KEY, token, 60)
+    if cache.get(PROBE_CACHE_KEY) != token:
+        raise RuntimeError('value written to the cache did not come back')
+    return settings.CACHES['default']['BACKEND'].rsplit('.', 1)[-1]
+
+
+PROBES = {
+    'database': probe_database,
+    'storage': probe_storage,
+    'cache': probe_cache,
+}
+
+
+def run_probes():
+    results = {}
+    for name, probe in PROBES.items():
+        start = time.perf_counter()
+        try:
+            detail, ok = probe(), True
+        except Exception as e:
+            logger.warning('Health probe %s failed', name, exc_info=True)
+            detail, ok = f'{e.__class__.__name__}: {e}', False
+        results[name] = {'ok': ok, 'seconds': time.perf_counter() - start, 'detail': detail}
+    return results
+
+
+def refresh():
+    """Run the probes unless another thread already is."""
+    global _results, _checked_at
+    if not _refreshing.acquire(blocking=False):
+        return
+    try:
+        _results = run_probes()
+        _checked_at = time.monotonic()
+    finally:
+        _refreshing.release()
+
+
+def _refresh_in_thread():
+    try:
+        refresh()
+    finally:
+        # The probe thread gets its own DB connection; don't leak it
+        connections.close_all()
+
+
+def get_results():
+    """The latest probe results, starting a refresh if they are stale."""
+    stale = _checked_at is None or time.monotonic() - _checked_at > get_probe_ttl()
+    if stale:
+        # Nothing to show yet: the very first check waits for the probes
+        if _checked_at is None or get_probe_mode() == 'sync':
+            refresh()
+        else:
+            threading.Thread(target=_refresh_in_thread, name='health-probe', daemon=True).start()
+    return _results, _checked_at
+
+
+def reset():
+    """Forget the cached results (tests)."""
+    global _results, _checked_at
+    _results, _checked_at = {}, None
+
+
+def probe_gauges(results, checked_at):
+    """Probe results as (name, labels, value) samples for metrics.render()."""
+    gauges = []
+    for name, result in results.items():
+        gauges.append(('roomfinder_probe_up', {'probe': name}, 1 if result['ok'] else 0))
+        gauges.append(('roomfinder_probe_duration_seconds', {'probe': name}, round(result['seconds'], 6)))
+    if checked_at is not None:
+        gauges.append(('roomfinder_probe_age_seconds', {}, round(time.monotonic() - checked_at, 3)))
+    return gauges
+
+
+metrics.describe('roomfinder_probe_up', 'gauge', 'Whether the last health probe succeeded.')
+metrics.describe('roomfinder_probe_duration_seconds', 'gauge', 'How long the last health probe took.')
+metrics.describe('roomfinder_probe_age_seconds', 'gauge', 'Seconds since the probes last ran.')
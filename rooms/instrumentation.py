@@ -0,0 +1,233 @@
+"""
+Per-request performance numbers.
+
+RequestTimingMiddleware (first in MIDDLEWARE) measures, for every request:
+
+- DB queries and time, through an execute wrapper on every connection,
+- template rendering (top-level render() / render_to_string calls),
+- media storage calls (save/open/delete/exists/url/size of the
+  configured storage classes, Cloudinary included),
+- total time.
+
+They go out as a Server-Timing header (visible in the browser's network
+panel) and one JSON log line on the 'rooms.timing' logger; the total also
+feeds the latency histogram at /metrics.
+
+Opt-in profiling: with PROFILE_SLOW_REQUESTS_MS set, a PROFILE_SAMPLE_RATE
+share of requests run under cProfile, and those slower than the threshold
+are dumped to PROFILE_DIR as .prof files (open with snakeviz or pstats).
+"""
+import cProfile
+import json
+import logging
+import random
+import re
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import wraps
+from pathlib import Path
+
+from django.conf import settings
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils.module_loading import import_string
+
+from . import metrics
+
+logger = logging.getLogger('rooms.timing')
+
+STORAGE_METHODS = ('save', 'open', 'delete', 'exists', 'url', 'size')
+
+
+@dataclass
+class RequestTimings:
+    db_queries: int = 0
+    db_time: float = 0.0
+    template_time: float = 0.0
+    storage_calls: int = 0
+    storage_time: float = 0.0
+    # Metrics currently being timed, so nested calls count once
+    active: set = field(default_factory=set)
+
+
+_current = ContextVar('request_timings', default=None)
+
+
+def current_timings():
+    """The RequestTimings of the request being handled, or None."""
+    return _current.get()
+
+
+def _timed(func, metric):
+    """Wrap func so its duration is added to the current request's metric."""
+    if getattr(func, '_rooms_timed', False):
+        return func
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        timings = _current.get()
+        # Nested calls (render inside render, url() inside save()) count once
+        if timings is None or metric in timings.active:
+            return func(*args, **kwargs)
+        timings.active.add(metric)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            timings.active.discard(metric)
+            if metric == 'template':
+                timings.template_time += elapsed
+            else:
+                timings.storage_time += elapsed
+                timings.storage_calls += 1
+
+    wrapper._rooms_timed = True
+    return wrapper
+
+
+def instrument_templates():
+    from django.template.backends.django import Template
+    Template.render = _timed(Template.render, 'template')
+
+
+def instrument_storages():
+    for alias, options in getattr(settings, 'STORAGES', {}).items():
+        try:
+            storage_cls = import_string(options['BACKEND'])
+        except Exception:
+            # e.g. Cloudinary without credentials: nothing to time anyway
+            logger.debug('Storage %s not instrumented', alias, exc_info=True)
+            continue
+        for name in STORAGE_METHODS:
+            method = getattr(storage_cls, name, None)
+            if method is not None:
+                setattr(storage_cls, name, _timed(method, 'storage'))
+
+
+def instrument_db():
+    """
+    Time queries on every connection, now and as they are created. The
+    wrapper stays installed and reads the context variable, so it also
+    counts queries that async views run through sync_to_async threads.
+    """
+    def install(connection, **kwargs):
+        if _count_query not in connection.execute_wrappers:
+            connection.execute_wrappers.append(_count_query)
+
+    connection_created.connect(install, dispatch_uid='rooms.instrumentation')
+    for connection in connections.all():
+        install(connection)
+
+
+def _count_query(execute, sql, params, many, context):
+    timings = _current.get()
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if timings is not None:
+            timings.db_queries += 1
+            timings.db_time += time.perf_counter() - start
+
+
+def server_timing_header(timings, total):
+    return ', '.join([
+        f'db;dur={timings.db_time * 1000:.1f};desc="{timings.db_queries} queries"',
+        f'tpl;dur={timings.template_time * 1000:.1f};desc="templates"',
+        f'storage;dur={timings.storage_time * 1000:.1f};desc="{timings.storage_calls} calls"',
+        f'total;dur={total * 1000:.1f}',
+    ])
+
+
+class RequestTimingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        instrument_db()
+        instrument_templates()
+        instrument_storages()
+        self.send_header = getattr(settings, 'SERVER_TIMING_HEADER', True)
+        self.profile_threshold = getattr(settings, 'PROFILE_SLOW_REQUESTS_MS', None)
+        self.profile_rate = getattr(settings, 'PROFILE_SAMPLE_RATE', 1.0)
+        self.profile_dir = Path(getattr(settings, 'PROFILE_DIR', settings.BASE_DIR / '.profiles'))
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings, token, profiler, start = self._begin()
+        try:
+            response = self.get_response(request)
+        finally:
+            total = self._end(token, profiler, start)
+        return self._report(request, response, timings, profiler, total)
+
+    async def __acall__(self, request):
+        # Under ASGI cProfile only sees the event loop thread
+        timings, token, profiler, start = self._begin()
+        try:
+            response = await self.get_response(request)
+        finally:
+            total = self._end(token, profiler, start)
+        return self._report(request, response, timings, profiler, total)
+
+    def _begin(self):
+        timings = RequestTimings()
+        return timings, _current.set(timings), self._start_profiler(), time.perf_counter()
+
+    def _end(self, token, profiler, start):
+        total = time.perf_counter() - start
+        if profiler:
+            profiler.disable()
+        _current.reset(token)
+        return total
+
+    def _report(self, request, response, timings, profiler, total):
+        if self.send_header:
+            response['Server-Timing'] = server_timing_header(timings, total)
+        match = request.resolver_match
+        metrics.observe(
+            'roomfinder_http_request_duration_seconds', total,
+            # Route names, not paths, keep the number of series bounded
+            view=match.view_name if match else 'unmatched',
+            method=request.method,
+            status=f'{response.status_code // 100}xx',
+        )
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'db_queries': timings.db_queries,
+            'db_ms': round(timings.db_time * 1000, 2),
+            'template_ms': round(timings.template_time * 1000, 2),
+            'storage_calls': timings.storage_calls,
+            'storage_ms': round(timings.storage_time * 1000, 2),
+        }, separators=(',', ':')))
+        if profiler and total * 1000 >= self.profile_threshold:
+            self._dump_profile(profiler, request, total)
+        return response
+
+    def _start_profiler(self):
+        if self.profile_threshold is None or random.random() >= self.profile_rate:
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler (or a concurrent request on 3.12+) is active
+            return None
+        return profiler
+
+    def _dump_profile(self, profiler, request, total):
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        slug = re.sub(r'[^\w]+', '_', request.path).strip('_') or 'root'
+        path = self.profile_dir / f'{time.strftime("%Y%m%d-%H%M%S")}-{total * 1000:.0f}ms-{request.method}-{slug}.prof'
+        profiler.dump_stats(path)
+        logger.warning('Slow request %s %s (%.0f ms), profile saved to %s', request.method, request.path, total * 1000, path)
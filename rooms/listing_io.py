@@ -0,0 +1,181 @@
+"""
+Bulk import/export of listings (manage.py import_rooms / export_rooms).
+
+Files are read and written row by row, so memory stays flat however many
+listings an agency sends. Each import batch:
+
+1. fetches the batch's cover images concurrently (http(s) URLs, or paths
+   under --image-root, the local stand-in used in tests and for agencies
+   that ship a folder of photos),
+2. validates every row through RoomForm, exactly like add_room (cover
+   images are ingested there too),
+3. uploads the valid covers to storage concurrently,
+4. inserts the rooms with one bulk_create, then indexes them for search,
+   adds them to the facet counts and matches them against the saved
+   searches (bulk_create sends no signals).
+"""
+import csv
+import json
+import os
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from urllib.parse import urlparse
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from . import facets, saved_searches, search
+from .cache import bump_page_generation
+from .forms import RoomForm
+from .media_urls import media_url
+from .models import Room
+
+# Columns of an export, and what an import reads (image is a URL or path)
+FIELDS = (
+    'title', 'description', 'property_type', 'room_type', 'location', 'price',
+    'latitude', 'longitude', 'owner_name', 'contact_number', 'available_from', 'image',
+)
+
+MAX_IMAGE_BYTES = 20 * 1024 * 1024
+FETCH_TIMEOUT = 15
+
+
+class ImageFetchError(Exception):
+    pass
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    return 'jsonl' if str(path).endswith(('.jsonl', '.ndjson')) else 'csv'
+
+
+def read_rows(stream, fmt):
+    """
+    Yield dicts from an open CSV or JSONL text stream, one at a time. A JSONL
+    line that isn't a JSON object yields a ValueError in its place, so one
+    bad line is rejected like an invalid row instead of ending the import.
+    """
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield ValueError(f'invalid JSON: {e}')
+            continue
+        yield row if isinstance(row, dict) else ValueError('not a JSON object')
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def fetch_image(ref, image_root=None):
+    """Bytes of the image at ref: an http(s) URL, a file:// URL or a path under image_root."""
+    parsed = urlparse(ref)
+    if parsed.scheme in ('http', 'https'):
+        request = urllib.request.Request(ref, headers={'User-Agent': 'roomfinder-import'})
+        with urllib.request.urlopen(request, timeout=FETCH_TIMEOUT) as response:
+            content = response.read(MAX_IMAGE_BYTES + 1)
+    else:
+        path = parsed.path if parsed.scheme == 'file' else ref
+        if image_root and not os.path.isabs(path):
+            path = os.path.join(image_root, path)
+        with open(path, 'rb') as f:
+            content = f.read(MAX_IMAGE_BYTES + 1)
+    if len(content) > MAX_IMAGE_BYTES:
+        raise ImageFetchError(f'{ref} is larger than {MAX_IMAGE_BYTES // (1024 * 1024)} MB')
+    return content
+
+
+class RoomImporter:
+    """Validates and inserts batches of rows for one owner; keeps the tallies."""
+
+    def __init__(self, owner, image_root=None, workers=8, dry_run=False):
+        self.owner = owner
+        self.image_root = image_root
+        self.dry_run = dry_run
+        self.created = 0
+        self.errors = []  # (line number, message)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='room-import')
+
+    def close(self):
+        self._executor.shutdown()
+
+    def import_batch(self, numbered_rows):
+        """numbered_rows: [(line number, row dict or read_rows' error)]. Returns the rooms created."""
+        readable = []
+        for line, row in numbered_rows:
+            if isinstance(row, ValueError):
+                self.errors.append((line, str(row)))
+            else:
+                readable.append((line, row))
+        images = list(self._executor.map(self._fetch, [row for _, row in readable]))
+
+        rooms = []
+        for (line, row), image in zip(readable, images):
+            if isinstance(image, Exception):
+                self.errors.append((line, f'image: {image}'))
+                continue
+            data = {field: '' if row.get(field) is None else row[field] for field in FIELDS if field != 'image'}
+            form = RoomForm(data, {'image': image} if image else {})
+            if not form.is_valid():
+                message = '; '.join(f'{field}: {", ".join(errs)}' for field, errs in form.errors.items())
+                self.errors.append((line, message))
+                continue
+            room = form.save(commit=False)
+            room.owner = self.owner
+            rooms.append(room)
+
+        if self.dry_run or not rooms:
+            return rooms
+
+        # Upload covers concurrently; bulk_create then only writes rows
+        list(self._executor.map(self._store_cover, [room for room in rooms if room.image]))
+        Room.objects.bulk_create(rooms)
+        search.index_rooms(rooms)
+        facets.count_rooms(rooms)
+        saved_searches.match_rooms(rooms)
+        bump_page_generation()
+        self.created += len(rooms)
+        return rooms
+
+    def _fetch(self, row):
+        ref = (row.get('image') or '').strip()
+        if not ref:
+            return None
+        try:
+            name = os.path.basename(urlparse(ref).path) or 'cover.jpg'
+            return SimpleUploadedFile(name, fetch_image(ref, self.image_root))
+        except Exception as e:
+            return e
+
+    def _store_cover(self, room):
+        room.image.save(room.image.name, room.image.file, save=False)
+
+
+def export_rows(queryset, base_url=''):
+    """Yield export dicts for queryset, reading rows in chunks."""
+    for row in queryset.values(*FIELDS).iterator(chunk_size=2000):
+        url = media_url(row['image'])
+        # Local media URLs are site-relative; base_url makes them fetchable
+        row['image'] = base_url.rstrip('/') + url if url.startswith('/') else url
+        row['available_from'] = row['available_from'].isoformat()
+        yield row
+
+
+def write_rows(stream, rows, fmt):
+    if fmt == 'csv':
+        writer = csv.DictWriter(stream, fieldnames=FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+        return
+    for row in rows:
+        stream.write(json.dumps(row, separators=(',', ':')) + '\n')
@@ -0,0 +1,67 @@
+import time
+
+import cloudinary
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from rooms.media_urls import clear_media_url_cache, cloudinary_url, _cloudinary_prefix
+
+
+class Command(BaseCommand):
+    help = 'Micro-benchmark: storage image URLs vs the storage-free builder for one listing page'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cards', type=int, default=60, help='Images on the simulated page')
+        parser.add_argument('--pages', type=int, default=200, help='Page renders to time')
+
+    def handle(self, *args, **options):
+        cards, pages = options['cards'], options['pages']
+        cloud_name = getattr(settings, 'CLOUDINARY_CLOUD_NAME', None) or 'demo'
+        if not cloudinary.config().cloud_name:
+            # Only needed so the storage path can build URLs offline
+            cloudinary.config(cloud_name=cloud_name, secure=True)
+
+        names = [f'media/rooms/listing_{i}_cover' for i in range(cards)]
+        prefix = _cloudinary_prefix()
+
+        def storage_url(name):
+            # What MediaCloudinaryStorage.url() does (importing the storage
+            # itself needs API credentials, which this benchmark doesn't)
+            if not name.startswith(prefix):
+                name = prefix + name
+            resource = cloudinary.CloudinaryResource(name, default_resource_type='image')
+            return resource.url
+
+        def storage_page():
+            for name in names:
+                storage_url(name)
+
+        def builder_page():
+            for name in names:
+                cloudinary_url(name, cloud_name, prefix)
+
+        def cold_builder_page():
+            clear_media_url_cache()
+            builder_page()
+
+        for name in names:
+            assert storage_url(name) == cloudinary_url(name, cloud_name, prefix), name
+
+        rows = [
+            ('storage.url()', self._time(storage_page, pages)),
+            ('builder (cold cache)', self._time(cold_builder_page, pages)),
+            ('builder (warm cache)', self._time(builder_page, pages)),
+        ]
+        baseline = rows[0][1]
+        self.stdout.write(f'{cards} images per page, {pages} pages')
+        for label, per_page in rows:
+            self.stdout.write(
+                f'{label:<22} {per_page * 1e6:>10.1f} µs/page  {baseline / per_page:>6.1f}x'
+            )
+
+    def _time(self, func, pages):
+        func()  # warm up imports and caches
+        start = time.perf_counter()
+        for _ in range(pages):
+            func()
+        return (time.perf_counter() - start) / pages
@@ -0,0 +1,130 @@
+import io
+import random
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from PIL import Image
+
+from rooms.ingest import ingest_image
+from rooms.media_urls import (
+    FAKE_CLOUDINARY_BACKEND, SHARDED_FILESYSTEM_BACKEND, build_srcset, clear_media_url_cache, media_url,
+)
+from rooms.storage import FakeCloudinaryStorage
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test the media paths offline: concurrent uploads (ingest + storage.save), '
+        'reads, srcsets (thumbnails or transformation URLs) and URL building, on local '
+        'sharded storage and on the fake Cloudinary with injected latency.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--images', type=int, default=40)
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'GALLERY_UPLOAD_WORKERS', 4))
+        parser.add_argument('--latency-ms', type=float, default=80, help='Fake Cloudinary delay per API call')
+        parser.add_argument('--jitter-ms', type=float, default=40)
+        parser.add_argument('--url-rounds', type=int, default=50, help='media_url() passes over every image')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        photos = [self.make_photo(rng, i) for i in range(options['images'])]
+        self.stdout.write(
+            f"{len(photos)} photos, {sum(len(data) for _, data in photos) / len(photos) / 1024:.0f} KB "
+            f"average, {options['workers']} upload workers\n"
+        )
+
+        with tempfile.TemporaryDirectory() as media_root:
+            backends = [
+                ('local (sharded)', SHARDED_FILESYSTEM_BACKEND, {}),
+                (
+                    f"fake cloudinary {options['latency_ms']:g}±{options['jitter_ms']:g} ms",
+                    FAKE_CLOUDINARY_BACKEND,
+                    {'FAKE_CLOUDINARY_LATENCY_MS': options['latency_ms'], 'FAKE_CLOUDINARY_JITTER_MS': options['jitter_ms']},
+                ),
+            ]
+            rows = []
+            for label, backend, extra in backends:
+                storages = {**settings.STORAGES, 'default': {'BACKEND': backend}}
+                with override_settings(STORAGES=storages, MEDIA_ROOT=media_root, MEDIA_URL='/media/', **extra):
+                    FakeCloudinaryStorage.reset()
+                    clear_media_url_cache()
+                    rows.append((label, self.measure(photos, options)))
+                    if backend == FAKE_CLOUDINARY_BACKEND:
+                        self.report_calls()
+            clear_media_url_cache()
+
+        self.stdout.write(
+            f"\n{'backend':<34}{'upload/s':>10}{'upload p50 ms':>15}{'read ms':>9}"
+            f"{'srcset cold ms':>16}{'srcset warm us':>16}{'url us':>8}"
+        )
+        for label, row in rows:
+            self.stdout.write(
+                f"{label:<34}{row['uploads_per_s']:>10.1f}{row['upload_p50_ms']:>15.1f}{row['read_ms']:>9.2f}"
+                f"{row['srcset_cold_ms']:>16.2f}{row['srcset_warm_us']:>16.1f}{row['url_us']:>8.2f}"
+            )
+
+    def make_photo(self, rng, index):
+        # Noise compresses badly, so the files are about phone-photo sized
+        width, height = rng.choice([(1600, 1200), (1200, 1600), (2400, 1800)])
+        image = Image.effect_noise((width // 4, height // 4), 64).convert('RGB').resize((width, height))
+        buffer = io.BytesIO()
+        image.save(buffer, format='JPEG', quality=85)
+        return f'rooms/bench_{index}.jpg', buffer.getvalue()
+
+    def upload(self, photo):
+        name, data = photo
+        start = time.perf_counter()
+        ingested = ingest_image(io.BytesIO(data), name)
+        stored = default_storage.save(f'rooms/{ingested.content.name}', ingested.content)
+        return stored, time.perf_counter() - start
+
+    def measure(self, photos, options):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            results = list(pool.map(self.upload, photos))
+        wall = time.perf_counter() - start
+        names = [name for name, _ in results]
+
+        start = time.perf_counter()
+        for name in names:
+            with default_storage.open(name, 'rb') as f:
+                f.read()
+        read = time.perf_counter() - start
+
+        timings = {}
+        for phase in ('cold', 'warm'):
+            start = time.perf_counter()
+            for name in names:
+                build_srcset(name)
+            timings[phase] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(options['url_rounds']):
+            for name in names:
+                media_url(name)
+        url = time.perf_counter() - start
+
+        return {
+            'uploads_per_s': len(names) / wall,
+            'upload_p50_ms': statistics.median(seconds for _, seconds in results) * 1000,
+            'read_ms': read * 1000 / len(names),
+            'srcset_cold_ms': timings['cold'] * 1000 / len(names),
+            'srcset_warm_us': timings['warm'] * 1e6 / len(names),
+            'url_us': url * 1e6 / (len(names) * options['url_rounds']),
+        }
+
+    def report_calls(self):
+        calls = {}
+        for operation, _, seconds in FakeCloudinaryStorage.calls:
+            count, total = calls.get(operation, (0, 0.0))
+            calls[operation] = (count + 1, total + seconds)
+        summary = ', '.join(f'{op} x{count} ({total:.2f}s)' for op, (count, total) in sorted(calls.items()))
+        self.stdout.write(f'Fake Cloudinary calls: {summary}')
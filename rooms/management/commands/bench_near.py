@@ -0,0 +1,93 @@
+import random
+import time
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from rooms.geo import bounding_box, distance_expression, filter_near
+from rooms.models import Room
+
+# Rooms are scattered over ~110 km around Kathmandu
+CENTRE = (27.7172, 85.3240)
+SPREAD = 0.5
+
+
+class Command(BaseCommand):
+    help = 'Benchmark: radius search with and without the bounding-box prefilter (rows are rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000)
+        parser.add_argument('--queries', type=int, default=50, help='Random search centres to time')
+        parser.add_argument('--km', type=float, default=3)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            self.seed(options['rows'], rng)
+            self.run(options['queries'], options['km'], rng)
+            transaction.set_rollback(True)
+
+    def seed(self, rows, rng):
+        start = time.perf_counter()
+        owner = User.objects.create(username=f'bench-near-{time.time_ns()}')
+        Room.objects.bulk_create(
+            (
+                Room(
+                    owner=owner, title=f'Bench room {i}', description='', price=5000 + i % 20000,
+                    location='Kathmandu', room_type='Single', owner_name='Bench',
+                    contact_number='9800000000', available_from=date(2026, 1, 1),
+                    latitude=CENTRE[0] + rng.uniform(-SPREAD, SPREAD),
+                    longitude=CENTRE[1] + rng.uniform(-SPREAD, SPREAD),
+                )
+                for i in range(rows)
+            ),
+            batch_size=1000,
+        )
+        self.stdout.write(f'Seeded {rows} rooms in {time.perf_counter() - start:.1f}s')
+
+    def run(self, queries, km, rng):
+        centres = [
+            (CENTRE[0] + rng.uniform(-SPREAD, SPREAD), CENTRE[1] + rng.uniform(-SPREAD, SPREAD))
+            for _ in range(queries)
+        ]
+
+        def full_scan(lat, lng):
+            return list(
+                Room.objects
+                .annotate(distance_km=distance_expression(lat, lng))
+                .filter(distance_km__lte=km)
+                .values_list('id', flat=True)
+            )
+
+        def bounded(lat, lng):
+            return list(filter_near(Room.objects.all(), lat, lng, km).values_list('id', flat=True))
+
+        matches = 0
+        for lat, lng in centres:
+            found = bounded(lat, lng)
+            assert sorted(found) == sorted(full_scan(lat, lng)), (lat, lng)
+            matches += len(found)
+
+        lat, lng = centres[0]
+        plan = Room.objects.filter(bounding_box(lat, lng, km)).explain()
+        self.stdout.write(f'{queries} searches, {km} km radius, {matches / queries:.0f} matches on average')
+        self.stdout.write(f'Bounding box plan: {plan}')
+
+        rows = [
+            ('haversine, full scan', self._time(full_scan, centres)),
+            ('bounding box + haversine', self._time(bounded, centres)),
+        ]
+        baseline = rows[0][1]
+        for label, per_query in rows:
+            self.stdout.write(
+                f'{label:<26} {per_query * 1e3:>9.2f} ms/query  {baseline / per_query:>6.1f}x'
+            )
+
+    def _time(self, search, centres):
+        start = time.perf_counter()
+        for lat, lng in centres:
+            search(lat, lng)
+        return (time.perf_counter() - start) / len(centres)
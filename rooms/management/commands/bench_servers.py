@@ -0,0 +1,137 @@
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from rooms.models import Room
+
+# name -> gunicorn arguments besides the bind address and worker count
+MODES = {
+    'wsgi': ['roomfinder.wsgi'],
+    'asgi': ['roomfinder.asgi', '-k', 'uvicorn_worker.UvicornWorker'],
+}
+
+# URL builders taking a room id, cycled through in order
+PATHS = (
+    lambda room_id: reverse('room_list'),
+    lambda room_id: reverse('room_list') + '?property=Apartment&location=Pokhara',
+    lambda room_id: reverse('room_list') + '?near=27.7172,85.3240&km=3',
+    lambda room_id: reverse('room_detail', args=[room_id]),
+)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class Command(BaseCommand):
+    help = (
+        'Start gunicorn in WSGI (sync workers) and ASGI (uvicorn workers) mode '
+        'against the current database and compare concurrent throughput. '
+        'Seed some data first (manage.py seed_rooms).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modes', nargs='+', choices=sorted(MODES), default=['wsgi', 'asgi'])
+        parser.add_argument('--workers', type=int, default=2, help='gunicorn workers per mode')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+        parser.add_argument('--requests', type=int, default=400, help='Requests per concurrency level')
+        parser.add_argument(
+            '--page-cache', action='store_true',
+            help='Keep the anonymous page cache on (off by default, so every request renders)',
+        )
+
+    def handle(self, *args, **options):
+        room_ids = list(Room.objects.active().values_list('id', flat=True)[:200])
+        if not room_ids:
+            raise CommandError('No active rooms: run manage.py seed_rooms first')
+        urls = [
+            url_for(room_ids[i % len(room_ids)])
+            for i in range(options['requests'])
+            for url_for in PATHS
+        ][:options['requests']]
+
+        results = {}
+        for mode in options['modes']:
+            port = free_port()
+            server = self.start_server(mode, port, options['workers'], options['page_cache'])
+            try:
+                base = f'http://127.0.0.1:{port}'
+                self.wait_until_up(base, server)
+                # Warm up caches and imports in every worker
+                self.run_load(base, urls[:len(PATHS) * options['workers'] * 2], options['workers'])
+                for concurrency in options['concurrency']:
+                    results[mode, concurrency] = self.run_load(base, urls, concurrency)
+            finally:
+                server.terminate()
+                server.wait(timeout=10)
+
+        self.report(results, options)
+
+    def start_server(self, mode, port, workers, page_cache):
+        env = {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'roomfinder.settings'),
+            'REQUEST_LOG_LEVEL': 'WARNING',
+        }
+        if not page_cache:
+            env['ANONYMOUS_PAGE_CACHE_TIMEOUT'] = '0'
+        command = [
+            sys.executable, '-m', 'gunicorn', *MODES[mode],
+            '--bind', f'127.0.0.1:{port}', '--workers', str(workers),
+            '--log-level', 'warning',
+        ]
+        return subprocess.Popen(command, cwd=settings.BASE_DIR, env=env)
+
+    def wait_until_up(self, base, server, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f'Server exited with code {server.returncode}')
+            try:
+                urllib.request.urlopen(base + '/', timeout=2).read()
+                return
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.2)
+        raise CommandError(f'Server at {base} did not come up in {timeout}s')
+
+    def run_load(self, base, urls, concurrency):
+        def fetch(path):
+            start = time.perf_counter()
+            with urllib.request.urlopen(base + path, timeout=30) as response:
+                response.read()
+                if response.status != 200:
+                    raise CommandError(f'{path} returned {response.status}')
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            timings = list(pool.map(fetch, urls))
+        elapsed = time.perf_counter() - start
+        return {
+            'rps': len(urls) / elapsed,
+            'p50_ms': statistics.median(timings) * 1000,
+            'p95_ms': statistics.quantiles(timings, n=20)[18] * 1000 if len(timings) > 1 else timings[0] * 1000,
+        }
+
+    def report(self, results, options):
+        self.stdout.write(
+            f"\n{options['workers']} workers per mode, {options['requests']} requests per level "
+            f"(logged-out visitors, page cache {'on' if options['page_cache'] else 'off'})"
+        )
+        self.stdout.write(f"{'mode':<6}{'concurrency':>12}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}")
+        for (mode, concurrency), row in results.items():
+            self.stdout.write(
+                f"{mode:<6}{concurrency:>12}{row['rps']:>10.1f}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}"
+            )
@@ -0,0 +1,122 @@
+import json
+import logging
+import random
+import re
+import statistics
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from rooms.seeding import seed_owners, seed_rooms
+
+# Template loaders without the cached loader: every render re-reads and re-parses
+UNCACHED_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+CACHED_LOADERS = [('django.template.loaders.cached.Loader', UNCACHED_LOADERS)]
+
+PAGES = {
+    'room_list': lambda: reverse('room_list'),
+    'dashboard': lambda: reverse('dashboard'),
+}
+
+TEMPLATE_TIME = re.compile(r'tpl;dur=([\d.]+)')
+
+
+def templates_setting(loaders):
+    engine = {**settings.TEMPLATES[0], 'APP_DIRS': False}
+    engine['OPTIONS'] = {**engine['OPTIONS'], 'loaders': loaders}
+    return [engine]
+
+
+class Command(BaseCommand):
+    help = (
+        'Render room_list and dashboard with N cards (seeded rows are rolled back) '
+        'and report template time and HTML bytes, per page and per card, with and '
+        'without the cached template loader and warm card fragments.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cards', type=int, default=100)
+        parser.add_argument('--requests', type=int, default=20, help='Timed renders per scenario')
+        parser.add_argument('--baseline', help='JSON results of an earlier run to compare against')
+        parser.add_argument('--save', help='Write this run\'s results as JSON')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        cards = options['cards']
+        results = {}
+        # Adds 'testserver' to ALLOWED_HOSTS, like the test runner does
+        setup_test_environment()
+        # One JSON line per request would drown the report
+        timing_logger = logging.getLogger('rooms.timing')
+        log_level = timing_logger.level
+        timing_logger.setLevel(logging.WARNING)
+        try:
+            with transaction.atomic(), override_settings(ROOMS_PAGE_SIZE=cards, SERVER_TIMING_HEADER=True):
+                member, = seed_owners(1, rng, prefix='bench-tpl')
+                seed_rooms(cards, [member], rng)
+                client = Client()
+                # Logged in, so pages bypass the anonymous page cache
+                client.force_login(member)
+                for loader_name, loaders in (('uncached loader', UNCACHED_LOADERS), ('cached loader', CACHED_LOADERS)):
+                    with override_settings(TEMPLATES=templates_setting(loaders)):
+                        for page, url_for in PAGES.items():
+                            for warm in (False, True):
+                                name = f"{page}, {loader_name}, {'warm' if warm else 'cold'} cards"
+                                results[name] = self.measure(client, url_for(), warm, cards, options['requests'])
+                transaction.set_rollback(True)
+        finally:
+            timing_logger.setLevel(log_level)
+            teardown_test_environment()
+            cache.clear()
+
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as f:
+                baseline = json.load(f)
+        self.report(results, baseline, cards)
+        if options['save']:
+            with open(options['save'], 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+            self.stdout.write(f"Saved results to {options['save']}")
+
+    def measure(self, client, url, warm, cards, requests):
+        client.get(url)  # compile templates, fill the card fragments
+        timings, sizes = [], []
+        for _ in range(requests):
+            if not warm:
+                cache.clear()
+            response = client.get(url)
+            timings.append(float(TEMPLATE_TIME.search(response['Server-Timing']).group(1)))
+            sizes.append(len(response.content))
+        p50 = statistics.median(timings)
+        return {
+            'render_ms': round(p50, 2),
+            'per_card_us': round(p50 * 1000 / cards, 1),
+            'bytes': max(sizes),
+            'bytes_per_card': round(max(sizes) / cards),
+        }
+
+    def report(self, results, baseline, cards):
+        self.stdout.write(f'\n{cards} cards per page, median template time')
+        self.stdout.write(f"{'scenario':<46}{'render ms':>10}{'us/card':>9}{'KB':>8}{'B/card':>8}  vs baseline")
+        for name, row in results.items():
+            line = (
+                f"{name:<46}{row['render_ms']:>10.2f}{row['per_card_us']:>9.1f}"
+                f"{row['bytes'] / 1024:>8.1f}{row['bytes_per_card']:>8}"
+            )
+            old = (baseline or {}).get(name)
+            if old:
+                line += (
+                    f"  {row['render_ms'] / old['render_ms'] - 1:+.0%} time,"
+                    f" {row['bytes'] / old['bytes'] - 1:+.0%} bytes"
+                )
+            self.stdout.write(line)
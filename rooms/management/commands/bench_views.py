@@ -0,0 +1,138 @@
+import json
+import logging
+import random
+import statistics
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from rooms.models import Room
+from rooms.seeding import seed_owners, seed_rooms
+
+DASHBOARD_ROOMS = 30
+
+# name -> (logged in?, URL builder taking a random room id)
+SCENARIOS = {
+    'room_list': (True, lambda room_id: reverse('room_list')),
+    'room_list (anonymous)': (False, lambda room_id: reverse('room_list')),
+    'room_list filtered': (True, lambda room_id: reverse('room_list') + '?property=Apartment&location=Pokhara&max_price=40000'),
+    'room_list near': (True, lambda room_id: reverse('room_list') + '?near=27.7172,85.3240&km=3'),
+    'search': (True, lambda room_id: reverse('room_list') + '?q=sunny+lake'),
+    'room_detail': (True, lambda room_id: reverse('room_detail', args=[room_id])),
+    'dashboard': (True, lambda room_id: reverse('dashboard')),
+    'api room_list': (False, lambda room_id: reverse('api_room_list')),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the rooms views through the test client at several table sizes '
+        '(seeded rows are rolled back). Reports p50/p95 latency, queries and bytes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10_000, 100_000])
+        parser.add_argument('--requests', type=int, default=30, help='Timed requests per scenario')
+        parser.add_argument('--baseline', help='JSON results of an earlier run to compare against')
+        parser.add_argument('--save', help='Write this run\'s results as JSON (a new baseline)')
+        parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed p50 slowdown before flagging')
+        parser.add_argument('--fail-on-regression', action='store_true')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        results = {}
+        # Adds 'testserver' to ALLOWED_HOSTS, like the test runner does
+        setup_test_environment()
+        # One JSON line per request would drown the report
+        timing_logger = logging.getLogger('rooms.timing')
+        log_level = timing_logger.level
+        timing_logger.setLevel(logging.WARNING)
+        try:
+            with transaction.atomic():
+                # The dashboard user owns the same DASHBOARD_ROOMS at every size
+                member, = seed_owners(1, rng, prefix='bench-member')
+                seed_rooms(DASHBOARD_ROOMS, [member], rng)
+                owners = seed_owners(max(1, max(options['sizes']) // 20), rng, prefix='bench')
+                seeded = DASHBOARD_ROOMS
+                for size in sorted(options['sizes']):
+                    start = time.perf_counter()
+                    seed_rooms(size - seeded, owners, rng, start=seeded)
+                    seeded = size
+                    self.stdout.write(f'Seeded {size} rooms ({time.perf_counter() - start:.1f}s)')
+                    results[str(size)] = self.run_size(member, rng, options['requests'])
+                transaction.set_rollback(True)
+        finally:
+            timing_logger.setLevel(log_level)
+            teardown_test_environment()
+            cache.clear()
+
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as f:
+                baseline = json.load(f)
+        regressions = self.report(results, baseline, options['tolerance'])
+
+        if options['save']:
+            with open(options['save'], 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+            self.stdout.write(f"Saved results to {options['save']}")
+        if regressions and options['fail_on_regression']:
+            raise CommandError(f'{regressions} scenarios regressed')
+
+    def run_size(self, owner, rng, requests):
+        cache.clear()
+        room_ids = list(Room.objects.active().values_list('id', flat=True))
+        anonymous, member = Client(), Client()
+        member.force_login(owner)
+
+        size_results = {}
+        for name, (logged_in, url_for) in SCENARIOS.items():
+            client = member if logged_in else anonymous
+            client.get(url_for(rng.choice(room_ids)))  # warm up caches and imports
+            timings, queries, sizes = [], [], []
+            for _ in range(requests):
+                url = url_for(rng.choice(room_ids))
+                with CaptureQueriesContext(connection) as captured:
+                    start = time.perf_counter()
+                    response = client.get(url)
+                    timings.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    raise CommandError(f'{name}: {url} returned {response.status_code}')
+                queries.append(len(captured))
+                sizes.append(len(response.content))
+            size_results[name] = {
+                'p50_ms': round(statistics.median(timings) * 1000, 2),
+                'p95_ms': round(statistics.quantiles(timings, n=20)[18] * 1000, 2),
+                'queries': max(queries),
+                'bytes': max(sizes),
+            }
+        return size_results
+
+    def report(self, results, baseline, tolerance):
+        regressions = 0
+        for size, scenarios in results.items():
+            self.stdout.write(f'\n{size} rooms')
+            self.stdout.write(f"{'scenario':<24}{'p50 ms':>9}{'p95 ms':>9}{'queries':>9}{'KB':>8}  vs baseline")
+            for name, row in scenarios.items():
+                line = (
+                    f"{name:<24}{row['p50_ms']:>9.2f}{row['p95_ms']:>9.2f}"
+                    f"{row['queries']:>9}{row['bytes'] / 1024:>8.1f}"
+                )
+                old = (baseline or {}).get(size, {}).get(name)
+                if old:
+                    change = row['p50_ms'] / old['p50_ms'] - 1 if old['p50_ms'] else 0
+                    worse = change > tolerance or row['queries'] > old['queries']
+                    note = f"  {change:+.0%} p50, {row['queries'] - old['queries']:+d} queries"
+                    if worse:
+                        regressions += 1
+                        line += self.style.ERROR(note + '  REGRESSION')
+                    else:
+                        line += note
+                self.stdout.write(line)
+        return regressions
@@ -0,0 +1,52 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from rooms.listing_io import detect_format, export_rows, write_rows
+from rooms.models import Room
+
+
+class Command(BaseCommand):
+    help = 'Export listings to CSV or JSONL (the format import_rooms reads)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-', help="File to write, '-' (default) for stdout")
+        parser.add_argument('--owner', help='Only this user\'s listings')
+        parser.add_argument('--format', choices=('csv', 'jsonl'), help='Default: from the file extension')
+        parser.add_argument('--all', action='store_true', help='Include archived and expired listings')
+        parser.add_argument('--base-url', default='', help='Prefix for site-relative image URLs')
+
+    def handle(self, *args, **options):
+        rooms = Room.objects.all() if options['all'] else Room.objects.active()
+        if options['owner']:
+            rooms = rooms.filter(owner__username=options['owner'])
+        rooms = rooms.order_by('id')
+
+        fmt = detect_format(options['path'], options['format'])
+        counted = _Counter(export_rows(rooms, options['base_url']))
+        start = time.perf_counter()
+        if options['path'] == '-':
+            write_rows(sys.stdout, counted, fmt)
+        else:
+            with open(options['path'], 'w', newline='', encoding='utf-8') as stream:
+                write_rows(stream, counted, fmt)
+        elapsed = time.perf_counter() - start
+
+        self.stderr.write(self.style.SUCCESS(
+            f"Exported {counted.count} rooms in {elapsed:.1f}s "
+            f"({counted.count / elapsed if elapsed else 0:.0f} rows/s)"
+        ))
+
+
+class _Counter:
+    """Pass rows through while counting them."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.count = 0
+
+    def __iter__(self):
+        for row in self.rows:
+            self.count += 1
+            yield row
@@ -0,0 +1,54 @@
+import sys
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from rooms.listing_io import RoomImporter, batched, detect_format, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Import listings from a CSV or JSONL file (validated like add_room, inserted in batches)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to read, '-' for stdin")
+        parser.add_argument('--owner', required=True, help='Username the listings belong to')
+        parser.add_argument('--format', choices=('csv', 'jsonl'), help='Default: from the file extension')
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--workers', type=int, default=8, help='Concurrent image downloads/uploads')
+        parser.add_argument('--image-root', help='Directory that relative image paths are read from')
+        parser.add_argument('--dry-run', action='store_true', help='Validate only, write nothing')
+
+    def handle(self, *args, **options):
+        try:
+            owner = get_user_model().objects.get(username=options['owner'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user named {options['owner']!r}")
+
+        fmt = detect_format(options['path'], options['format'])
+        importer = RoomImporter(
+            owner, image_root=options['image_root'], workers=options['workers'], dry_run=options['dry_run'],
+        )
+        start = time.perf_counter()
+        rows_read = 0
+        stream = sys.stdin if options['path'] == '-' else open(options['path'], newline='', encoding='utf-8')
+        try:
+            # Line numbers count the CSV header so they match the file
+            numbered = enumerate(read_rows(stream, fmt), start=2 if fmt == 'csv' else 1)
+            for batch in batched(numbered, options['batch_size']):
+                importer.import_batch(batch)
+                rows_read += len(batch)
+                self.stdout.write(f"{rows_read} rows read, {importer.created} rooms created")
+        finally:
+            importer.close()
+            if stream is not sys.stdin:
+                stream.close()
+
+        for line, message in importer.errors:
+            self.stderr.write(f"line {line}: {message}")
+        elapsed = time.perf_counter() - start
+        verb = 'Validated' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {rows_read - len(importer.errors)} of {rows_read} rows in {elapsed:.1f}s "
+            f"({rows_read / elapsed if elapsed else 0:.0f} rows/s), {len(importer.errors)} rejected"
+        ))
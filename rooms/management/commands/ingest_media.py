@@ -0,0 +1,90 @@
+import io
+
+from django.core.management.base import BaseCommand
+
+from rooms.cache import touch_room
+from rooms.ingest import IngestError, ingest_image
+from rooms.models import Room, RoomImage
+from rooms.uploads import find_stored_duplicate
+
+
+class Command(BaseCommand):
+    help = 'Backfill: resize, re-encode, strip EXIF and dedup images uploaded before ingestion existed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report savings without writing')
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--keep-originals', action='store_true', help="Don't delete replaced files")
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        self.keep_originals = options['keep_originals']
+        self.stats = {'processed': 0, 'deduplicated': 0, 'failed': 0, 'bytes_before': 0, 'bytes_after': 0}
+
+        # Rows with an empty hash predate ingestion, so reruns skip finished work
+        gallery = (
+            RoomImage.objects
+            .filter(status=RoomImage.STATUS_READY, content_hash='')
+            .exclude(image='')
+            .iterator(chunk_size=options['batch_size'])
+        )
+        for room_image in gallery:
+            self.ingest(room_image, room_image.image, hash_field='content_hash', dedup=True)
+
+        covers = (
+            Room.objects
+            .filter(image_hash='')
+            .exclude(image='')
+            .exclude(image=None)
+            .iterator(chunk_size=options['batch_size'])
+        )
+        for room in covers:
+            self.ingest(room, room.image, hash_field='image_hash')
+
+        s = self.stats
+        saved = s['bytes_before'] - s['bytes_after']
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Would process' if self.dry_run else 'Processed'} {s['processed']} images "
+            f"({s['deduplicated']} duplicates, {s['failed']} unreadable), "
+            f"{s['bytes_before'] / 1e6:.1f} MB -> {s['bytes_after'] / 1e6:.1f} MB, saved {saved / 1e6:.1f} MB"
+        ))
+
+    def ingest(self, obj, field_file, hash_field, dedup=False):
+        old_name = field_file.name
+        storage = field_file.storage
+        try:
+            with storage.open(old_name, 'rb') as source:
+                original = source.read()
+            ingested = ingest_image(io.BytesIO(original), old_name)
+        except (IngestError, OSError) as e:
+            self.stats['failed'] += 1
+            self.stderr.write(f'{old_name}: {e}')
+            return
+
+        self.stats['processed'] += 1
+        self.stats['bytes_before'] += len(original)
+        duplicate = find_stored_duplicate(ingested.content_hash) if dedup else None
+        if duplicate:
+            self.stats['deduplicated'] += 1
+        else:
+            self.stats['bytes_after'] += ingested.content.size
+        if self.dry_run:
+            return
+
+        new_name = duplicate or storage.save(
+            field_file.field.generate_filename(obj, ingested.content.name), ingested.content
+        )
+        type(obj).objects.filter(pk=obj.pk).update(**{
+            field_file.field.name: new_name,
+            hash_field: ingested.content_hash,
+        })
+        # New updated_at so cached cards stop pointing at the old file
+        touch_room(obj.room_id if isinstance(obj, RoomImage) else obj.pk)
+
+        still_used = (
+            Room.objects.filter(image=old_name).exists() or
+            RoomImage.objects.filter(image=old_name).exists()
+        )
+        if not self.keep_originals and not still_used:
+            storage.delete(old_name)
+
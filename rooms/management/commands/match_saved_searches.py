@@ -0,0 +1,56 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+
+from rooms.listing_io import batched
+from rooms.models import Room, SavedSearch
+from rooms.saved_searches import match_rooms
+
+# What match_rooms() reads from a room
+MATCH_FIELDS = (
+    'owner', 'created_at', 'is_active', 'expires_at',
+    'title', 'description', 'location', 'room_type', 'property_type',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Backfill saved-search matches for rooms created since a date '
+        '(rooms that skipped the signal: raw SQL, fixtures, another app). '
+        'Safe to re-run: a room is never counted twice for one search.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            help='YYYY-MM-DD or ISO datetime (default: when the oldest saved search was made)'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        since = self.parse_since(options['since'])
+        if since is None:
+            since = SavedSearch.objects.aggregate(oldest=Min('created_at'))['oldest']
+            if since is None:
+                self.stdout.write("No saved searches, nothing to match")
+                return
+
+        rooms = Room.objects.active().filter(created_at__gte=since).only(*MATCH_FIELDS).order_by('pk')
+        scanned = matched = 0
+        for batch in batched(rooms.iterator(chunk_size=options['batch_size']), options['batch_size']):
+            matched += match_rooms(batch)
+            scanned += len(batch)
+            self.stdout.write(f"Matched {scanned} rooms so far")
+
+        self.stdout.write(self.style.SUCCESS(f"Matched {scanned} rooms, {matched} saved-search hits"))
+
+    def parse_since(self, value):
+        if not value:
+            return None
+        try:
+            since = datetime.fromisoformat(value)
+        except ValueError:
+            raise CommandError(f"--since: not a date or datetime: {value!r}")
+        return timezone.make_aware(since) if timezone.is_naive(since) else since
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from rooms.uploads import pending_upload_ids, process_upload
+
+
+class Command(BaseCommand):
+    help = 'Upload staged gallery images (leftovers from restarts, or GALLERY_UPLOAD_MODE=queue)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new uploads')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds between polls with --loop')
+        parser.add_argument('--batch', type=int, default=100)
+
+    def handle(self, *args, **options):
+        while True:
+            ids = pending_upload_ids(options['batch'])
+            results = [process_upload(upload_id) for upload_id in ids]
+            if ids:
+                self.stdout.write(
+                    f"Processed {len(ids)} uploads: {results.count('ready')} ready, "
+                    f"{results.count('pending')} to retry, {results.count('failed')} failed"
+                )
+            if not options['loop']:
+                break
+            if not ids:
+                time.sleep(options['interval'])
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from rooms.cache import bump_page_generation
+from rooms.facets import rebuild_facets
+
+
+class Command(BaseCommand):
+    help = 'Recompute the room_list facet counts from the Room table'
+
+    def handle(self, *args, **kwargs):
+        count = rebuild_facets()
+        # Cached facets and pages were built from the old counts
+        bump_page_generation()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} facet rows"))
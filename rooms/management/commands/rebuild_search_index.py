@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from rooms import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the SQLite FTS5 room search table (no-op on PostgreSQL)'
+
+    def handle(self, *args, **kwargs):
+        backend = search.get_backend()
+        if backend != 'fts5':
+            self.stdout.write(f"Search backend is '{backend}', nothing to rebuild")
+            return
+        count = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} rooms"))
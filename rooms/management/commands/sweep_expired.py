@@ -0,0 +1,58 @@
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from rooms.cache import bump_page_generation
+from rooms.facets import FACET_FIELDS, adjust, price_bucket
+from rooms.models import Room
+
+
+class Command(BaseCommand):
+    help = 'Archive rooms past expires_at, in small batches so no lock is held for long'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--pause', type=float, default=0.1, help='Seconds to sleep between batches')
+        parser.add_argument('--dry-run', action='store_true', help='Only count expired rooms')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        # Served by room_active_expires_idx
+        expired = Room.objects.filter(is_active=True, expires_at__lte=now)
+        if options['dry_run']:
+            self.stdout.write(f"{expired.count()} rooms would be archived")
+            return
+
+        archived = 0
+        while True:
+            with transaction.atomic():
+                # Lock only this batch; concurrent renewals of other rooms carry on
+                batch = list(
+                    expired.select_for_update(skip_locked=True)
+                    .order_by('expires_at')
+                    .values_list('pk', *FACET_FIELDS, 'price')[:options['batch_size']]
+                )
+                if not batch:
+                    break
+                Room.objects.filter(pk__in=[row[0] for row in batch]).update(
+                    is_active=False, updated_at=timezone.now()
+                )
+                # update() skips signals: take the rooms out of the facet counts here
+                groups = Counter((*row[1:4], price_bucket(row[4])) for row in batch)
+                for (property_type, location, room_type, bucket), count in groups.items():
+                    adjust({
+                        'property_type': property_type,
+                        'location': location,
+                        'room_type': room_type,
+                        'price_bucket': bucket,
+                    }, -count)
+
+            archived += len(batch)
+            bump_page_generation()
+            self.stdout.write(f"Archived {archived} rooms so far")
+            time.sleep(options['pause'])
+
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} expired rooms"))
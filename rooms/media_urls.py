@@ -0,0 +1,132 @@
+"""
+Storage-free delivery URLs for room images.
+
+``image_field.url`` goes through the storage backend on every call; for
+Cloudinary that means building a CloudinaryResource per image per render.
+The stored file name already *is* the Cloudinary public id, so the URL can
+be derived from settings alone. Results are kept in a bounded LRU cache.
+Resized variants use Cloudinary transformations, or Pillow thumbnails
+(rooms/thumbnails.py) when media is on the local filesystem. The offline
+fake Cloudinary (rooms/storage.py) gets the same URLs as the real one.
+"""
+import re
+from functools import lru_cache
+from urllib.parse import urljoin
+
+from cloudinary.utils import smart_escape
+from django.conf import settings
+from django.utils.encoding import filepath_to_uri
+
+from .thumbnails import get_thumbnail
+
+CLOUDINARY_BACKEND = 'cloudinary_storage.storage.MediaCloudinaryStorage'
+FILESYSTEM_BACKEND = 'django.core.files.storage.FileSystemStorage'
+# rooms/storage.py: same URLs as the real thing, built the same way
+FAKE_CLOUDINARY_BACKEND = 'rooms.storage.FakeCloudinaryStorage'
+SHARDED_FILESYSTEM_BACKEND = 'rooms.storage.ShardedFileSystemStorage'
+FILESYSTEM_BACKENDS = (FILESYSTEM_BACKEND, SHARDED_FILESYSTEM_BACKEND)
+FAKE_CLOUD_NAME = 'roomfinder-fake'
+
+MEDIA_URL_CACHE_SIZE = getattr(settings, 'MEDIA_URL_CACHE_SIZE', 4096)
+
+
+def _storage_backend():
+    return settings.STORAGES.get('default', {}).get('BACKEND', FILESYSTEM_BACKEND)
+
+
+def get_cloud_name(backend=None):
+    cloud_name = getattr(settings, 'CLOUDINARY_CLOUD_NAME', None)
+    if (backend or _storage_backend()) == FAKE_CLOUDINARY_BACKEND:
+        return cloud_name or FAKE_CLOUD_NAME
+    return cloud_name
+
+
+def _cloudinary_prefix():
+    # Same prefix MediaCloudinaryStorage puts in front of every public id
+    options = getattr(settings, 'CLOUDINARY_STORAGE', {}) or {}
+    prefix = options.get('PREFIX', settings.MEDIA_URL or '').lstrip('/')
+    if prefix and not prefix.endswith('/'):
+        prefix += '/'
+    return prefix
+
+
+@lru_cache(maxsize=MEDIA_URL_CACHE_SIZE)
+def cloudinary_url(public_id, cloud_name, prefix='', transformation=''):
+    """https://res.cloudinary.com/<cloud>/image/upload/[<transformation>/][v1/]<public id>"""
+    if not public_id.startswith(prefix):
+        public_id = prefix + public_id
+    # cloudinary adds a default version to ids in folders, match it so
+    # URLs (and CDN cache entries) are identical to the storage's
+    version = 'v1/' if '/' in public_id and not re.match(r'v\d+/', public_id) else ''
+    if transformation:
+        transformation += '/'
+    return (
+        f'https://res.cloudinary.com/{cloud_name}/image/upload/'
+        f'{transformation}{version}{smart_escape(public_id)}'
+    )
+
+
+def cloudinary_width_transformation(width):
+    # Resize down only, let Cloudinary pick format (WebP/AVIF) and quality
+    return f'c_limit,f_auto,q_auto,w_{width}'
+
+
+@lru_cache(maxsize=MEDIA_URL_CACHE_SIZE)
+def filesystem_url(name, media_url):
+    return urljoin(media_url, filepath_to_uri(name).lstrip('/'))
+
+
+def build_media_url(name, width=None):
+    """
+    Delivery URL for a stored image name, or None when the configured
+    storage isn't one we know how to build URLs for. With width, the URL
+    points at a copy at most that many pixels wide.
+    """
+    if not name:
+        return ''
+    backend = _storage_backend()
+    if backend in (CLOUDINARY_BACKEND, FAKE_CLOUDINARY_BACKEND):
+        cloud_name = get_cloud_name(backend)
+        if not cloud_name:
+            return None
+        transformation = cloudinary_width_transformation(width) if width else ''
+        return cloudinary_url(name, cloud_name, _cloudinary_prefix(), transformation)
+    if backend in FILESYSTEM_BACKENDS:
+        if width:
+            name = get_thumbnail(name, width) or name
+        return filesystem_url(name, settings.MEDIA_URL or '/')
+    return None
+
+
+def build_srcset(name, widths=None):
+    """'<url> 320w, <url> 640w, ...' for an <img srcset>, '' if unsupported."""
+    if not name:
+        return ''
+    widths = widths or get_image_widths()
+    candidates = []
+    for width in widths:
+        url = build_media_url(name, width)
+        if not url:
+            return ''
+        candidates.append(f'{url} {width}w')
+    return ', '.join(candidates)
+
+
+def get_image_widths():
+    return getattr(settings, 'ROOM_IMAGE_WIDTHS', (320, 640, 960, 1280))
+
+
+def clear_media_url_cache():
+    cloudinary_url.cache_clear()
+    filesystem_url.cache_clear()
+
+
+def media_url(name, width=None):
+    """build_media_url, falling back to asking the storage backend."""
+    if not name:
+        return ''
+    url = build_media_url(name, width)
+    if url is None:
+        from django.core.files.storage import default_storage
+        url = default_storage.url(name)
+    return url
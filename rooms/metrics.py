@@ -0,0 +1,113 @@
+"""
+In-process metrics, exposed at /metrics in the Prometheus text format.
+
+Counters and histograms live in this worker's memory: each gunicorn
+worker reports its own numbers (Prometheus adds up the scraped series,
+and the instance label tells workers apart behind a load balancer).
+Everything here is cheap enough to call on every request.
+"""
+import bisect
+from collections import defaultdict
+from threading import Lock
+
+# Request latency buckets, seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = Lock()
+_counters = defaultdict(float)     # (name, labels) -> value
+_histograms = {}                   # (name, labels) -> [bucket counts..., sum, count]
+_help = {}                         # name -> (type, help text)
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+def describe(name, kind, text):
+    _help[name] = (kind, text)
+
+
+def inc(name, amount=1, **labels):
+    with _lock:
+        _counters[name, _labels(labels)] += amount
+
+
+def observe(name, value, **labels):
+    key = (name, _labels(labels))
+    with _lock:
+        series = _histograms.get(key)
+        if series is None:
+            series = _histograms[key] = [0] * len(LATENCY_BUCKETS) + [0.0, 0]
+        # Per-bucket counts, then sum and count; render() makes them cumulative
+        index = bisect.bisect_left(LATENCY_BUCKETS, value)
+        if index < len(LATENCY_BUCKETS):
+            series[index] += 1
+        series[-2] += value
+        series[-1] += 1
+
+
+def record_cache(cache_name, hit):
+    inc('roomfinder_cache_requests_total', cache=cache_name, result='hit' if hit else 'miss')
+
+
+def reset():
+    """Forget every series (tests)."""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=()):
+    pairs = [*labels, *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def render(gauges=()):
+    """
+    Every series as Prometheus text. gauges: extra (name, labels dict,
+    value) samples computed by the caller, e.g. health probe results.
+    """
+    with _lock:
+        counters = dict(_counters)
+        histograms = {key: list(series) for key, series in _histograms.items()}
+
+    by_name = defaultdict(list)
+    for (name, labels), value in counters.items():
+        by_name[name].append((labels, value))
+    for name, labels, value in gauges:
+        by_name[name].append((_labels(labels), value))
+    for (name, labels), series in histograms.items():
+        by_name[name].append((labels, series))
+
+    lines = []
+    for name in sorted(by_name):
+        kind, text = _help.get(name, ('untyped', ''))
+        if text:
+            lines.append(f'# HELP {name} {text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in sorted(by_name[name], key=lambda sample: sample[0]):
+            if kind != 'histogram':
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, value):
+                cumulative += count
+                lines.append(f'{name}_bucket{_format_labels(labels, [("le", bound)])} {cumulative}')
+            lines.append(f'{name}_bucket{_format_labels(labels, [("le", "+Inf")])} {value[-1]}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(value[-2])}')
+            lines.append(f'{name}_count{_format_labels(labels)} {value[-1]}')
+    return '\n'.join(lines) + '\n'
+
+
+describe('roomfinder_http_request_duration_seconds', 'histogram', 'Request latency by view, method and status class.')
+describe('roomfinder_cache_requests_total', 'counter', 'Cache lookups by cache and result.')
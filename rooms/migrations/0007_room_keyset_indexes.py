@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-18 20:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rooms', '0006_alter_room_owner_alter_room_price'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['-created_at', '-id'], name='room_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['owner', '-created_at', '-id'], name='room_owner_created_idx'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 6.0.1 on 2026-10-18 20:01
+
+import django.db.models.deletion
+import rooms.models
+from django.db import migrations, models
+
+
+# PostgreSQL: GIN index over the same expression rooms/search.py queries with
+PG_CREATE = """
+CREATE INDEX IF NOT EXISTS room_search_gin ON rooms_room USING gin (
+    to_tsvector('english',
+        coalesce(title, '') || ' ' ||
+        coalesce(description, '') || ' ' ||
+        coalesce(location, '') || ' ' ||
+        coalesce(room_type, '') || ' ' ||
+        coalesce(property_type, ''))
+)
+"""
+PG_DROP = 'DROP INDEX IF EXISTS room_search_gin'
+
+# SQLite: FTS5 table keyed by room id, title weighted highest in bm25
+SQLITE_CREATE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS rooms_room_fts USING fts5("
+    "title, description, location, room_type, property_type, tokenize='unicode61')",
+    "INSERT INTO rooms_room_fts (rooms_room_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0, 5.0, 2.0, 2.0)')",
+    "INSERT INTO rooms_room_fts (rowid, title, description, location, room_type, property_type) "
+    "SELECT id, title, description, location, room_type, property_type FROM rooms_room",
+]
+SQLITE_DROP = 'DROP TABLE IF EXISTS rooms_room_fts'
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(PG_CREATE)
+    elif vendor == 'sqlite':
+        try:
+            for sql in SQLITE_CREATE:
+                schema_editor.execute(sql)
+        except Exception:
+            # SQLite built without FTS5: search falls back to icontains
+            schema_editor.execute(SQLITE_DROP)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(PG_DROP)
+    elif vendor == 'sqlite':
+        schema_editor.execute(SQLITE_DROP)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rooms', '0007_room_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomSearchIndex',
+            fields=[
+                ('room', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='rooms.room')),
+                ('document', rooms.models.FTSDocumentField(db_column='rooms_room_fts')),
+                ('rank', models.FloatField(db_column='rank')),
+            ],
+            options={
+                'db_table': 'rooms_room_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
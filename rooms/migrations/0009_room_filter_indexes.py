@@ -0,0 +1,39 @@
+# Generated by Django 6.0.1 on 2026-10-18 20:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rooms', '0008_room_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['property_type', '-created_at', '-id'], name='room_property_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['location', '-created_at', '-id'], name='room_location_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['room_type', '-created_at', '-id'], name='room_roomtype_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['location', 'room_type', 'price'], name='room_location_type_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['price'], name='room_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['available_from'], name='room_available_from_idx'),
+        ),
+    ]
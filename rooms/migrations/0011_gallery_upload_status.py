@@ -0,0 +1,37 @@
+# Generated by Django 6.0.1 on 2026-10-18 20:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rooms', '0010_room_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='roomimage',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='ready', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='roomimage',
+            name='image',
+            field=models.ImageField(blank=True, upload_to='rooms/'),
+        ),
+        migrations.CreateModel(
+            name='PendingUpload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_name', models.CharField(max_length=255)),
+                ('content', models.BinaryField()),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('room_image', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='pending_upload', to='rooms.roomimage')),
+            ],
+        ),
+    ]
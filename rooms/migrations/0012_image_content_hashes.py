@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-18 20:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rooms', '0011_gallery_upload_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='image_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='roomimage',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+    ]
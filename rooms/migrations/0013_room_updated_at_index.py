@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-18 20:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rooms', '0012_image_content_hashes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['updated_at'], name='room_updated_at_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 6.0.1 on 2026-10-18 20:16
+
+from collections import Counter
+
+from django.db import migrations, models
+
+# Frozen copy of rooms.facets.PRICE_BUCKETS at the time of this migration
+PRICE_BUCKETS = (0, 5000, 10000, 15000, 20000, 30000, 50000)
+
+
+def populate_facets(apps, schema_editor):
+    Room = apps.get_model('rooms', 'Room')
+    RoomFacetCount = apps.get_model('rooms', 'RoomFacetCount')
+    counts = Counter()
+    rows = Room.objects.values_list('property_type', 'location', 'room_type', 'price')
+    for property_type, location, room_type, price in rows.iterator(chunk_size=2000):
+        bucket = sum(1 for bound in PRICE_BUCKETS if (price or 0) >= bound) - 1
+        counts[property_type, location, room_type, bucket] += 1
+    RoomFacetCount.objects.bulk_create(
+        RoomFacetCount(property_type=p, location=l, room_type=r, price_bucket=b, count=n)
+        for (p, l, r, b), n in counts.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rooms', '0014_room_coordinates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomFacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('property_type', models.CharField(max_length=20)),
+                ('location', models.CharField(max_length=50)),
+                ('room_type', models.CharField(max_length=20)),
+                ('price_bucket', models.PositiveSmallIntegerField()),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('property_type', 'location', 'room_type', 'price_bucket'), name='room_facet_unique')],
+            },
+        ),
+        migrations.RunPython(populate_facets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0.1 on 2026-10-18 20:18
+
+import rooms.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rooms', '0015_room_facet_counts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, default=rooms.models.default_expiry, null=True),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='is_active',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-created_at', '-id'], name='room_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['available_from'], name='room_active_available_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['expires_at'], name='room_active_expires_idx'),
+        ),
+    ]
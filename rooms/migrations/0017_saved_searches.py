@@ -0,0 +1,65 @@
+# Generated by Django 6.0.1 on 2026-10-18 20:39
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rooms', '0016_room_listing_lifecycle'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SavedSearch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('query', models.CharField(blank=True, max_length=200)),
+                ('property_type', models.CharField(blank=True, choices=[('Room', 'Room'), ('Apartment', 'Apartment'), ('Hostel', 'Hostel')], max_length=20)),
+                ('term_count', models.PositiveSmallIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_seen_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saved_searches', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SavedSearchMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='rooms.room')),
+                ('search', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='matches', to='rooms.savedsearch')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SavedSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=50)),
+                ('search', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='rooms.savedsearch')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='savedsearch',
+            constraint=models.UniqueConstraint(fields=('user', 'query', 'property_type'), name='saved_search_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='savedsearchmatch',
+            constraint=models.UniqueConstraint(fields=('search', 'room'), name='saved_search_match_unique'),
+        ),
+        migrations.AddIndex(
+            model_name='savedsearchterm',
+            index=models.Index(fields=['term'], name='saved_search_term_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='savedsearchterm',
+            constraint=models.UniqueConstraint(fields=('search', 'term'), name='saved_search_term_unique'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 20:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rooms', '0017_saved_searches'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='view_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-18 21:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rooms', '0018_room_view_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='savedsearch',
+            index=models.Index(fields=['term_count'], name='saved_search_term_count_idx'),
+        ),
+    ]
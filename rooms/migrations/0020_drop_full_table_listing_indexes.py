@@ -0,0 +1,24 @@
+# Generated by Django 6.0.1 on 2026-10-18 21:15
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rooms', '0019_savedsearch_term_count_idx'),
+    ]
+
+    # Every public listing query goes through Room.objects.active(), served by
+    # the partial room_active_created_idx / room_active_available_idx; the
+    # dashboard seeks on room_owner_created_idx. Nothing reads these two.
+    operations = [
+        migrations.RemoveIndex(
+            model_name='room',
+            name='room_created_id_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='room',
+            name='room_available_from_idx',
+        ),
+    ]
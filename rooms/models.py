@@ -1,5 +1,59 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+
+class FTSDocumentField(models.TextField):
+    """The hidden column of an SQLite FTS5 table (named after the table)."""
+
+
+@FTSDocumentField.register_lookup
+class Match(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+def default_expiry():
+    """New and renewed listings stay up for ROOM_LISTING_TTL_DAYS."""
+    return timezone.now() + timedelta(days=getattr(settings, 'ROOM_LISTING_TTL_DAYS', 90))
+
+
+class RoomQuerySet(models.QuerySet):
+
+    def active(self):
+        """Listed rooms: not archived, and not past expiry even if not swept yet."""
+        return self.filter(
+            models.Q(expires_at__isnull=True) | models.Q(expires_at__gt=timezone.now()),
+            is_active=True,
+        )
+
+    def available_on(self, day):
+        """Rooms a tenant could move into on day."""
+        return self.filter(
+            models.Q(expires_at__isnull=True) | models.Q(expires_at__date__gte=day),
+            available_from__lte=day,
+        )
+
+    def stats(self):
+        """Listing totals for the owner dashboard, in one aggregate query."""
+        listed = models.Q(is_active=True) & (
+            models.Q(expires_at__isnull=True) | models.Q(expires_at__gt=timezone.now())
+        )
+        return self.aggregate(
+            total=models.Count('id'),
+            listed=models.Count('id', filter=listed),
+            average_price=models.Avg('price'),
+            views=Coalesce(models.Sum('view_count'), 0),
+        )
 
 
 class Room(models.Model):
@@ -44,6 +98,16 @@ class Room(models.Model):
     location = models.CharField(max_length=50, choices=LOCATION_CHOICES)
     room_type = models.CharField(max_length=20, choices=ROOM_TYPE_CHOICES)
 
+    # 🗺 Coordinates for "rooms near me" (rooms/geo.py), optional
+    latitude = models.FloatField(
+        null=True, blank=True,
+        validators=[MinValueValidator(-90), MaxValueValidator(90)]
+    )
+    longitude = models.FloatField(
+        null=True, blank=True,
+        validators=[MinValueValidator(-180), MaxValueValidator(180)]
+    )
+
     # 📞 Contact Info
     owner_name = models.CharField(max_length=100)
     contact_number = models.CharField(max_length=15)
@@ -57,13 +121,62 @@ class Room(models.Model):
         blank=True,
         null=True
     )
+    # SHA-256 of the ingested cover pixels (see rooms/ingest.py)
+    image_hash = models.CharField(max_length=64, blank=True, editable=False)
+
+    # ⏳ Listing lifecycle: `manage.py sweep_expired` archives rooms past expires_at
+    is_active = models.BooleanField(default=True)
+    expires_at = models.DateTimeField(null=True, blank=True, default=default_expiry)
+
+    # 👁 Detail page views, flushed in batches from the cache (see rooms/view_counts.py)
+    view_count = models.PositiveIntegerField(default=0, editable=False)
 
-    # ⏱ Timestamp
+    # ⏱ Timestamps (updated_at is also bumped when gallery images change)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = RoomQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Public listings only ever read active rows (Room.objects.active()),
+            # so their ordering and availability indexes are partial: archived
+            # rooms are left out entirely and no full-table copy is kept
+            models.Index(
+                fields=['-created_at', '-id'], name='room_active_created_idx',
+                condition=models.Q(is_active=True)
+            ),
+            models.Index(
+                fields=['available_from'], name='room_active_available_idx',
+                condition=models.Q(is_active=True)
+            ),
+            # Finding rooms to sweep
+            models.Index(
+                fields=['expires_at'], name='room_active_expires_idx',
+                condition=models.Q(is_active=True)
+            ),
+            # Keyset pagination of the dashboard, which lists archived rooms too
+            models.Index(fields=['owner', '-created_at', '-id'], name='room_owner_created_idx'),
+            # Facet filters in room_list (RoomFilterForm), newest first
+            models.Index(fields=['property_type', '-created_at', '-id'], name='room_property_created_idx'),
+            models.Index(fields=['location', '-created_at', '-id'], name='room_location_created_idx'),
+            models.Index(fields=['room_type', '-created_at', '-id'], name='room_roomtype_created_idx'),
+            # Range filters
+            models.Index(fields=['location', 'room_type', 'price'], name='room_location_type_price_idx'),
+            models.Index(fields=['price'], name='room_price_idx'),
+            # Bounding-box prefilter of radius searches
+            models.Index(fields=['latitude', 'longitude'], name='room_lat_lng_idx'),
+            # Newest change stamp for API ETag / Last-Modified
+            models.Index(fields=['updated_at'], name='room_updated_at_idx'),
+        ]
 
     def __str__(self):
         return f"{self.property_type} - {self.title}"
 
+    @property
+    def is_listed(self):
+        return self.is_active and (self.expires_at is None or self.expires_at > timezone.now())
+
 
 # 🖼 Multiple Gallery Images
 class RoomImage(models.Model):
@@ -72,7 +185,156 @@ class RoomImage(models.Model):
         on_delete=models.CASCADE,
         related_name='images'
     )
-    image = models.ImageField(upload_to='rooms/')
+    image = models.ImageField(upload_to='rooms/', blank=True)
+
+    # ⏳ Upload state: gallery files are pushed to storage in the background
+    STATUS_PENDING = 'pending'
+    STATUS_READY = 'ready'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_READY, 'Ready'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_READY
+    )
+
+    # SHA-256 of the ingested pixels, identical photos share one stored file
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
+
+    def __str__(self):
+        return f"Image for {self.room.title}"
+
+
+# 📤 Gallery upload waiting for a worker (DB-backed stand-in for a job queue)
+class PendingUpload(models.Model):
+    room_image = models.OneToOneField(
+        RoomImage,
+        on_delete=models.CASCADE,
+        related_name='pending_upload'
+    )
+    file_name = models.CharField(max_length=255)
+    content = models.BinaryField()
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Pending upload {self.file_name}"
+
+
+# 📊 Materialized facet counts for the filter bar (see rooms/facets.py)
+class RoomFacetCount(models.Model):
+    property_type = models.CharField(max_length=20)
+    location = models.CharField(max_length=50)
+    room_type = models.CharField(max_length=20)
+    price_bucket = models.PositiveSmallIntegerField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['property_type', 'location', 'room_type', 'price_bucket'],
+                name='room_facet_unique'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.property_type}/{self.location}/{self.room_type}/{self.price_bucket}: {self.count}"
+
+
+# 🔍 SQLite FTS5 shadow table for room search (see rooms/search.py)
+class RoomSearchIndex(models.Model):
+    room = models.OneToOneField(
+        Room,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        related_name='search_entry'
+    )
+    document = FTSDocumentField(db_column='rooms_room_fts')
+    rank = models.FloatField(db_column='rank')
+
+    class Meta:
+        managed = False
+        db_table = 'rooms_room_fts'
+
+
+# 🔔 A room_list search a user wants to hear about (see rooms/saved_searches.py)
+class SavedSearch(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='saved_searches'
+    )
+    # Normalized: the search terms joined by single spaces
+    query = models.CharField(max_length=200, blank=True)
+    property_type = models.CharField(max_length=20, choices=Room.PROPERTY_TYPE_CHOICES, blank=True)
+    # Every term has a SavedSearchTerm row; a room must match all of them
+    term_count = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_seen_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'query', 'property_type'],
+                name='saved_search_unique'
+            ),
+        ]
+        indexes = [
+            # Term-less searches match every new room (saved_searches.candidate_searches)
+            models.Index(fields=['term_count'], name='saved_search_term_count_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.query or 'Anything'} ({self.property_type or 'any property'})"
+
+
+# Inverted index: search term -> saved searches that need it
+class SavedSearchTerm(models.Model):
+    search = models.ForeignKey(
+        SavedSearch,
+        on_delete=models.CASCADE,
+        related_name='terms'
+    )
+    term = models.CharField(max_length=50)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['search', 'term'], name='saved_search_term_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['term'], name='saved_search_term_idx'),
+        ]
+
+    def __str__(self):
+        return self.term
+
+
+# A new room that matched a saved search since the user last opened it
+class SavedSearchMatch(models.Model):
+    search = models.ForeignKey(
+        SavedSearch,
+        on_delete=models.CASCADE,
+        related_name='matches'
+    )
+    room = models.ForeignKey(
+        Room,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['search', 'room'], name='saved_search_match_unique'),
+        ]
 
     def __str__(self):
-        return f"Image for {self.room.title}"
\ No newline at end of file
+        return f"{self.search} -> {self.room_id}"
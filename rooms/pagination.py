@@ -0,0 +1,130 @@
+"""
+Keyset (cursor) pagination for room listings.
+
+Instead of OFFSET, each page remembers the sort key of its last row in an
+opaque cursor. The next page asks for rows strictly "after" that key, so the
+database can seek straight to it via the (created_at, id) index and page N
+costs the same as page 1.
+"""
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+# Default sort for listings: newest first, id breaks ties between rooms
+# created in the same instant.
+DEFAULT_ORDERING = ('-created_at', '-id')
+
+
+def get_page_size():
+    return getattr(settings, 'ROOMS_PAGE_SIZE', 12)
+
+
+def encode_cursor(values):
+    """Pack the sort-key values of a row into a URL-safe opaque string."""
+    raw = json.dumps(values, default=str, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, size, fields=None):
+    """
+    Return the list of sort-key values stored in cursor, or None if the
+    cursor is missing, tampered with or doesn't match the ordering. With
+    fields (one model field per sort key), values are converted by each
+    field's to_python() and a value of the wrong type also gives None.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, binascii.Error):
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    if fields is not None:
+        try:
+            values = [field.to_python(value) for field, value in zip(fields, values)]
+        except (ValidationError, TypeError, ValueError):
+            return None
+        # Sort keys are never NULL; a null can only come from a forged cursor
+        if any(value is None for value in values):
+            return None
+    return values
+
+
+def _ordering_fields(queryset, ordering):
+    """The field behind each sort key: a model field or an annotation's output field."""
+    fields = []
+    for key in ordering:
+        name = key.lstrip('-')
+        annotation = queryset.query.annotations.get(name)
+        fields.append(annotation.output_field if annotation is not None else queryset.model._meta.get_field(name))
+    return fields
+
+
+def _after(ordering, values):
+    """
+    Build the "row comes after cursor" condition for a multi-column ordering:
+    (a < x) OR (a = x AND b < y) OR (a = x AND b = y AND c < z) ...
+    """
+    condition = Q()
+    equal = Q()
+    for key, value in zip(ordering, values):
+        field = key.lstrip('-')
+        lookup = 'lt' if key.startswith('-') else 'gt'
+        condition |= equal & Q(**{f'{field}__{lookup}': value})
+        equal &= Q(**{field: value})
+    return condition
+
+
+def paginate_keyset(queryset, cursor=None, page_size=None, ordering=DEFAULT_ORDERING):
+    """
+    Return (items, next_cursor) for the page of queryset that starts after
+    cursor. next_cursor is None on the last page.
+    """
+    page_size = page_size or get_page_size()
+    # Fetch one extra row to know whether another page exists
+    items = list(_page_queryset(queryset, cursor, ordering)[:page_size + 1])
+    return _split_page(items, page_size, ordering)
+
+
+async def apaginate_keyset(queryset, cursor=None, page_size=None, ordering=DEFAULT_ORDERING):
+    """paginate_keyset for async views."""
+    page_size = page_size or get_page_size()
+    items = [item async for item in _page_queryset(queryset, cursor, ordering)[:page_size + 1]]
+    return _split_page(items, page_size, ordering)
+
+
+def _page_queryset(queryset, cursor, ordering):
+    queryset = queryset.order_by(*ordering)
+    values = decode_cursor(cursor, len(ordering), _ordering_fields(queryset, ordering))
+    if values is not None:
+        queryset = queryset.filter(_after(ordering, values))
+    return queryset
+
+
+def _split_page(items, page_size, ordering):
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        last = items[-1]
+        next_cursor = encode_cursor([_key_value(last, key.lstrip('-')) for key in ordering])
+    return items, next_cursor
+
+
+def _key_value(item, field):
+    # Model instances, or dicts from .values()
+    return item[field] if isinstance(item, dict) else getattr(item, field)
+
+
+def page_querystring(request, next_cursor):
+    """Current querystring with the cursor swapped for next_cursor."""
+    params = request.GET.copy()
+    params.pop('cursor', None)
+    if next_cursor:
+        params['cursor'] = next_cursor
+    return params.urlencode()
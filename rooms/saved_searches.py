@@ -0,0 +1,123 @@
+"""
+Saved searches: "N new since last visit" on the dashboard.
+
+A saved search is a room_list query (q and property). Its terms are
+stored in SavedSearchTerm, an inverted index from term to search, so a
+new room is matched once, when it is created, instead of every saved
+search being re-run against the Room table:
+
+1. tokenize the room the way rooms/search.py does and take every prefix
+   of every token (search terms are prefix matches, "apart" finds
+   "apartment");
+2. one indexed query fetches the (search, term) rows whose term is one of
+   those prefixes;
+3. a search whose terms were all found, or that has no terms, is a
+   candidate; its property type, owner and age are checked in Python.
+
+Matches are SavedSearchMatch rows (unique per search and room, so matching
+the same room twice is harmless) and opening a saved search clears them.
+New rooms are matched by a signal (rooms/signals.py); bulk imports and
+seeding call match_rooms() per batch, and `manage.py match_saved_searches`
+backfills rooms that got in some other way.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import SavedSearch, SavedSearchMatch, SavedSearchTerm
+from .search import search_terms
+
+MAX_TERMS = 8
+MAX_TERM_LENGTH = SavedSearchTerm._meta.get_field('term').max_length
+# Terms per IN (...) query, well under SQLite's variable limit
+LOOKUP_BATCH = 500
+
+
+def normalize_query(query):
+    """Unique search terms, in order, as stored on SavedSearch.query."""
+    terms = [term[:MAX_TERM_LENGTH] for term in search_terms(query)]
+    return list(dict.fromkeys(terms))[:MAX_TERMS]
+
+
+@transaction.atomic
+def save_search(user, query, property_type=''):
+    """The user's saved search for query and property_type, created if new."""
+    terms = normalize_query(query)
+    search, created = SavedSearch.objects.get_or_create(
+        user=user,
+        query=' '.join(terms),
+        property_type=property_type or '',
+        defaults={'term_count': len(terms)},
+    )
+    if created:
+        SavedSearchTerm.objects.bulk_create([SavedSearchTerm(search=search, term=term) for term in terms])
+    return search, created
+
+
+def mark_seen(search):
+    """The user opened the search: nothing is new any more."""
+    search.matches.all().delete()
+    search.last_seen_at = timezone.now()
+    search.save(update_fields=['last_seen_at'])
+
+
+def room_prefixes(room):
+    """Every prefix of every word a search on this room could match."""
+    text = ' '.join([room.title, room.description, room.location, room.room_type, room.property_type])
+    return {
+        token[:length]
+        for token in search_terms(text)
+        for length in range(1, min(len(token), MAX_TERM_LENGTH) + 1)
+    }
+
+
+def candidate_searches(search_ids):
+    """
+    Searches that could match: those with terms found in the batch, and
+    term-less ones. Both sides of the OR are index lookups (primary key and
+    term_count), and no ordering, so the saved searches are never scanned.
+    """
+    return SavedSearch.objects.filter(Q(id__in=list(search_ids)) | Q(term_count=0)).order_by().values_list(
+        'id', 'user_id', 'property_type', 'term_count', 'created_at'
+    )
+
+
+def match_rooms(rooms):
+    """
+    Record the saved searches each of rooms (saved, newly created) matches.
+    A few queries per batch, however many searches are saved. Returns the
+    number of (search, room) matches found.
+    """
+    rooms = [room for room in rooms if room.is_listed]
+    if not rooms:
+        return 0
+    prefixes = {room.pk: room_prefixes(room) for room in rooms}
+
+    # Terms of each search that some room in the batch has
+    found = defaultdict(set)
+    lookup = sorted(set().union(*prefixes.values()))
+    for start in range(0, len(lookup), LOOKUP_BATCH):
+        rows = SavedSearchTerm.objects.filter(term__in=lookup[start:start + LOOKUP_BATCH])
+        for search_id, term in rows.values_list('search_id', 'term'):
+            found[search_id].add(term)
+
+    matches = []
+    for search_id, user_id, property_type, term_count, created_at in candidate_searches(found):
+        terms = found.get(search_id, set())
+        if len(terms) != term_count:
+            continue
+        for room in rooms:
+            # Only rooms that showed up after the search was saved are "new"
+            if (
+                room.created_at >= created_at
+                and room.owner_id != user_id
+                and property_type in ('', room.property_type)
+                and terms <= prefixes[room.pk]
+            ):
+                matches.append(SavedSearchMatch(search_id=search_id, room_id=room.pk))
+
+    # ignore_conflicts: re-matching a room (backfills) doesn't count it twice
+    SavedSearchMatch.objects.bulk_create(matches, ignore_conflicts=True)
+    return len(matches)
@@ -0,0 +1,143 @@
+"""
+Full-text search for room listings.
+
+- PostgreSQL: to_tsvector over title, description, location and types,
+  served by the GIN expression index created in migration 0008.
+- SQLite: an FTS5 shadow table (rooms_room_fts) whose rowid is the room id,
+  kept in sync by the signals in rooms/signals.py.
+- Anything else: the old icontains OR, so search never breaks.
+
+Every backend annotates ``search_rank`` where lower is better, so callers
+can order and keyset-paginate on it the same way everywhere.
+"""
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, F, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'rooms_room_fts'
+
+# Must stay identical to the expression indexed in migration 0008, otherwise
+# PostgreSQL can't use the GIN index.
+PG_DOCUMENT = (
+    "to_tsvector('english', "
+    "coalesce(\"rooms_room\".\"title\", '') || ' ' || "
+    "coalesce(\"rooms_room\".\"description\", '') || ' ' || "
+    "coalesce(\"rooms_room\".\"location\", '') || ' ' || "
+    "coalesce(\"rooms_room\".\"room_type\", '') || ' ' || "
+    "coalesce(\"rooms_room\".\"property_type\", ''))"
+)
+
+# Best match first, newest first among equally good matches
+SEARCH_ORDERING = ('search_rank', '-created_at', '-id')
+
+_fts_available = {}
+
+
+def get_backend():
+    if connection.vendor == 'postgresql':
+        return 'postgres'
+    if connection.vendor == 'sqlite':
+        if connection.alias not in _fts_available:
+            _fts_available[connection.alias] = (
+                FTS_TABLE in connection.introspection.table_names()
+            )
+        if _fts_available[connection.alias]:
+            return 'fts5'
+    return 'like'
+
+
+def search_terms(query):
+    """Split a user query into plain word tokens (no search syntax)."""
+    return re.findall(r'\w+', (query or '').lower())
+
+
+def search_rooms(queryset, query):
+    """Filter queryset to rooms matching query and annotate search_rank."""
+    terms = search_terms(query)
+    if not terms:
+        # Still annotated, so callers can order by search_rank
+        return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    backend = get_backend()
+
+    if backend == 'postgres':
+        # Prefix match every word, all words required
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        return queryset.filter(
+            RawSQL(f"{PG_DOCUMENT} @@ to_tsquery('english', %s)", [tsquery], output_field=BooleanField())
+        ).annotate(
+            # ts_rank is a float4, which doesn't survive the round trip through
+            # a Python float: as float8, a cursor's rank compares equal to the
+            # row it came from, so keyset pages neither repeat nor skip ties
+            search_rank=RawSQL(
+                f"(-ts_rank({PG_DOCUMENT}, to_tsquery('english', %s)))::double precision",
+                [tsquery], output_field=FloatField(),
+            )
+        )
+
+    if backend == 'fts5':
+        # "word"* is a prefix match; quoting keeps FTS5 syntax out of user input
+        match = ' '.join(f'"{term}"*' for term in terms)
+        return queryset.filter(
+            search_entry__document__match=match
+        ).annotate(search_rank=F('search_entry__rank'))
+
+    condition = Q()
+    for term in terms:
+        condition &= (
+            Q(title__icontains=term) |
+            Q(location__icontains=term) |
+            Q(property_type__icontains=term) |
+            Q(room_type__icontains=term)
+        )
+    return queryset.filter(condition).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+# 🔄 FTS5 SYNC (SQLite only, no-ops elsewhere)
+
+def index_room(room):
+    if get_backend() != 'fts5':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [room.pk])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, description, location, room_type, property_type) '
+            f'VALUES (%s, %s, %s, %s, %s, %s)',
+            [room.pk, room.title, room.description, room.location, room.room_type, room.property_type],
+        )
+
+
+def index_rooms(rooms):
+    """Index freshly bulk-created rooms in one statement."""
+    if get_backend() != 'fts5' or not rooms:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, description, location, room_type, property_type) '
+            f'VALUES (%s, %s, %s, %s, %s, %s)',
+            [[r.pk, r.title, r.description, r.location, r.room_type, r.property_type] for r in rooms],
+        )
+
+
+def unindex_room(room_id):
+    if get_backend() != 'fts5':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [room_id])
+
+
+def rebuild_index():
+    """Refill the FTS5 table from rooms_room (after bulk writes that skip signals)."""
+    if get_backend() != 'fts5':
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, description, location, room_type, property_type) '
+            f'SELECT id, title, description, location, room_type, property_type FROM rooms_room'
+        )
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+        cursor.execute(f'SELECT count(*) FROM {FTS_TABLE}')
+        return cursor.fetchone()[0]
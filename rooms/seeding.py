@@ -0,0 +1,88 @@
+"""
+Synthetic listings for benchmarks and local development (manage.py
+seed_rooms, bench_views).
+
+Everything is bulk-inserted: owners, rooms spread around the three cities
+with coordinates, and ready gallery rows pointing at placeholder files.
+Search, facet counts and saved-search matches are brought up to date
+per batch, since bulk_create sends no signals. A fixed seed gives the same data every run.
+"""
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+
+from . import facets, saved_searches, search
+from .cache import bump_page_generation
+from .models import Room, RoomImage
+
+CITY_CENTRES = {
+    'Kathmandu': (27.7172, 85.3240),
+    'Pokhara': (28.2096, 83.9856),
+    'Biratnagar': (26.4525, 87.2718),
+}
+ADJECTIVES = ('Sunny', 'Quiet', 'Spacious', 'Cosy', 'Modern', 'Furnished', 'Bright', 'Affordable')
+NOUNS = {'Room': 'room', 'Apartment': 'apartment', 'Hostel': 'hostel bed'}
+NEAR = ('the bus park', 'the lake', 'Thamel', 'the ring road', 'a college', 'the hospital', 'the market')
+PRICE_RANGES = {'Room': (3000, 15000), 'Apartment': (12000, 60000), 'Hostel': (2500, 8000)}
+ROOM_TYPES = {
+    'Room': ('Single', 'Double'),
+    'Apartment': ('1BHK', '2BHK', '3BHK'),
+    'Hostel': ('Shared', 'Single'),
+}
+
+
+def seed_owners(count, rng, prefix='seed'):
+    """Create count owners (unusable passwords, so nobody can log in as them)."""
+    tag = rng.randrange(16 ** 6)
+    users = [User(username=f'{prefix}-{tag:06x}-{i}') for i in range(count)]
+    for user in users:
+        user.set_unusable_password()
+    return User.objects.bulk_create(users, batch_size=1000)
+
+
+def make_room(owner, rng, index):
+    property_type = rng.choice(('Room', 'Room', 'Apartment', 'Hostel'))
+    location = rng.choice(tuple(CITY_CENTRES))
+    lat, lng = CITY_CENTRES[location]
+    low, high = PRICE_RANGES[property_type]
+    near = rng.choice(NEAR)
+    return Room(
+        owner=owner,
+        property_type=property_type,
+        title=f'{rng.choice(ADJECTIVES)} {NOUNS[property_type]} near {near} #{index}',
+        description=f'{rng.choice(ADJECTIVES)} {NOUNS[property_type]} in {location}, '
+                    f'a short walk from {near}. Water and electricity included.',
+        price=rng.randrange(low, high, 500),
+        location=location,
+        room_type=rng.choice(ROOM_TYPES[property_type]),
+        latitude=lat + rng.uniform(-0.05, 0.05),
+        longitude=lng + rng.uniform(-0.05, 0.05),
+        owner_name=owner.username,
+        contact_number=f'98{rng.randrange(10 ** 8):08d}',
+        available_from=date(2026, 1, 1) + timedelta(days=rng.randrange(180)),
+        image=f'rooms/seed/cover_{index % 50}.jpg',
+    )
+
+
+def seed_rooms(count, owners, rng, images_per_room=3, batch_size=1000, start=0):
+    """Bulk-insert count rooms spread over owners. Returns the number of gallery rows."""
+    gallery = 0
+    for offset in range(0, count, batch_size):
+        rooms = Room.objects.bulk_create([
+            make_room(rng.choice(owners), rng, start + offset + i)
+            for i in range(min(batch_size, count - offset))
+        ])
+        images = RoomImage.objects.bulk_create(
+            [
+                RoomImage(room=room, image=f'rooms/seed/gallery_{(room.pk + n) % 50}.jpg')
+                for room in rooms
+                for n in range(rng.randint(0, images_per_room))
+            ],
+            batch_size=batch_size,
+        )
+        gallery += len(images)
+        search.index_rooms(rooms)
+        facets.count_rooms(rooms)
+        saved_searches.match_rooms(rooms)
+    bump_page_generation()
+    return gallery
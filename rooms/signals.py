@@ -0,0 +1,90 @@
+from weakref import WeakKeyDictionary
+
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import facets, saved_searches, search, similar
+from .cache import bump_page_generation, invalidate_room_cards, touch_room
+from .models import Room, RoomImage
+
+
+# 🔍 Keep the SQLite full-text index in step with Room rows
+@receiver(post_save, sender=Room)
+def index_room(sender, instance, **kwargs):
+    search.index_room(instance)
+
+
+@receiver(post_delete, sender=Room)
+def unindex_room(sender, instance, **kwargs):
+    search.unindex_room(instance.pk)
+
+
+# 🧭 Keep this process's similar-rooms index in step
+@receiver(post_save, sender=Room)
+def update_similar_on_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        similar.room_changed(instance)
+
+
+@receiver(post_delete, sender=Room)
+def update_similar_on_delete(sender, instance, **kwargs):
+    similar.room_deleted(instance.pk)
+
+
+# 🔔 Match new rooms against the saved searches, once, on creation
+@receiver(post_save, sender=Room)
+def match_saved_searches(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        saved_searches.match_rooms([instance])
+
+
+# 📊 Keep the facet counts in step (before the page generation bump below,
+# so freshly cached facets are never the old ones)
+@receiver(pre_save, sender=Room)
+def remember_facet_key(sender, instance, raw=False, **kwargs):
+    instance._facet_key_before = None
+    if instance.pk and not raw:
+        old = Room.objects.filter(pk=instance.pk).values(
+            'property_type', 'location', 'room_type', 'price', 'is_active'
+        ).first()
+        if old:
+            instance._facet_key_before = facets.facet_key(Room(**old))
+
+
+@receiver(post_save, sender=Room)
+def update_facets_on_save(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        facets.move(getattr(instance, '_facet_key_before', None), facets.facet_key(instance))
+
+
+@receiver(post_delete, sender=Room)
+def update_facets_on_delete(sender, instance, **kwargs):
+    facets.move(facets.facet_key(instance), None)
+
+
+# 🧊 Drop cached cards and pages when a room or its gallery changes
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+def invalidate_room_cache(sender, instance, **kwargs):
+    invalidate_room_cards(instance)
+    bump_page_generation()
+
+
+# Rooms already touched by a bulk RoomImage delete, so deleting 20 images
+# of one room bumps its updated_at once rather than 20 times
+_touched_by_delete = WeakKeyDictionary()
+
+
+@receiver(post_save, sender=RoomImage)
+@receiver(post_delete, sender=RoomImage)
+def invalidate_gallery_cache(sender, instance, origin=None, **kwargs):
+    # Deleting a Room cascades to its images; the room's own signal covers it
+    if isinstance(origin, Room) or getattr(origin, 'model', None) is Room:
+        return
+    if isinstance(origin, QuerySet):
+        touched = _touched_by_delete.setdefault(origin, set())
+        if instance.room_id in touched:
+            return
+        touched.add(instance.room_id)
+    touch_room(instance.room_id)
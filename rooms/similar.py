@@ -0,0 +1,237 @@
+"""
+"Similar rooms" for room_detail.
+
+Every active room is reduced to a compact feature vector (log price,
+move-in day, room type, coordinates) kept in flat arrays, one set per
+(property_type, location) bucket, sorted by price. That is 41 bytes a
+room, plus an id -> bucket map: about 15 MB for 100k rooms.
+A query bisects to the room's price in its own bucket, scores the
+SIMILAR_WINDOW neighbours on either side and keeps the best; a small
+bucket is topped up from the same property type in the other cities.
+
+The index lives in process memory and is built on first use. Saves and
+deletes in this process update it in place (rooms/signals.py). Changes
+made elsewhere (other workers, bulk imports, sweep_expired) are pulled
+every SIMILAR_INDEX_REFRESH seconds by their updated_at, and the index is
+rebuilt every SIMILAR_INDEX_REBUILD seconds to drop rooms deleted by
+other processes.
+
+The panel's HTML is cached per room under the page generation, so a
+detail view normally costs one cache lookup and no query.
+"""
+import heapq
+import math
+import time
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import timedelta
+from threading import RLock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .cache import get_anonymous_page_timeout, get_page_generation
+from .geo import haversine_km
+from .models import Room
+
+FIELDS = ('id', 'property_type', 'location', 'room_type', 'price', 'available_from', 'latitude', 'longitude')
+ROOM_TYPES = [value for value, _ in Room.ROOM_TYPE_CHOICES]
+
+# Scoring: 0 is identical; each term adds roughly 1 per "noticeably different"
+PRICE_SCALE = math.log(1.25)      # 25% dearer or cheaper
+ROOM_TYPE_PENALTY = 1.0
+AVAILABILITY_SCALE_DAYS = 30
+DISTANCE_SCALE_KM = 3
+OTHER_CITY_PENALTY = 3.0          # top-up candidates from another location
+MAX_TERM = 2.0                    # cap per term, so one outlier feature doesn't dominate
+
+
+def get_similar_count():
+    return getattr(settings, 'SIMILAR_ROOMS_COUNT', 4)
+
+
+def get_window():
+    return getattr(settings, 'SIMILAR_WINDOW', 50)
+
+
+def features(row):
+    """(bucket key, vector) of a Room or a values() dict."""
+    get = row.get if isinstance(row, dict) else lambda name: getattr(row, 'pk' if name == 'id' else name)
+    lat, lng = get('latitude'), get('longitude')
+    room_type = get('room_type')
+    return (get('property_type'), get('location')), (
+        math.log(max(get('price') or 1, 1)),
+        get('id'),
+        get('available_from').toordinal(),
+        ROOM_TYPES.index(room_type) if room_type in ROOM_TYPES else -1,
+        math.nan if lat is None else lat,
+        math.nan if lng is None else lng,
+    )
+
+
+class _Bucket:
+    """Parallel arrays, one slot per room, ordered by log price."""
+    __slots__ = ('log_prices', 'ids', 'days', 'room_types', 'lats', 'lngs')
+
+    def __init__(self, vectors=()):
+        vectors = sorted(vectors)
+        self.log_prices = array('d', (v[0] for v in vectors))
+        self.ids = array('q', (v[1] for v in vectors))
+        self.days = array('l', (v[2] for v in vectors))
+        self.room_types = array('b', (v[3] for v in vectors))
+        self.lats = array('d', (v[4] for v in vectors))
+        self.lngs = array('d', (v[5] for v in vectors))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def insert(self, vector):
+        i = bisect_left(self.log_prices, vector[0])
+        for column, value in zip((self.log_prices, self.ids, self.days, self.room_types, self.lats, self.lngs), vector):
+            column.insert(i, value)
+
+    def remove(self, room_id):
+        i = self.ids.index(room_id)
+        for column in (self.log_prices, self.ids, self.days, self.room_types, self.lats, self.lngs):
+            del column[i]
+
+    def scan(self, vector, window, penalty=0.0):
+        """(score, room id) of the rooms nearest in price, scored on every feature."""
+        log_price, room_id, day, room_type, lat, lng = vector
+        middle = bisect_left(self.log_prices, log_price)
+        scored = []
+        for j in range(max(0, middle - window), min(len(self.ids), middle + window)):
+            other = self.ids[j]
+            if other == room_id:
+                continue
+            score = penalty + min(abs(self.log_prices[j] - log_price) / PRICE_SCALE, MAX_TERM)
+            score += min(abs(self.days[j] - day) / AVAILABILITY_SCALE_DAYS, MAX_TERM)
+            if self.room_types[j] != room_type:
+                score += ROOM_TYPE_PENALTY
+            if not penalty and not math.isnan(lat) and not math.isnan(self.lats[j]):
+                score += min(haversine_km(lat, lng, self.lats[j], self.lngs[j]) / DISTANCE_SCALE_KM, MAX_TERM)
+            scored.append((score, other))
+        return scored
+
+
+class SimilarIndex:
+
+    def __init__(self, rows=()):
+        grouped = defaultdict(list)
+        self.where = {}  # room id -> bucket key
+        for row in rows:
+            key, vector = features(row)
+            grouped[key].append(vector)
+            self.where[vector[1]] = key
+        self.buckets = {key: _Bucket(vectors) for key, vectors in grouped.items()}
+
+    @classmethod
+    def build(cls):
+        return cls(Room.objects.active().values(*FIELDS).iterator(chunk_size=5000))
+
+    def __len__(self):
+        return len(self.where)
+
+    def add(self, row):
+        key, vector = features(row)
+        self.discard(vector[1])
+        self.buckets.setdefault(key, _Bucket()).insert(vector)
+        self.where[vector[1]] = key
+
+    def discard(self, room_id):
+        key = self.where.pop(room_id, None)
+        if key is not None:
+            self.buckets[key].remove(room_id)
+
+    def nearest(self, room, count):
+        """Ids of the count rooms most like room, best first."""
+        (property_type, location), vector = features(room)
+        window = get_window()
+        scored = []
+        if (property_type, location) in self.buckets:
+            scored = self.buckets[property_type, location].scan(vector, window)
+        if len(scored) < count:
+            for (other_type, other_location), bucket in self.buckets.items():
+                if other_type == property_type and other_location != location:
+                    scored += bucket.scan(vector, window, penalty=OTHER_CITY_PENALTY)
+        return [room_id for _, room_id in heapq.nsmallest(count, scored)]
+
+
+_lock = RLock()
+_index = None
+_built_at = _refreshed_at = 0.0   # time.monotonic()
+_synced_since = None              # updated_at already pulled up to here
+
+
+def get_index():
+    global _index, _built_at, _refreshed_at, _synced_since
+    with _lock:
+        now = time.monotonic()
+        if _index is None or now - _built_at > getattr(settings, 'SIMILAR_INDEX_REBUILD', 3600):
+            # Overlap a little: a row saved while we read may carry an earlier stamp
+            since = timezone.now() - timedelta(seconds=1)
+            _index = SimilarIndex.build()
+            _built_at = _refreshed_at = now
+            _synced_since = since
+        elif now - _refreshed_at > getattr(settings, 'SIMILAR_INDEX_REFRESH', 60):
+            since = timezone.now() - timedelta(seconds=1)
+            pull_changes(_index, _synced_since)
+            _refreshed_at = now
+            _synced_since = since
+        return _index
+
+
+def pull_changes(index, since):
+    """Apply rows whose updated_at moved past since (bulk_create sets it too)."""
+    now = timezone.now()
+    changed = Room.objects.filter(updated_at__gte=since).values(*FIELDS, 'is_active', 'expires_at')
+    for row in changed.iterator(chunk_size=2000):
+        if row['is_active'] and (row['expires_at'] is None or row['expires_at'] > now):
+            index.add(row)
+        else:
+            index.discard(row['id'])
+
+
+def room_changed(room):
+    """Keep this process's index in step with a saved room (signal)."""
+    with _lock:
+        if _index is None:
+            return
+        if room.is_listed:
+            _index.add(room)
+        else:
+            _index.discard(room.pk)
+
+
+def room_deleted(room_id):
+    with _lock:
+        if _index is not None:
+            _index.discard(room_id)
+
+
+def reset():
+    """Drop the index (tests)."""
+    global _index
+    with _lock:
+        _index = None
+
+
+def similar_rooms(room, count=None):
+    """The rooms most like room, best first (one query for the rooms themselves)."""
+    with _lock:
+        ids = get_index().nearest(room, count or get_similar_count())
+    rooms = Room.objects.active().in_bulk(ids)
+    return [rooms[room_id] for room_id in ids if room_id in rooms]
+
+
+def similar_panel(room):
+    """The panel's HTML, cached until the next Room change."""
+    key = f'rooms:similar:{get_page_generation()}:{room.pk}'
+    html = cache.get(key)
+    if html is None:
+        html = render_to_string('rooms/similar_rooms.html', {'rooms': similar_rooms(room)})
+        cache.set(key, html, get_anonymous_page_timeout())
+    return html
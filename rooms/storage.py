@@ -0,0 +1,171 @@
+"""
+Media storage backends besides Cloudinary (settings.MEDIA_STORAGE).
+
+ShardedFileSystemStorage ('local'): files under MEDIA_ROOT, spread over
+hashed subdirectories (rooms/photo.jpg is saved as rooms/5d/41/photo.jpg)
+so no directory grows to hundreds of thousands of entries. Files are
+written once and never modified, so reads map them into memory instead of
+copying them through a buffer.
+
+FakeCloudinaryStorage ('fake-cloudinary'): an in-process stand-in for
+MediaCloudinaryStorage. It names files the way Cloudinary does (folder,
+random suffix, no extension) and hands out the same delivery URLs, keeps
+the bytes in a dict, sleeps FAKE_CLOUDINARY_LATENCY_MS (plus up to
+FAKE_CLOUDINARY_JITTER_MS) per API call and records every call, so
+uploads, thumbnails and URLs can be tested and load-tested offline.
+"""
+import hashlib
+import mmap
+import os
+import posixpath
+import random
+import re
+import string
+import threading
+import time
+
+from django.conf import settings
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import FileSystemStorage, Storage
+from django.utils.deconstruct import deconstructible
+
+from .media_urls import FAKE_CLOUDINARY_BACKEND, _cloudinary_prefix, cloudinary_url, get_cloud_name
+
+SHARD_WIDTH = 2   # hex digits per directory level: 256 folders per level
+
+
+class MappedFile(File):
+    """A read-only File over an mmap of the stored file."""
+
+    def __init__(self, mapped, name):
+        super().__init__(mapped, name)
+        self.size = len(mapped)
+        self.mode = 'rb'
+
+
+@deconstructible
+class ShardedFileSystemStorage(FileSystemStorage):
+
+    def __init__(self, shard_depth=None, **kwargs):
+        super().__init__(**kwargs)
+        self.shard_depth = getattr(settings, 'MEDIA_SHARD_DEPTH', 2) if shard_depth is None else shard_depth
+        self._shard_re = re.compile(f'[0-9a-f]{{{SHARD_WIDTH}}}')
+
+    def shard_name(self, name):
+        """rooms/photo.jpg -> rooms/5d/41/photo.jpg (names already sharded are kept)."""
+        name = name.replace('\\', '/')
+        directory, base = posixpath.split(name)
+        if self.shard_depth <= 0 or self.is_sharded(directory):
+            return name
+        digest = hashlib.md5(base.encode(), usedforsecurity=False).hexdigest()
+        shards = [digest[i * SHARD_WIDTH:(i + 1) * SHARD_WIDTH] for i in range(self.shard_depth)]
+        return posixpath.join(directory, *shards, base)
+
+    def is_sharded(self, directory):
+        parts = directory.split('/')[-self.shard_depth:] if directory else []
+        return len(parts) == self.shard_depth and all(self._shard_re.fullmatch(part) for part in parts)
+
+    def get_available_name(self, name, max_length=None):
+        # Every save path (FieldFile.save, storage.save) comes through here
+        return super().get_available_name(self.shard_name(name), max_length=max_length)
+
+    def _open(self, name, mode='rb'):
+        if mode != 'rb':
+            return super()._open(name, mode)
+        path = self.path(name)
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # mmap can't map an empty file
+                return File(open(path, 'rb'))
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return MappedFile(mapped, path)
+
+
+@deconstructible
+class FakeCloudinaryStorage(Storage):
+
+    # Shared by every instance, like the one real Cloudinary account
+    files = {}      # public id -> bytes
+    calls = []      # (operation, public id, seconds)
+    _lock = threading.Lock()
+
+    def __init__(self, latency_ms=None, jitter_ms=None):
+        self.latency_ms = getattr(settings, 'FAKE_CLOUDINARY_LATENCY_MS', 0) if latency_ms is None else latency_ms
+        self.jitter_ms = getattr(settings, 'FAKE_CLOUDINARY_JITTER_MS', 0) if jitter_ms is None else jitter_ms
+
+    @classmethod
+    def reset(cls):
+        """Forget every file and call (tests, between benchmark runs)."""
+        with cls._lock:
+            cls.files.clear()
+            cls.calls.clear()
+
+    def _api_call(self, operation, name):
+        delay = (self.latency_ms + random.uniform(0, self.jitter_ms)) / 1000
+        if delay:
+            time.sleep(delay)
+        with self._lock:
+            self.calls.append((operation, name, delay))
+
+    def _save(self, name, content):
+        # use_filename=True: "<prefix><folder>/<stem>_<6 random chars>", extension dropped
+        folder, base = posixpath.split(name.replace('\\', '/'))
+        stem = os.path.splitext(base)[0]
+        suffix = ''.join(random.choices(string.ascii_lowercase + string.digits, k=6))
+        public_id = _cloudinary_prefix() + posixpath.join(folder, f'{stem}_{suffix}')
+        content.seek(0)
+        data = content.read()
+        self._api_call('upload', public_id)
+        with self._lock:
+            self.files[public_id] = data
+        return public_id
+
+    def _open(self, name, mode='rb'):
+        self._api_call('download', name)
+        try:
+            data = self.files[name]
+        except KeyError:
+            raise FileNotFoundError(name)
+        file = ContentFile(data, name=name)
+        file.mode = mode
+        return file
+
+    def delete(self, name):
+        self._api_call('destroy', name)
+        with self._lock:
+            self.files.pop(name, None)
+
+    def delete_resources(self, public_ids, **options):
+        """cloudinary.api.delete_resources: up to 100 ids in one call."""
+        self._api_call('delete_resources', ','.join(public_ids))
+        with self._lock:
+            for public_id in public_ids:
+                self.files.pop(public_id, None)
+
+    def exists(self, name):
+        self._api_call('head', name)
+        return name in self.files
+
+    def size(self, name):
+        self._api_call('head', name)
+        return len(self.files[name]) if name in self.files else None
+
+    def get_available_name(self, name, max_length=None):
+        # Names get a random suffix in _save, like Cloudinary's
+        return name if max_length is None else name[:max_length]
+
+    def listdir(self, path):
+        path = path.rstrip('/') + '/' if path else ''
+        directories, names = set(), []
+        for public_id in list(self.files):
+            if public_id.startswith(path):
+                rest = public_id[len(path):]
+                if '/' in rest:
+                    directories.add(rest.split('/', 1)[0])
+                else:
+                    names.append(rest)
+        return sorted(directories), sorted(names)
+
+    def url(self, name):
+        # Built locally, exactly as for the real storage: no API call
+        return cloudinary_url(name, get_cloud_name(FAKE_CLOUDINARY_BACKEND), _cloudinary_prefix())
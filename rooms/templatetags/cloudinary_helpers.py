@@ -5,20 +5,44 @@ Fixes img src pointing to Render domain (e.g. /rooms/ap1.jpg) instead of Cloudin
 from django import template
 from django.conf import settings
 
+from rooms.media_urls import build_media_url, build_srcset
+
 register = template.Library()
 
 
 @register.simple_tag
-def cloudinary_image_url(image_field):
+def cloudinary_image_url(image_field, width=None):
+    """
+    Return the image URL. Built from the stored name without touching the
+    storage backend (see rooms/media_urls.py); falls back to the storage's
+    URL, made absolute for Cloudinary if it's relative (e.g. on Render).
+    Pass width to get a resized copy (Cloudinary transformation or a local
+    Pillow thumbnail).
+    """
+    if not image_field:
+        return ''
+    url = build_media_url(image_field.name, width)
+    if url is not None:
+        return url
+    return storage_image_url(image_field)
+
+
+@register.simple_tag
+def image_srcset(image_field):
     """
-    Return the image URL. Use storage's URL when possible; if it's relative
-    (e.g. on Render), build full Cloudinary URL so images load.
+    srcset value with one candidate per ROOM_IMAGE_WIDTHS entry. Empty when
+    the storage can't produce resized copies; browsers then use src.
     """
     if not image_field:
         return ''
+    return build_srcset(image_field.name)
+
+
+def storage_image_url(image_field):
+    """The original path: ask the storage, patch relative URLs."""
     url = image_field.url
     # If storage returned a relative path, build full Cloudinary URL
-    if getattr(settings, 'USE_CLOUDINARY', False) and url.startswith('/'):
+    if getattr(settings, 'MEDIA_STORAGE', 'cloudinary') == 'cloudinary' and url.startswith('/'):
         cloud_name = getattr(settings, 'CLOUDINARY_CLOUD_NAME', None)
         if cloud_name:
             url = f'https://res.cloudinary.com/{cloud_name}/image/upload/{url.lstrip("/")}'
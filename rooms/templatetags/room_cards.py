@@ -0,0 +1,33 @@
+"""
+{% room_card room 'list' %}: one listing card from rooms/room_card.html,
+served from the fragment cache (see rooms/cache.py).
+
+{% prefetch_room_cards rooms 'list' %}: fetch a page's cards in one batch
+before the loop that draws them.
+
+{% similar_rooms room %}: the "Similar rooms" panel (see rooms/similar.py).
+"""
+from django import template
+
+from django.utils.safestring import mark_safe
+
+from rooms import cache
+from rooms.similar import similar_panel
+
+register = template.Library()
+
+
+@register.simple_tag
+def room_card(room, variant='list'):
+    return cache.render_room_card(room, variant)
+
+
+@register.simple_tag
+def prefetch_room_cards(rooms, variant='list'):
+    cache.prefetch_room_cards(rooms, variant)
+    return ''
+
+
+@register.simple_tag
+def similar_rooms(room):
+    return mark_safe(similar_panel(room))
@@ -1,3 +1,1416 @@
-from django.test import TestCase
+import io
+import json
+import logging
+import re
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from itertools import combinations
+from unittest import addModuleCleanup, mock, skipUnless
 
-# Create your tests here.
+import cloudinary.utils
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from . import health, metrics, saved_searches, similar, view_counts
+from .cache import card_cache_keys
+from .facets import facet_summary, rebuild_facets
+from .forms import RoomFilterForm, RoomForm, filter_listings
+from .geo import bounding_box, filter_near, haversine_km
+from .media_urls import build_media_url, build_srcset, clear_media_url_cache
+from .models import PendingUpload, Room, RoomFacetCount, RoomImage, SavedSearch, SavedSearchMatch
+from .pagination import decode_cursor, encode_cursor, paginate_keyset
+from .search import SEARCH_ORDERING, search_rooms
+from .storage import FakeCloudinaryStorage, MappedFile, ShardedFileSystemStorage
+from .ingest import ingest_image
+from .uploads import MAX_ATTEMPTS, dispatch, process_upload
+
+
+def setUpModule():
+    # One timing line per request would bury the test output
+    timing = logging.getLogger('rooms.timing')
+    addModuleCleanup(timing.setLevel, timing.level)
+    timing.setLevel(logging.WARNING)
+    # Views counted per worker would be flushed at exit, after the test database is gone
+    addModuleCleanup(view_counts.reset)
+
+
+def make_room(owner, **kwargs):
+    fields = {
+        'title': 'Sunny room',
+        'description': 'Close to the bus park',
+        'price': 8000,
+        'location': 'Kathmandu',
+        'room_type': 'Single',
+        'property_type': 'Room',
+        'owner_name': 'Ram',
+        'contact_number': '9800000000',
+        'available_from': date(2026, 1, 1),
+    }
+    fields.update(kwargs)
+    return Room.objects.create(owner=owner, **fields)
+
+
+# Image URLs in tests are built by the local storage, never Cloudinary
+LOCAL_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+class QueryBudgetMixin:
+    """
+    Pin how many queries a view may run. Budgets are upper bounds, so a
+    page that gets cheaper still passes; one that grows an N+1 fails and
+    prints every query it ran.
+    """
+
+    def assertQueryBudget(self, budget, url, data=None, method='get'):
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data)
+        self.assertLess(response.status_code, 400, url)
+        if len(queries) > budget:
+            executed = '\n'.join(
+                f'{i}. {query["sql"]}' for i, query in enumerate(queries.captured_queries, 1)
+            )
+            self.fail(f'{url} ran {len(queries)} queries, budget is {budget}:\n{executed}')
+        return response
+
+
+def make_jpeg(name='photo.jpg', size=(800, 600), color='green', **save_kwargs):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, format='JPEG', **save_kwargs)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+def room_post_data(**kwargs):
+    data = {
+        'title': 'New listing',
+        'description': 'Bright and quiet',
+        'price': 9000,
+        'location': 'Pokhara',
+        'room_type': 'Single',
+        'property_type': 'Room',
+        'owner_name': 'Sita',
+        'contact_number': '9811111111',
+        'available_from': '2026-02-01',
+    }
+    data.update(kwargs)
+    return data
+
+
+class MediaRootMixin:
+    """Run each test against a throwaway MEDIA_ROOT on local storage."""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.media_root = Path(media_root.name)
+        settings_override = override_settings(
+            STORAGES=LOCAL_STORAGES, MEDIA_ROOT=media_root.name, MEDIA_URL='/media/'
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
+@override_settings(ROOMS_PAGE_SIZE=2)
+class KeysetPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='pass12345')
+        cls.rooms = [make_room(cls.owner, title=f'Room {i}') for i in range(5)]
+
+    def test_cursor_round_trip(self):
+        cursor = encode_cursor(['2026-01-01 00:00:00+00:00', 7])
+        self.assertEqual(decode_cursor(cursor, 2), ['2026-01-01 00:00:00+00:00', 7])
+        self.assertIsNone(decode_cursor('not-a-cursor', 2))
+
+    def test_room_list_walks_every_room_once(self):
+        seen = []
+        query = ''
+        while True:
+            response = self.client.get(reverse('room_list') + '?' + query)
+            seen += [room.id for room in response.context['rooms']]
+            if not response.context['next_cursor']:
+                break
+            query = response.context['next_query']
+        self.assertEqual(seen, [room.id for room in reversed(self.rooms)])
+
+    def test_bad_cursor_falls_back_to_first_page(self):
+        response = self.client.get(reverse('room_list'), {'cursor': '!!!'})
+        self.assertEqual(len(response.context['rooms']), 2)
+
+    def test_type_tampered_cursor_falls_back_to_first_page(self):
+        for values in (['x', 'y'], [None, None], [{}, []]):
+            cursor = encode_cursor(values)
+            response = self.client.get(reverse('room_list'), {'cursor': cursor})
+            self.assertEqual(len(response.context['rooms']), 2)
+            self.assertEqual(self.client.get(reverse('api_room_list'), {'cursor': cursor}).status_code, 200)
+        response = self.client.get(reverse('room_list'), {'q': 'room', 'cursor': encode_cursor(['x', 'y', 'z'])})
+        self.assertEqual(len(response.context['rooms']), 2)
+
+
+class SearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='pass12345')
+        cls.lakeside = make_room(cls.owner, title='Lakeside apartment', location='Pokhara', property_type='Apartment')
+        cls.mention = make_room(cls.owner, title='Quiet room', description='Ten minutes from lakeside')
+        cls.other = make_room(cls.owner, title='Thamel hostel bed', property_type='Hostel', room_type='Shared')
+
+    def test_title_match_ranks_above_description_match(self):
+        results = list(search_rooms(Room.objects.all(), 'lakeside').order_by('search_rank', '-id'))
+        self.assertEqual(results, [self.lakeside, self.mention])
+
+    def test_prefix_and_all_terms_required(self):
+        self.assertEqual(list(search_rooms(Room.objects.all(), 'hos sha')), [self.other])
+        self.assertEqual(list(search_rooms(Room.objects.all(), 'hostel pokhara')), [])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.other.title = 'Thamel dorm bed'
+        self.other.save()
+        self.assertEqual(list(search_rooms(Room.objects.all(), 'dorm')), [self.other])
+        self.other.delete()
+        self.assertEqual(list(search_rooms(Room.objects.all(), 'thamel')), [])
+
+    def test_punctuation_only_query_lists_everything(self):
+        self.assertEqual(list(search_rooms(Room.objects.all(), '!!').order_by('search_rank')), [])
+        for q in ('"', '*', '!!'):
+            response = self.client.get(reverse('room_list'), {'q': q})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.context['rooms']), 3)
+            self.assertEqual(self.client.get(reverse('api_room_list'), {'q': q}).status_code, 200)
+
+    @skipUnless(connection.vendor == 'postgresql', 'float4 ranks are a PostgreSQL quirk')
+    def test_search_pages_walk_tied_ranks_once(self):
+        # Same text, same rank: only the tie-breakers order these rooms
+        tied = {make_room(self.owner, title=f'Garden flat {i}', description='Garden view').id for i in range(7)}
+        seen, cursor = [], None
+        for _ in range(10):
+            rooms, cursor = paginate_keyset(
+                search_rooms(Room.objects.all(), 'garden'), cursor, page_size=2, ordering=SEARCH_ORDERING
+            )
+            seen += [room.id for room in rooms]
+            if cursor is None:
+                break
+        self.assertIsNone(cursor)
+        self.assertEqual(sorted(seen), sorted(tied))
+
+    def test_room_list_search_paginates_by_rank(self):
+        response = self.client.get(reverse('room_list'), {'q': 'lakeside'})
+        self.assertEqual(list(response.context['rooms']), [self.lakeside, self.mention])
+
+
+class RoomFilterTests(TestCase):
+
+    SAMPLE = {
+        'property': 'Apartment',
+        'location': 'Pokhara',
+        'room_type': '1BHK',
+        'min_price': '5000',
+        'max_price': '20000',
+        'available_from_min': '2026-01-01',
+        'available_from_max': '2026-06-01',
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='pass12345')
+        cls.match = make_room(
+            cls.owner, property_type='Apartment', location='Pokhara', room_type='1BHK',
+            price=12000, available_from=date(2026, 3, 1),
+        )
+        make_room(cls.owner, property_type='Apartment', location='Pokhara', room_type='1BHK', price=30000)
+        make_room(cls.owner, property_type='Hostel', location='Pokhara', room_type='Shared', price=4000)
+
+    def filter_combinations(self):
+        for size in range(len(self.SAMPLE) + 1):
+            for fields in combinations(self.SAMPLE, size):
+                yield {field: self.SAMPLE[field] for field in fields}
+
+    def test_all_filters_combined(self):
+        rooms = RoomFilterForm(self.SAMPLE).filter(Room.objects.all())
+        self.assertEqual(list(rooms), [self.match])
+
+    def test_property_is_case_insensitive_and_bad_values_ignored(self):
+        rooms = RoomFilterForm({'property': 'hostel', 'min_price': 'cheap'}).filter(Room.objects.all())
+        self.assertEqual([room.property_type for room in rooms], ['Hostel'])
+
+    # Indexes that narrow the rows by a filter (not just serve the ORDER BY)
+    FILTER_INDEXES = (
+        'room_property_created_idx', 'room_location_created_idx', 'room_roomtype_created_idx',
+        'room_location_type_price_idx', 'room_price_idx', 'room_active_available_idx',
+    )
+    ORDERING_INDEX = 'room_active_created_idx'
+
+    def is_selective(self, data):
+        """An equality facet or a closed range: some filter index should narrow the rows."""
+        return bool({'property', 'location', 'room_type'} & set(data)) or any(
+            {low, high} <= set(data)
+            for low, high in (('min_price', 'max_price'), ('available_from_min', 'available_from_max'))
+        )
+
+    @skipUnless(connection.vendor in ('postgresql', 'sqlite'), 'EXPLAIN output is vendor specific')
+    def test_filter_combinations_use_filter_indexes(self):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # Tiny test tables make a seq scan look cheapest; only
+                # fall back to one if no index can serve the query at all
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+            for data in self.filter_combinations():
+                # The query room_list runs for its first page
+                rooms, ordering, _form = filter_listings(Room.objects.active(), data)
+                plan = rooms.order_by(*ordering)[:13].explain()
+                with self.subTest(filters=sorted(data)):
+                    self.assertNotIn('Seq Scan on rooms_room', plan)
+                    self.assertIsNone(re.search(r'SCAN rooms_room\s*$', plan, re.MULTILINE), plan)
+                    if self.is_selective(data):
+                        self.assertTrue(any(name in plan for name in self.FILTER_INDEXES), plan)
+                    else:
+                        # Nothing selective: walk the active rows newest first and
+                        # stop after a page, without sorting
+                        self.assertIn(self.ORDERING_INDEX, plan)
+                        self.assertNotIn('TEMP B-TREE', plan)
+
+
+class QueryBudgetTests(MediaRootMixin, QueryBudgetMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_superuser('owner', password='pass12345')
+        cls.rooms = [make_room(cls.owner, title=f'Room {i}', image=f'rooms/cover{i}.jpg') for i in range(12)]
+        cls.room = cls.rooms[0]
+        RoomImage.objects.bulk_create(
+            RoomImage(room=cls.room, image=f'rooms/gallery/{i}.jpg') for i in range(5)
+        )
+
+    def setUp(self):
+        super().setUp()
+        for image in [room.image for room in self.rooms] + [img.image for img in self.room.images.all()]:
+            path = self.media_root / image.name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            Image.new('RGB', (64, 48)).save(path)
+
+    def test_room_list(self):
+        # The page, plus the facet counts until they are cached
+        self.assertQueryBudget(2, reverse('room_list'))
+        self.assertQueryBudget(1, reverse('room_list'), {'q': 'room', 'location': 'Kathmandu'})
+
+    def test_room_detail(self):
+        # room + owner in one join, gallery in one prefetch; the similar
+        # rooms panel builds this process's index once and fetches its rooms
+        similar.reset()
+        response = self.assertQueryBudget(4, reverse('room_detail', args=[self.room.id]))
+        self.assertContains(response, 'rooms/gallery/4.jpg')
+
+    def test_room_detail_as_owner(self):
+        self.client.force_login(self.owner)
+        self.client.get(reverse('room_detail', args=[self.room.id]))
+        # Panel cached: the room, the gallery and the session/user
+        self.assertQueryBudget(4, reverse('room_detail', args=[self.room.id]))
+
+    def test_dashboard(self):
+        self.client.force_login(self.owner)
+        # Session/user, rooms, listing totals, saved searches with their new-match counts
+        self.assertQueryBudget(5, reverse('dashboard'))
+
+    def test_admin_room_change_with_gallery(self):
+        self.client.force_login(self.owner)
+        self.assertQueryBudget(6, reverse('admin:rooms_room_change', args=[self.room.id]))
+
+    def test_admin_room_image_changelist(self):
+        self.client.force_login(self.owner)
+        self.assertQueryBudget(5, reverse('admin:rooms_roomimage_changelist'))
+
+
+@override_settings(STORAGES=LOCAL_STORAGES)
+class CardCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='pass12345')
+
+    def setUp(self):
+        cache.clear()
+        self.room = make_room(self.owner, title='Cached title')
+
+    def test_card_is_served_from_cache_until_room_saved(self):
+        self.assertContains(self.client.get(reverse('room_list')), 'Cached title')
+
+        # A raw UPDATE skips signals and updated_at, so the stale card is served
+        Room.objects.filter(pk=self.room.pk).update(title='Raw title')
+        self.assertContains(self.client.get(reverse('room_list')), 'Cached title')
+
+        self.room.title = 'Saved title'
+        self.room.save()
+        self.assertContains(self.client.get(reverse('room_list')), 'Saved title')
+
+    def test_list_and_dashboard_variants_share_one_component(self):
+        self.client.login(username='owner', password='pass12345')
+        listing = self.client.get(reverse('room_list')).content.decode()
+        dashboard = self.client.get(reverse('dashboard')).content.decode()
+        self.assertIn('Explore Details', listing)
+        self.assertNotIn(reverse('edit_room', args=[self.room.id]), listing)
+        self.assertIn(reverse('edit_room', args=[self.room.id]), dashboard)
+        self.assertNotIn('Explore Details', dashboard)
+        # Both variants are cached; a save moves the room to fresh keys
+        self.assertEqual(len(cache.get_many(card_cache_keys(self.room))), 2)
+        self.room.save()
+        self.assertEqual(cache.get_many(card_cache_keys(self.room)), {})
+
+    def test_page_of_cards_is_one_get_many(self):
+        for i in range(3):
+            make_room(self.owner, title=f'Other {i}')
+        self.client.login(username='owner', password='pass12345')
+        for expected_sets in (1, 0):
+            with mock.patch.object(cache, 'get_many', wraps=cache.get_many) as get_many, \
+                    mock.patch.object(cache, 'set_many', wraps=cache.set_many) as set_many:
+                self.assertContains(self.client.get(reverse('dashboard')), 'Other 2')
+            self.assertEqual(get_many.call_count, 1)
+            self.assertEqual(len(get_many.call_args.args[0]), 4)
+            self.assertEqual(set_many.call_count, expected_sets)
+
+    def test_gallery_change_bumps_updated_at(self):
+        stamp = self.room.updated_at
+        image = RoomImage.objects.create(room=self.room, image='rooms/gallery/a.jpg')
+        self.room.refresh_from_db()
+        self.assertGreater(self.room.updated_at, stamp)
+
+        stamp = self.room.updated_at
+        image.delete()
+        self.room.refresh_from_db()
+        self.assertGreater(self.room.updated_at, stamp)
+
+
+class MediaUrlTests(TestCase):
+
+    def setUp(self):
+        clear_media_url_cache()
+
+    @override_settings(
+        STORAGES={**LOCAL_STORAGES, 'default': {'BACKEND': 'cloudinary_storage.storage.MediaCloudinaryStorage'}},
+        CLOUDINARY_CLOUD_NAME='demo',
+        CLOUDINARY_STORAGE={},
+        MEDIA_URL='',
+    )
+    def test_matches_cloudinary_sdk(self):
+        for name in ['media/rooms/abc_xyz', 'rooms/a b~c.jpg', 'cover.jpg', 'v123/rooms/x']:
+            expected, _ = cloudinary.utils.cloudinary_url(name, cloud_name='demo', secure=True, resource_type='image')
+            self.assertEqual(build_media_url(name), expected)
+
+    @override_settings(STORAGES=LOCAL_STORAGES, MEDIA_URL='/media/')
+    def test_filesystem_url(self):
+        self.assertEqual(build_media_url('rooms/my room.jpg'), '/media/rooms/my%20room.jpg')
+        self.assertEqual(build_media_url(''), '')
+
+
+class ResponsiveImageTests(TestCase):
+
+    @override_settings(
+        STORAGES={**LOCAL_STORAGES, 'default': {'BACKEND': 'cloudinary_storage.storage.MediaCloudinaryStorage'}},
+        CLOUDINARY_CLOUD_NAME='demo',
+        CLOUDINARY_STORAGE={},
+        MEDIA_URL='',
+    )
+    def test_cloudinary_srcset_uses_transformations(self):
+        self.assertEqual(
+            build_srcset('rooms/cover', widths=(320, 640)),
+            'https://res.cloudinary.com/demo/image/upload/c_limit,f_auto,q_auto,w_320/v1/rooms/cover 320w, '
+            'https://res.cloudinary.com/demo/image/upload/c_limit,f_auto,q_auto,w_640/v1/rooms/cover 640w',
+        )
+
+    def test_local_thumbnails_are_generated_once(self):
+        with tempfile.TemporaryDirectory() as media_root, \
+                override_settings(STORAGES=LOCAL_STORAGES, MEDIA_ROOT=media_root, MEDIA_URL='/media/'):
+            (Path(media_root) / 'rooms').mkdir()
+            Image.new('RGB', (2000, 1000), 'blue').save(Path(media_root) / 'rooms/big.jpg')
+
+            srcset = build_srcset('rooms/big.jpg', widths=(320, 640))
+            self.assertEqual(
+                srcset, '/media/thumbs/w320/rooms/big.jpg 320w, /media/thumbs/w640/rooms/big.jpg 640w'
+            )
+            with Image.open(Path(media_root) / 'thumbs/w320/rooms/big.jpg') as thumb:
+                self.assertEqual(thumb.size, (320, 160))
+
+    @override_settings(STORAGES=LOCAL_STORAGES)
+    def test_missing_source_falls_back_to_original(self):
+        with self.assertLogs('rooms.thumbnails', 'WARNING'):
+            self.assertEqual(build_media_url('rooms/missing.jpg', 320), '/media/rooms/missing.jpg')
+
+
+@override_settings(GALLERY_UPLOAD_MODE='sync')
+class GalleryUploadTests(MediaRootMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.owner = User.objects.create_user('owner', password='pass12345')
+        self.client.force_login(self.owner)
+
+    def test_add_room_stages_then_uploads_gallery(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post(reverse('add_room'), {
+                **room_post_data(),
+                'gallery_images': [make_jpeg('a.jpg'), make_jpeg('b.jpg')],
+            })
+        room = Room.objects.get()
+        self.assertEqual(
+            sorted(room.images.values_list('status', flat=True)), ['pending', 'pending']
+        )
+        self.assertContains(self.client.get(reverse('room_detail', args=[room.id])), 'Processing…', count=2)
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(PendingUpload.objects.count(), 0)
+        for image in room.images.all():
+            self.assertEqual(image.status, RoomImage.STATUS_READY)
+            self.assertTrue((self.media_root / image.image.name).exists())
+
+    def test_failed_upload_retries_then_gives_up(self):
+        room = make_room(self.owner)
+        image = RoomImage.objects.create(room=room, status=RoomImage.STATUS_PENDING)
+        upload = PendingUpload.objects.create(room_image=image, file_name='x.jpg', content=make_jpeg().read())
+
+        with mock.patch('django.core.files.storage.FileSystemStorage.save', side_effect=OSError('disk full')) as save, \
+                self.assertLogs('rooms.uploads', 'WARNING'):
+            dispatch([upload.pk])
+        self.assertEqual(save.call_count, MAX_ATTEMPTS)
+
+        image.refresh_from_db()
+        self.assertEqual(image.status, RoomImage.STATUS_FAILED)
+        self.assertFalse(PendingUpload.objects.exists())
+
+    def test_transient_failure_is_retried(self):
+        image = RoomImage.objects.create(room=make_room(self.owner), status=RoomImage.STATUS_PENDING)
+        upload = PendingUpload.objects.create(room_image=image, file_name='x.jpg', content=make_jpeg().read())
+        save, failures = FileSystemStorage.save, [OSError('timeout')]
+
+        def flaky_save(storage, *args, **kwargs):
+            if failures:
+                raise failures.pop()
+            return save(storage, *args, **kwargs)
+
+        with mock.patch('django.core.files.storage.FileSystemStorage.save', autospec=True, side_effect=flaky_save), \
+                self.assertLogs('rooms.uploads', 'WARNING'):
+            dispatch([upload.pk])
+        image.refresh_from_db()
+        self.assertEqual(image.status, RoomImage.STATUS_READY)
+        self.assertTrue((self.media_root / image.image.name).exists())
+
+    @override_settings(GALLERY_UPLOAD_MODE='thread', GALLERY_UPLOAD_RETRY_DELAY=0.01)
+    def test_thread_mode_resubmits_with_backoff(self):
+        done = threading.Event()
+        statuses = iter(['pending', 'pending', 'ready'])
+
+        def fake_process(upload_id):
+            status = next(statuses)
+            if status == 'ready':
+                done.set()
+            return status
+
+        with mock.patch('rooms.uploads.process_upload', side_effect=fake_process) as process, \
+                mock.patch('rooms.uploads.Timer', wraps=threading.Timer) as timer:
+            dispatch([42])
+            self.assertTrue(done.wait(5))
+        self.assertEqual(process.call_count, 3)
+        self.assertEqual([call.args[0] for call in timer.call_args_list], [0.01, 0.02])
+
+    def test_non_image_fails_without_retry(self):
+        image = RoomImage.objects.create(room=make_room(self.owner), status=RoomImage.STATUS_PENDING)
+        upload = PendingUpload.objects.create(room_image=image, file_name='notes.txt', content=b'hello')
+        with self.assertLogs('rooms.uploads', 'WARNING'):
+            self.assertEqual(process_upload(upload.pk), 'failed')
+
+
+@override_settings(IMAGE_MAX_DIMENSION=1000, IMAGE_INGEST_FORMAT='WEBP', GALLERY_UPLOAD_MODE='sync')
+class ImageIngestTests(MediaRootMixin, TestCase):
+
+    def test_resizes_reencodes_and_strips_exif(self):
+        exif = Image.Exif()
+        exif[0x010F] = 'PhoneMaker'  # Make
+        upload = make_jpeg('IMG_0001.JPG', size=(4000, 3000), exif=exif.tobytes())
+
+        ingested = ingest_image(upload)
+
+        self.assertEqual(ingested.content.name, 'IMG_0001.webp')
+        with Image.open(ingested.content) as img:
+            self.assertEqual((img.format, img.size), ('WEBP', (1000, 750)))
+            self.assertFalse(img.getexif())
+
+    def test_hash_ignores_metadata(self):
+        plain = ingest_image(make_jpeg())
+        exif = Image.Exif()
+        exif[0x010F] = 'PhoneMaker'
+        tagged = ingest_image(make_jpeg(exif=exif.tobytes()))
+        other = ingest_image(make_jpeg(color='red'))
+        self.assertEqual(plain.content_hash, tagged.content_hash)
+        self.assertNotEqual(plain.content_hash, other.content_hash)
+
+    def test_identical_gallery_images_are_stored_once(self):
+        owner = User.objects.create_user('owner', password='pass12345')
+        self.client.force_login(owner)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('add_room'), {
+                **room_post_data(),
+                'image': make_jpeg('cover.jpg', size=(3000, 2000)),
+                'gallery_images': [make_jpeg('a.jpg'), make_jpeg('copy.jpg'), make_jpeg('b.jpg', color='red')],
+            })
+        room = Room.objects.get()
+        self.assertTrue(room.image.name.endswith('.webp'))
+        self.assertEqual(len(room.image_hash), 64)
+        names = list(room.images.order_by('id').values_list('image', flat=True))
+        self.assertEqual(names[0], names[1])
+        self.assertNotEqual(names[0], names[2])
+        self.assertEqual(len(list((self.media_root / 'rooms').glob('*.webp'))), 3)
+
+    def test_backfill_command(self):
+        owner = User.objects.create_user('owner', password='pass12345')
+        (self.media_root / 'rooms').mkdir()
+        for name in ('old1.jpg', 'old2.jpg'):
+            (self.media_root / 'rooms' / name).write_bytes(make_jpeg(size=(3000, 2000)).read())
+        room = make_room(owner, image='rooms/old1.jpg')
+        RoomImage.objects.create(room=room, image='rooms/old2.jpg')
+
+        call_command('ingest_media', stdout=io.StringIO())
+
+        room.refresh_from_db()
+        gallery_image = room.images.get()
+        self.assertTrue(room.image.name.endswith('.webp'))
+        self.assertTrue(gallery_image.image.name.endswith('.webp'))
+        self.assertEqual(room.image_hash, gallery_image.content_hash)
+        self.assertFalse((self.media_root / 'rooms/old1.jpg').exists())
+        self.assertFalse((self.media_root / 'rooms/old2.jpg').exists())
+
+
+@override_settings(GALLERY_UPLOAD_MODE='sync')
+class GalleryEditTests(MediaRootMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.owner = User.objects.create_user('owner', password='pass12345')
+        self.client.force_login(self.owner)
+        self.room = make_room(self.owner, title='Before')
+        (self.media_root / 'rooms').mkdir()
+        self.images = []
+        for name in ('a.jpg', 'b.jpg', 'shared.jpg'):
+            (self.media_root / 'rooms' / name).write_bytes(make_jpeg(size=(40, 30)).read())
+            self.images.append(RoomImage.objects.create(room=self.room, image=f'rooms/{name}'))
+        # Another listing uses the same (deduplicated) file
+        RoomImage.objects.create(room=make_room(self.owner), image='rooms/shared.jpg')
+
+    def edit(self, **data):
+        return self.client.post(reverse('edit_room', args=[self.room.id]), {
+            **room_post_data(title='After'),
+            'delete_images': [img.id for img in self.images[1:]],
+            **data,
+        })
+
+    def test_deletes_rows_and_only_orphaned_files_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.edit(gallery_images=[make_jpeg('new.jpg')])
+
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.title, 'After')
+        self.assertEqual(
+            sorted(self.room.images.values_list('status', flat=True)), ['ready', 'ready']
+        )
+        self.assertTrue((self.media_root / 'rooms/a.jpg').exists())
+        self.assertFalse((self.media_root / 'rooms/b.jpg').exists())
+        self.assertTrue((self.media_root / 'rooms/shared.jpg').exists())
+
+    def test_failure_rolls_back_everything(self):
+        with mock.patch('rooms.views.queue_gallery_images', side_effect=OSError('boom')), \
+                self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.edit()
+
+        self.assertEqual(callbacks, [])
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.title, 'Before')
+        self.assertEqual(self.room.images.count(), 3)
+        self.assertTrue((self.media_root / 'rooms/b.jpg').exists())
+
+    def test_delete_room_removes_its_files(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('delete_room', args=[self.room.id]))
+        self.assertFalse((self.media_root / 'rooms/a.jpg').exists())
+        self.assertTrue((self.media_root / 'rooms/shared.jpg').exists())
+
+
+@override_settings(STORAGES=LOCAL_STORAGES, ROOMS_PAGE_SIZE=2)
+class ApiTests(QueryBudgetMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='pass12345')
+        cls.rooms = [make_room(cls.owner, title=f'Room {i}', image=f'rooms/{i}.jpg') for i in range(3)]
+        RoomImage.objects.create(room=cls.rooms[0], image='rooms/gallery/a.jpg')
+        RoomImage.objects.create(room=cls.rooms[0], status=RoomImage.STATUS_PENDING)
+
+    def test_list_pages_and_filters(self):
+        response = self.client.get(reverse('api_room_list'))
+        data = response.json()
+        self.assertEqual([row['id'] for row in data['results']], [self.rooms[2].id, self.rooms[1].id])
+        self.assertEqual(data['results'][0]['image'], '/media/rooms/2.jpg')
+        data = self.client.get(data['next']).json()
+        self.assertEqual([row['id'] for row in data['results']], [self.rooms[0].id])
+        self.assertIsNone(data['next'])
+
+        data = self.client.get(reverse('api_room_list'), {'q': 'room 1'}).json()
+        self.assertEqual([row['title'] for row in data['results']], ['Room 1'])
+
+    def test_detail_lists_ready_gallery_images(self):
+        data = self.client.get(reverse('api_room_detail', args=[self.rooms[0].id])).json()
+        self.assertEqual(data['gallery'], ['/media/rooms/gallery/a.jpg'])
+        self.assertEqual(data['contact_number'], '9800000000')
+        self.assertEqual(self.client.get(reverse('api_room_detail', args=[999])).status_code, 404)
+
+    def test_conditional_get_returns_304_without_body(self):
+        url = reverse('api_room_list')
+        etag = self.client.get(url)['ETag']
+        self.assertFalse(etag.startswith('W/'))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(len(queries), 0)  # the ETag is a cache read
+
+        # Parameter order and blank parameters don't change the ETag
+        etag = self.client.get(url, {'q': 'room', 'property': ''})['ETag']
+        response = self.client.get(f'{url}?property=&q=room', headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertNotEqual(self.client.get(url, {'q': 'room 1'})['ETag'], etag)
+
+        self.rooms[1].delete()
+        self.assertEqual(self.client.get(url, {'q': 'room'}, headers={'if-none-match': etag}).status_code, 200)
+
+    def test_detail_etag_changes_with_gallery(self):
+        url = reverse('api_room_detail', args=[self.rooms[0].id])
+        response = self.client.get(url)
+        self.assertIn('Last-Modified', response)
+        etag = response['ETag']
+        self.assertEqual(self.client.get(url, headers={'if-none-match': etag}).status_code, 304)
+
+        RoomImage.objects.create(room=self.rooms[0], image='rooms/gallery/b.jpg')
+        self.assertEqual(self.client.get(url, headers={'if-none-match': etag}).status_code, 200)
+
+
+class AnonymousPageCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='pass12345')
+
+    def setUp(self):
+        cache.clear()
+        self.room = make_room(self.owner, title='First title')
+
+    def test_second_anonymous_hit_runs_no_queries(self):
+        url = reverse('room_list')
+        response = self.client.get(url, {'q': 'First', 'utm_source': 'ad'})
+        self.assertEqual(response['X-Page-Cache'], 'MISS')
+        self.assertIn('public', response['Cache-Control'])
+        self.assertNotIn('csrftoken', response.cookies)
+
+        # Case of q and unknown params don't split the cache
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'q': 'first'})
+        self.assertEqual(response['X-Page-Cache'], 'HIT')
+        self.assertEqual(len(queries), 0)
+        self.assertContains(response, 'First title')
+
+    def test_room_save_invalidates_pages(self):
+        url = reverse('room_detail', args=[self.room.id])
+        self.assertContains(self.client.get(url), 'First title')
+        self.room.title = 'Second title'
+        self.room.save()
+        self.assertContains(self.client.get(url), 'Second title')
+
+    def test_etag_gives_304(self):
+        url = reverse('room_detail', args=[self.room.id])
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_logged_in_users_bypass_cache(self):
+        url = reverse('room_list')
+        self.client.get(url)
+        # bulk_create sends no signals, so the anonymous page stays cached
+        Room.objects.bulk_create([Room(owner=self.owner, title='Raw title', price=1, available_from=date(2026, 2, 1))])
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'HIT')
+        self.client.login(username='owner', password='pass12345')
+        response = self.client.get(url)
+        self.assertNotIn('X-Page-Cache', response)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertContains(response, 'Raw title')
+
+
+class NearSearchTests(TestCase):
+    # Thamel, Kathmandu
+    HERE = (27.7154, 85.3123)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='pass12345')
+        cls.close = make_room(cls.owner, title='Close', latitude=27.7172, longitude=85.3240)    # ~1.2 km
+        cls.closer = make_room(cls.owner, title='Closer', latitude=27.7160, longitude=85.3130)  # ~0.1 km
+        cls.far = make_room(cls.owner, title='Far', latitude=27.6710, longitude=85.4298)        # Bhaktapur
+        make_room(cls.owner, title='Nowhere')
+
+    def test_radius_is_exact_and_nearest_first(self):
+        rooms = list(filter_near(Room.objects.all(), *self.HERE, km=3).order_by('distance_km'))
+        self.assertEqual(rooms, [self.closer, self.close])
+        self.assertAlmostEqual(rooms[1].distance_km, haversine_km(*self.HERE, 27.7172, 85.3240), places=6)
+
+    def test_room_list_near_param(self):
+        response = self.client.get(reverse('room_list'), {'near': '27.7154,85.3123', 'km': '3'})
+        self.assertEqual([room.title for room in response.context['rooms']], ['Closer', 'Close'])
+        self.assertContains(response, '1.2 km')
+        # Bad points are ignored rather than failing the page
+        response = self.client.get(reverse('room_list'), {'near': '200,abc'})
+        self.assertEqual(len(response.context['rooms']), 4)
+
+    def test_bounding_box_wraps_the_antimeridian(self):
+        self.assertIn("OR", str(Room.objects.filter(bounding_box(0, 179.99, 5)).query))
+        self.assertAlmostEqual(haversine_km(0, 179.99, 0, -179.99), 2.224, places=2)
+
+    def test_form_requires_both_coordinates(self):
+        form = RoomForm({'latitude': 27.7})
+        form.is_valid()
+        self.assertIn('Give both latitude and longitude, or neither.', form.non_field_errors())
+
+    @skipUnless(connection.vendor == 'sqlite', 'EXPLAIN output is vendor specific')
+    def test_prefilter_uses_index(self):
+        plan = filter_near(Room.objects.all(), *self.HERE).explain()
+        self.assertIn('room_lat_lng_idx', plan)
+
+
+class FacetCountTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='pass12345')
+
+    def setUp(self):
+        cache.clear()
+
+    def facet_rows(self):
+        return sorted(
+            RoomFacetCount.objects.filter(count__gt=0)
+            .values_list('property_type', 'location', 'room_type', 'price_bucket', 'count')
+        )
+
+    def test_incremental_updates_match_rebuild(self):
+        room = make_room(self.owner, property_type='Apartment', price=12000)
+        make_room(self.owner, property_type='Apartment', location='Pokhara', price=4000)
+        make_room(self.owner, property_type='Hostel', price=60000)
+        room.price = 25000
+        room.location = 'Pokhara'
+        room.save()
+        Room.objects.filter(property_type='Hostel').first().delete()
+
+        incremental = self.facet_rows()
+        self.assertEqual(incremental, [
+            ('Apartment', 'Pokhara', 'Single', 0, 1),
+            ('Apartment', 'Pokhara', 'Single', 4, 1),
+        ])
+        rebuild_facets()
+        self.assertEqual(self.facet_rows(), incremental)
+
+    def test_each_facet_ignores_its_own_selection(self):
+        make_room(self.owner, property_type='Apartment', location='Pokhara', price=4000)
+        make_room(self.owner, property_type='Apartment', location='Kathmandu', price=12000)
+        make_room(self.owner, property_type='Room', location='Kathmandu', price=12000)
+
+        summary = facet_summary({'location': 'Kathmandu', 'price__gte': 10000})
+        self.assertEqual(summary['location'][:2], [('Kathmandu', 'Kathmandu', 2), ('Pokhara', 'Pokhara', 0)])
+        self.assertEqual(summary['property_type'][:2], [('Room', 'Room', 1), ('Apartment', 'Apartment', 1)])
+        # Histogram follows the categorical selections, not the price range
+        self.assertEqual([bucket['count'] for bucket in summary['price']][:3], [0, 0, 2])
+
+    def test_room_list_shows_counts_from_one_cached_query(self):
+        for _ in range(3):
+            make_room(self.owner, property_type='Apartment')
+        response = self.client.get(reverse('room_list'))
+        self.assertContains(response, 'Apartment (3)')
+        with CaptureQueriesContext(connection) as queries:
+            facet_summary({})
+        self.assertEqual(len(queries), 0)
+
+
+class ListingLifecycleTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='pass12345')
+
+    def setUp(self):
+        cache.clear()
+        past = timezone.now() - timedelta(days=1)
+        self.live = make_room(self.owner, title='Live', available_from=date(2026, 3, 1))
+        self.ending = make_room(
+            self.owner, title='Ending', available_from=date(2026, 1, 1),
+            expires_at=timezone.now() + timedelta(days=3),
+        )
+        self.expired = [make_room(self.owner, title=f'Old {i}', expires_at=past) for i in range(3)]
+
+    def titles(self, **params):
+        return [room.title for room in self.client.get(reverse('room_list'), params).context['rooms']]
+
+    def test_expired_rooms_leave_listings_before_sweep(self):
+        self.assertEqual(self.titles(), ['Ending', 'Live'])
+        self.assertEqual(self.client.get(reverse('room_detail', args=[self.expired[0].id])).status_code, 404)
+        self.client.login(username='owner', password='pass12345')
+        self.assertEqual(self.client.get(reverse('room_detail', args=[self.expired[0].id])).status_code, 200)
+
+    def test_availability_filters(self):
+        self.assertEqual(self.titles(available_on='2026-02-01'), ['Ending'])
+        self.assertEqual(self.titles(available_before='2026-03-01'), ['Ending'])
+        # Ending expires before this move-in date
+        move_in = (timezone.now() + timedelta(days=10)).date().isoformat()
+        self.assertEqual(self.titles(available_on=move_in), ['Live'])
+
+    def test_sweep_archives_in_batches_and_updates_facets(self):
+        out = io.StringIO()
+        call_command('sweep_expired', batch_size=2, pause=0, stdout=out)
+        self.assertIn('Archived 3 expired rooms', out.getvalue())
+        self.assertEqual(Room.objects.filter(is_active=False).count(), 3)
+        self.assertEqual(facet_summary({})['property_type'][0], ('Room', 'Room', 2))
+
+    def test_renew_relists(self):
+        room = self.expired[0]
+        self.client.login(username='owner', password='pass12345')
+        self.assertContains(self.client.get(reverse('dashboard')), 'Renew')
+        self.client.post(reverse('renew_room', args=[room.id]))
+        room.refresh_from_db()
+        self.assertTrue(room.is_listed)
+        self.client.logout()
+        self.assertIn(room.title, self.titles())
+
+
+class ImportExportTests(MediaRootMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('agency', password='pass12345')
+
+    def write(self, name, content):
+        path = self.media_root / name
+        path.write_text(content, encoding='utf-8')
+        return str(path)
+
+    def test_csv_import_validates_fetches_and_indexes(self):
+        photos = self.media_root / 'photos'
+        photos.mkdir()
+        (photos / 'front.jpg').write_bytes(make_jpeg().read())
+        path = self.write('rooms.csv', (
+            'title,description,property_type,room_type,location,price,latitude,longitude,'
+            'owner_name,contact_number,available_from,image\n'
+            'Lakeside flat,Near the lake,Apartment,1BHK,Pokhara,15000,28.2096,83.9856,Sita,9800000001,2026-02-01,front.jpg\n'
+            'No price,,Room,Single,Kathmandu,,,,Ram,9800000002,2026-02-01,\n'
+            'Missing photo,Quiet,Room,Single,Kathmandu,7000,,,Ram,9800000003,2026-02-01,gone.jpg\n'
+            'Hostel bed,Shared dorm,Hostel,Shared,Kathmandu,4000,,,Hari,9800000004,2026-03-01,\n'
+        ))
+        out, err = io.StringIO(), io.StringIO()
+        call_command(
+            'import_rooms', path, owner='agency', image_root=str(photos), batch_size=2,
+            stdout=out, stderr=err,
+        )
+
+        self.assertIn('Imported 2 of 4 rows', out.getvalue())
+        self.assertIn('rows/s', out.getvalue())
+        self.assertIn('price: This field is required.', err.getvalue())
+        self.assertIn('line 4: image', err.getvalue())
+
+        lakeside = Room.objects.get(title='Lakeside flat')
+        self.assertEqual(lakeside.owner, self.owner)
+        self.assertTrue(lakeside.image.name.endswith('.webp'))
+        self.assertTrue((self.media_root / lakeside.image.name).exists())
+        self.assertEqual(len(lakeside.image_hash), 64)
+        # Signals were skipped, but search and facets know about the rooms
+        self.assertEqual([room.title for room in search_rooms(Room.objects.all(), 'lake')], ['Lakeside flat'])
+        self.assertEqual(facet_summary({})['property_type'][2], ('Hostel', 'Hostel', 1))
+
+    def test_jsonl_round_trip(self):
+        make_room(self.owner, title='Exported', latitude=27.7, longitude=85.3)
+        make_room(self.owner, title='Archived', is_active=False)
+        path = str(self.media_root / 'rooms.jsonl')
+        call_command('export_rooms', path, owner='agency', stderr=io.StringIO())
+
+        lines = Path(path).read_text().splitlines()
+        self.assertEqual(len(lines), 1)
+        Room.objects.all().delete()
+
+        call_command('import_rooms', path, owner='agency', stdout=io.StringIO())
+        room = Room.objects.get()
+        self.assertEqual((room.title, room.latitude, room.available_from), ('Exported', 27.7, date(2026, 1, 1)))
+
+    def test_bad_jsonl_lines_are_rejected_rows(self):
+        row = {
+            'title': 'Good line', 'description': 'Quiet', 'price': 9000, 'location': 'Kathmandu', 'property_type': 'Room',
+            'room_type': 'Single', 'owner_name': 'Ram', 'contact_number': '9800000001', 'available_from': '2026-02-01',
+        }
+        path = self.write('rooms.jsonl', f'{{"title": "Cut off\n[1, 2]\n{json.dumps(row)}\n')
+        out, err = io.StringIO(), io.StringIO()
+        call_command('import_rooms', path, owner='agency', stdout=out, stderr=err)
+
+        self.assertIn('Imported 1 of 3 rows', out.getvalue())
+        self.assertIn('line 1: invalid JSON', err.getvalue())
+        self.assertIn('line 2: not a JSON object', err.getvalue())
+        self.assertEqual(Room.objects.get().title, 'Good line')
+
+
+class SeedRoomsTests(TestCase):
+
+    def test_seed_is_searchable_and_counted(self):
+        call_command('seed_rooms', count=40, owners=2, batch_size=15, stdout=io.StringIO())
+        self.assertEqual(Room.objects.count(), 40)
+        self.assertEqual(User.objects.count(), 2)
+        self.assertTrue(Room.objects.filter(latitude__isnull=False).exists())
+        self.assertEqual(sum(RoomFacetCount.objects.values_list('count', flat=True)), 40)
+        self.assertTrue(search_rooms(Room.objects.all(), 'water electricity').exists())
+
+
+class RequestTimingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='pass12345')
+        cls.room = make_room(cls.owner)
+
+    def test_server_timing_header_and_log_line(self):
+        url = reverse('room_detail', args=[self.room.id])
+        with self.assertLogs('rooms.timing', 'INFO') as logs:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+
+        header = response['Server-Timing']
+        self.assertIn('db;dur=', header)
+        self.assertIn(f'desc="{len(queries)} queries"', header)
+        self.assertRegex(header, r'tpl;dur=\d+\.\d;desc="templates"')
+        self.assertRegex(header, r'total;dur=\d+\.\d')
+
+        line = json.loads(logs.records[-1].getMessage())
+        self.assertEqual((line['path'], line['status'], line['db_queries']), (url, 200, len(queries)))
+        self.assertGreater(line['template_ms'], 0)
+
+    def test_slow_requests_are_profiled(self):
+        with tempfile.TemporaryDirectory() as profile_dir:
+            with override_settings(PROFILE_SLOW_REQUESTS_MS=0, PROFILE_SAMPLE_RATE=1.0, PROFILE_DIR=profile_dir):
+                with self.assertLogs('rooms.timing', 'WARNING'):
+                    self.client.get(reverse('room_list'))
+            dumps = list(Path(profile_dir).glob('*-GET-root.prof'))
+            self.assertEqual(len(dumps), 1)
+
+
+class AsyncViewTests(TestCase):
+    """The read views through the ASGI handler, as under uvicorn workers."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='pass12345')
+        cls.room = make_room(cls.owner, title='Async title')
+
+    def setUp(self):
+        cache.clear()
+
+    async def test_room_list_and_detail(self):
+        response = await self.async_client.get(reverse('room_list'), {'q': 'async'})
+        self.assertContains(response, 'Async title')
+        self.assertEqual(response['X-Page-Cache'], 'MISS')
+        response = await self.async_client.get(reverse('room_list'), {'q': 'async'})
+        self.assertEqual(response['X-Page-Cache'], 'HIT')
+
+        response = await self.async_client.get(reverse('room_detail', args=[self.room.id]))
+        self.assertContains(response, 'Async title')
+        response = await self.async_client.get(reverse('room_detail', args=[self.room.id + 1000]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_archived_room_visible_to_owner_only(self):
+        await Room.objects.filter(pk=self.room.pk).aupdate(is_active=False)
+        url = reverse('room_detail', args=[self.room.id])
+        self.assertEqual((await self.async_client.get(url)).status_code, 404)
+        await self.async_client.aforce_login(self.owner)
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+
+    async def test_server_timing_counts_queries_from_worker_threads(self):
+        # The ORM runs in sync_to_async threads; their queries still count
+        response = await self.async_client.get(reverse('room_list'))
+        self.assertRegex(response['Server-Timing'], r'db;dur=\d+\.\d;desc="[1-9]\d* queries"')
+
+
+@override_settings(HEALTH_PROBE_MODE='sync', STORAGES=LOCAL_STORAGES)
+class HealthMetricsTests(TestCase):
+
+    def setUp(self):
+        health.reset()
+        metrics.reset()
+        cache.clear()
+
+    def test_healthz_reuses_probe_results(self):
+        response = self.client.get(reverse('healthz'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'no-store')
+        for probe in ('database', 'storage', 'cache'):
+            self.assertRegex(response.content.decode(), rf'{probe} ok \d+\.\dms')
+
+        # Within the TTL the probes don't run again
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('healthz'))
+        self.assertEqual(len(queries), 0)
+
+    def test_failing_probe_gives_503(self):
+        with mock.patch.dict(health.PROBES, {'storage': mock.Mock(side_effect=OSError('bucket gone'))}):
+            with self.assertLogs('rooms.health', 'WARNING'):
+                response = self.client.get(reverse('healthz'))
+        self.assertEqual(response.status_code, 503)
+        self.assertContains(response, 'storage FAIL', status_code=503)
+        self.assertContains(response, 'OSError: bucket gone', status_code=503)
+
+    def test_metrics_in_prometheus_format(self):
+        owner = User.objects.create_user('owner', password='pass12345')
+        make_room(owner)
+        self.client.get(reverse('room_list'))
+        self.client.get(reverse('room_list'))
+
+        response = self.client.get(reverse('metrics'))
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('# TYPE roomfinder_http_request_duration_seconds histogram', body)
+        self.assertIn(
+            'roomfinder_http_request_duration_seconds_count{method="GET",status="2xx",view="room_list"} 2', body
+        )
+        self.assertIn('roomfinder_cache_requests_total{cache="page",result="hit"} 1', body)
+        self.assertIn('roomfinder_cache_requests_total{cache="page",result="miss"} 1', body)
+        # The second request came from the page cache, so the card was read once
+        self.assertIn('roomfinder_cache_requests_total{cache="card",result="miss"} 1', body)
+        self.assertIn('roomfinder_probe_up{probe="database"} 1', body)
+
+    @override_settings(METRICS_TOKEN='s3cret')
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        response = self.client.get(reverse('metrics'), headers={'authorization': 'Bearer s3cret'})
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(STORAGES=LOCAL_STORAGES)
+class SimilarRoomsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='pass12345')
+
+    def setUp(self):
+        cache.clear()
+        similar.reset()
+        self.room = make_room(self.owner, title='Base', price=10000)
+        self.close = make_room(self.owner, title='Close', price=10500)
+        self.dearer = make_room(self.owner, title='Dearer', price=30000)
+        self.other_type = make_room(self.owner, title='Double', price=10000, room_type='Double')
+        self.apartment = make_room(self.owner, title='Apartment', price=10000, property_type='Apartment')
+        self.pokhara = make_room(self.owner, title='Pokhara', price=10000, location='Pokhara')
+
+    def test_nearest_by_price_type_then_other_cities(self):
+        ids = similar.get_index().nearest(self.room, 4)
+        self.assertEqual(ids[:2], [self.close.pk, self.other_type.pk])
+        self.assertEqual(set(ids[2:]), {self.dearer.pk, self.pokhara.pk})
+        self.assertNotIn(self.room.pk, ids)
+        self.assertNotIn(self.apartment.pk, ids)
+
+    def test_index_follows_saves_and_deletes(self):
+        index = similar.get_index()
+        self.close.price = 40000
+        self.close.save()
+        self.assertEqual(index.nearest(self.room, 1), [self.other_type.pk])
+        self.other_type.is_active = False
+        self.other_type.save()
+        self.dearer.delete()
+        self.assertEqual(index.nearest(self.room, 2), [self.close.pk, self.pokhara.pk])
+
+    def test_refresh_pulls_rows_saved_without_signals(self):
+        index = similar.get_index()
+        bulk, = Room.objects.bulk_create([Room(
+            owner=self.owner, title='Bulk', description='x', price=10000, location='Kathmandu',
+            room_type='Single', property_type='Room', owner_name='Ram', contact_number='9800000000',
+            available_from=date(2026, 1, 1),
+        )])
+        self.assertNotIn(bulk.pk, index.where)
+        with override_settings(SIMILAR_INDEX_REFRESH=0):
+            self.assertIs(similar.get_index(), index)
+        self.assertEqual(index.nearest(self.room, 1), [bulk.pk])
+
+    def test_panel_on_detail_page_is_one_cache_lookup(self):
+        response = self.client.get(reverse('room_detail', args=[self.room.id]))
+        self.assertContains(response, 'Similar rooms')
+        self.assertContains(response, reverse('room_detail', args=[self.close.id]))
+        with CaptureQueriesContext(connection) as queries:
+            similar.similar_panel(self.room)
+        self.assertEqual(len(queries), 0)
+
+
+class SavedSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='pass12345')
+        cls.renter = User.objects.create_user('renter', password='pass12345')
+
+    def setUp(self):
+        self.search, _ = saved_searches.save_search(self.renter, 'Apart  NEAR lake, apart', 'Apartment')
+
+    def new_count(self, search=None):
+        return SavedSearchMatch.objects.filter(search=search or self.search).count()
+
+    def test_query_is_normalized_into_the_term_index(self):
+        self.assertEqual(self.search.query, 'apart near lake')
+        self.assertEqual(set(self.search.terms.values_list('term', flat=True)), {'apart', 'near', 'lake'})
+        again, created = saved_searches.save_search(self.renter, 'apart near LAKE', 'Apartment')
+        self.assertEqual((again, created), (self.search, False))
+
+    def test_new_room_matched_once_on_creation(self):
+        make_room(self.owner, title='Apartment near the lake', property_type='Apartment')
+        make_room(self.owner, title='Apartment near the lake', property_type='Room')
+        make_room(self.owner, title='Apartment near the bus park', property_type='Apartment')
+        make_room(self.renter, title='My apartment near the lake', property_type='Apartment')
+        self.assertEqual(self.new_count(), 1)
+
+        room = Room.objects.get(property_type='Apartment', title='Apartment near the lake')
+        room.price = 9000
+        room.save()
+        self.assertEqual(self.new_count(), 1)
+
+    def test_matching_does_not_scan_saved_searches(self):
+        for i in range(20):
+            saved_searches.save_search(self.renter, f'word{i}')
+        room = make_room(self.owner, title='Quiet flat', description='Top floor')
+        with CaptureQueriesContext(connection) as queries:
+            saved_searches.match_rooms([room])
+        # Term lookup and candidate searches; nothing matched, nothing written
+        self.assertEqual(len(queries), 2)
+
+    @skipUnless(connection.vendor == 'sqlite', 'EXPLAIN output is vendor specific')
+    def test_candidate_query_uses_indexes(self):
+        search, _ = saved_searches.save_search(self.renter, 'garden')
+        plan = saved_searches.candidate_searches([search.pk]).explain()
+        self.assertIn('saved_search_term_count_idx', plan)
+        self.assertNotRegex(plan, r'(?m)SCAN rooms_savedsearch\s*$|TEMP B-TREE')
+
+    def test_bulk_created_rooms_are_backfilled(self):
+        old = make_room(self.owner, title='Apartment near the lake', property_type='Apartment')
+        SavedSearchMatch.objects.all().delete()
+        Room.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=30))
+        Room.objects.bulk_create([
+            Room(owner=self.owner, title=f'Lake apartment {i}', description='Near the lake', price=20000,
+                 location='Pokhara', room_type='1BHK', property_type='Apartment', owner_name='Ram',
+                 contact_number='9800000000', available_from=date(2026, 1, 1))
+            for i in range(3)
+        ])
+        self.assertEqual(self.new_count(), 0)
+        call_command('match_saved_searches', stdout=io.StringIO())
+        call_command('match_saved_searches', since='2020-01-01', stdout=io.StringIO())
+        # Rooms older than the search are not new
+        self.assertEqual(self.new_count(), 3)
+
+    def test_dashboard_shows_new_count_and_opening_clears_it(self):
+        make_room(self.owner, title='Apartment near the lake', property_type='Apartment')
+        self.client.force_login(self.renter)
+        self.assertContains(self.client.get(reverse('dashboard')), '1 new')
+        response = self.client.get(reverse('open_saved_search', args=[self.search.id]))
+        self.assertRedirects(response, reverse('room_list') + '?q=apart+near+lake&property=Apartment')
+        self.assertEqual(self.new_count(), 0)
+        self.assertNotContains(self.client.get(reverse('dashboard')), '1 new')
+
+    def test_save_and_delete_views(self):
+        self.client.force_login(self.owner)
+        response = self.client.post(reverse('save_search'), {'q': 'hostel', 'property': 'hostel'})
+        self.assertRedirects(response, reverse('room_list') + '?q=hostel&property=Hostel')
+        search = SavedSearch.objects.get(user=self.owner)
+        self.assertEqual(search.property_type, 'Hostel')
+        self.client.force_login(self.renter)
+        self.assertEqual(self.client.post(reverse('delete_saved_search', args=[search.id])).status_code, 404)
+        self.client.force_login(self.owner)
+        self.client.post(reverse('delete_saved_search', args=[search.id]))
+        self.assertFalse(SavedSearch.objects.filter(pk=search.pk).exists())
+
+
+@override_settings(VIEW_COUNT_FLUSH_MODE='sync')
+class ViewCountTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='pass12345')
+
+    def setUp(self):
+        cache.clear()
+        view_counts.reset()
+        self.room = make_room(self.owner, price=8000)
+
+    def test_views_are_buffered_then_flushed_without_touching_updated_at(self):
+        url = reverse('room_detail', args=[self.room.id])
+        self.client.get(url)
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'HIT')
+        self.client.get(reverse('room_detail', args=[10 ** 6]))
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.view_count, 0)
+        generation = view_counts.current_generation()
+        self.assertEqual(cache.get(view_counts.view_key(generation, self.room.id)), 2)
+
+        updated_at = self.room.updated_at
+        self.assertEqual(view_counts.flush(settle=True), 2)
+        self.room.refresh_from_db()
+        self.assertEqual((self.room.view_count, self.room.updated_at), (2, updated_at))
+        self.assertIsNone(cache.get(view_counts.view_key(generation, self.room.id)))
+        self.assertEqual(view_counts.flush(settle=True), 0)
+
+    def test_flush_is_one_update_per_distinct_count(self):
+        others = [make_room(self.owner) for _ in range(3)]
+        for room, views in zip([self.room, *others], (1, 1, 1, 4)):
+            for _ in range(views):
+                view_counts.record_view(room.id)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(view_counts.flush(settle=True), 7)
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(sorted(Room.objects.values_list('view_count', flat=True)), [1, 1, 1, 4])
+
+    def test_flush_moves_the_generation_retired_by_the_last_one(self):
+        view_counts.record_view(self.room.id)
+        # The first flush retires the live generation; views recorded in it
+        # can still be landing, so they wait for the next flush
+        self.assertEqual(view_counts.flush(), 0)
+        view_counts.record_view(self.room.id)
+        self.assertEqual(view_counts.flush(), 1)
+        self.assertEqual(view_counts.flush(), 1)
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.view_count, 2)
+
+    def test_views_before_a_quiet_spell_are_not_lost(self):
+        # The locmem cache expires keys by time.time(): views at t=0 and 61 s,
+        # then nothing for longer than any key timeout, then three more
+        for now in (0, 61, 761, 822, 883):
+            with mock.patch('time.time', return_value=1_000_000 + now):
+                view_counts.record_view(self.room.id)
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.view_count, 4)
+        self.assertEqual(view_counts.flush(settle=True), 1)
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.view_count, 5)
+
+    @override_settings(VIEW_COUNT_FLUSH_INTERVAL=0)
+    def test_view_flushes_once_the_interval_is_up(self):
+        # Every view flushes, and each flush moves the generation before last
+        for _ in range(3):
+            view_counts.record_view(self.room.id)
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.view_count, 2)
+
+    def test_database_cache_counts_in_the_worker(self):
+        other = make_room(self.owner)
+        db_cache = {'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'cache_table'}}
+        with self.settings(CACHES=db_cache):
+            with CaptureQueriesContext(connection) as queries:
+                for room_id in (self.room.id, self.room.id, other.id):
+                    view_counts.record_view(room_id)
+            self.assertEqual(len(queries), 0)
+
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(view_counts.flush(), 3)
+            self.assertEqual(len(queries), 2)
+            self.assertEqual(view_counts.flush(), 0)
+        self.assertEqual(sorted(Room.objects.values_list('view_count', flat=True)), [1, 2])
+
+    def test_dashboard_totals_in_one_query(self):
+        make_room(self.owner, price=12000, is_active=False)
+        Room.objects.filter(pk=self.room.pk).update(view_count=7)
+        with CaptureQueriesContext(connection) as queries:
+            stats = Room.objects.filter(owner=self.owner).stats()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(stats, {'total': 2, 'listed': 1, 'average_price': 10000, 'views': 7})
+        self.client.force_login(self.owner)
+        self.assertContains(self.client.get(reverse('dashboard')), 'Rs. 10,000')
+
+
+class ShardedStorageTests(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.storage = ShardedFileSystemStorage(location=media_root.name, base_url='/media/')
+
+    def test_names_are_sharded_once(self):
+        name = self.storage.save('rooms/photo.jpg', make_jpeg())
+        self.assertRegex(name, r'^rooms/[0-9a-f]{2}/[0-9a-f]{2}/photo\.jpg$')
+        again = self.storage.save(name, make_jpeg())
+        self.assertEqual(again.rsplit('/', 1)[0], name.rsplit('/', 1)[0])
+        self.assertNotEqual(again, name)
+
+    def test_reads_are_memory_mapped(self):
+        name = self.storage.save('rooms/photo.jpg', make_jpeg())
+        with self.storage.open(name) as f:
+            self.assertIsInstance(f, MappedFile)
+            self.assertEqual(f.size, self.storage.size(name))
+            self.assertEqual(Image.open(f).size, (800, 600))
+        empty = self.storage.save('rooms/empty.jpg', SimpleUploadedFile('empty.jpg', b''))
+        with self.storage.open(empty) as f:
+            self.assertEqual(f.read(), b'')
+
+
+@override_settings(
+    STORAGES={**LOCAL_STORAGES, 'default': {'BACKEND': 'rooms.storage.FakeCloudinaryStorage'}},
+    CLOUDINARY_CLOUD_NAME=None, GALLERY_UPLOAD_MODE='sync',
+)
+class FakeCloudinaryTests(TestCase):
+
+    def setUp(self):
+        FakeCloudinaryStorage.reset()
+        clear_media_url_cache()
+        self.addCleanup(clear_media_url_cache)
+        self.owner = User.objects.create_user('owner', password='pass12345')
+        self.client.force_login(self.owner)
+
+    def test_upload_url_and_delete_without_network(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('add_room'), {
+                **room_post_data(),
+                'image': make_jpeg('cover.jpg'),
+                'gallery_images': [make_jpeg('a.jpg', color='red')],
+            })
+        room = Room.objects.get()
+        gallery = room.images.get()
+        # Cloudinary-style public id: prefix, folder, random suffix, no extension
+        self.assertRegex(room.image.name, r'rooms/cover_[a-z0-9]{6}$')
+        self.assertIn(gallery.image.name, FakeCloudinaryStorage.files)
+        self.assertEqual(
+            build_media_url(room.image.name, 320),
+            f'https://res.cloudinary.com/roomfinder-fake/image/upload/c_limit,f_auto,q_auto,w_320/v1/{room.image.name}',
+        )
+        self.assertEqual(room.image.url, build_media_url(room.image.name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('delete_room', args=[room.id]))
+        self.assertEqual(FakeCloudinaryStorage.files, {})
+        operations = [operation for operation, _, _ in FakeCloudinaryStorage.calls]
+        self.assertEqual(operations, ['upload', 'upload', 'delete_resources'])
+
+    @override_settings(FAKE_CLOUDINARY_LATENCY_MS=20)
+    def test_latency_is_injected_and_recorded(self):
+        storage = FakeCloudinaryStorage()
+        start = time.perf_counter()
+        self.assertFalse(storage.exists('rooms/missing'))
+        self.assertGreaterEqual(time.perf_counter() - start, 0.02)
+        self.assertEqual(FakeCloudinaryStorage.calls, [('head', 'rooms/missing', 0.02)])
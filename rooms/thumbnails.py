@@ -0,0 +1,73 @@
+"""
+Pillow thumbnails for local (non-Cloudinary) media.
+
+Cloudinary resizes on the fly through transformation URLs; on the
+filesystem we generate each width once under MEDIA_ROOT/thumbs/w<width>/
+and serve it from disk after that.
+"""
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_DIR = 'thumbs'
+THUMBNAIL_QUALITY = 80
+
+# Thumbnails known to exist (or known to be impossible), so renders
+# don't stat() or re-open every image
+_existing = set()
+_failed = set()
+
+
+def thumbnail_name(name, width):
+    return f'{THUMBNAIL_DIR}/w{width}/{name}'
+
+
+def get_thumbnail(name, width):
+    """
+    Storage name of a thumbnail of name at most width pixels wide,
+    generating it on first use. None if the source can't be read.
+    """
+    thumb = thumbnail_name(name, width)
+    if thumb in _existing:
+        return thumb
+    if thumb in _failed:
+        return None
+
+    media_root = Path(settings.MEDIA_ROOT)
+    target = media_root / thumb
+    if not target.exists():
+        try:
+            _generate(media_root / name, target, width)
+        except (OSError, ValueError) as e:
+            logger.warning('Thumbnail %s at %spx failed: %s', name, width, e)
+            _failed.add(thumb)
+            return None
+    _existing.add(thumb)
+    return thumb
+
+
+def _generate(source, target, width):
+    with Image.open(source) as img:
+        image_format = img.format or 'JPEG'
+        img = ImageOps.exif_transpose(img)
+        # Never upscales; height follows the aspect ratio
+        img.thumbnail((width, width * 4))
+        if image_format == 'JPEG' and img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temp file and rename so concurrent renders never see a half-written file
+        fd, tmp = tempfile.mkstemp(dir=target.parent, suffix=target.suffix)
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                img.save(out, format=image_format, quality=THUMBNAIL_QUALITY, optimize=True)
+            os.replace(tmp, target)
+        except BaseException:
+            os.unlink(tmp)
+            raise
@@ -0,0 +1,255 @@
+"""
+Background gallery uploads.
+
+add_room/edit_room only stage gallery files: each becomes a pending
+RoomImage plus a PendingUpload row holding the bytes. Once the request's
+transaction commits, a bounded thread pool runs them through
+rooms/ingest.py (resize, strip EXIF, hash), pushes them to storage
+concurrently and flips each image to ready (or failed). A photo whose
+pixels are already stored reuses that file instead of uploading again.
+
+A storage error releases the upload for another attempt: the thread pool
+resubmits it after GALLERY_UPLOAD_RETRY_DELAY seconds, doubled each time,
+until MAX_ATTEMPTS. PendingUpload is a small DB-backed stand-in for a job
+queue. Rows left behind by a restart are picked up by the
+``manage.py process_uploads --loop`` worker (the Procfile's worker entry).
+
+GALLERY_UPLOAD_MODE:
+    'thread' - upload in this process's pool after commit (default)
+    'sync'   - upload inline after commit (tests, debugging)
+    'queue'  - only stage; a separate `process_uploads --loop` worker uploads
+"""
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from threading import Lock, Timer
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .cache import touch_room
+from .ingest import IngestError, ingest_image
+from .media_urls import CLOUDINARY_BACKEND, FAKE_CLOUDINARY_BACKEND
+from .models import PendingUpload, Room, RoomImage
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 3
+# A claim older than this belongs to a worker that died mid-upload
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+_executor = None
+_executor_lock = Lock()
+
+
+def get_upload_mode():
+    return getattr(settings, 'GALLERY_UPLOAD_MODE', 'thread')
+
+
+def get_retry_delay(attempt):
+    """Seconds to wait before retrying after failed attempt number `attempt`."""
+    return getattr(settings, 'GALLERY_UPLOAD_RETRY_DELAY', 5) * 2 ** (attempt - 1)
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'GALLERY_UPLOAD_WORKERS', 4),
+                thread_name_prefix='gallery-upload',
+            )
+        return _executor
+
+
+def queue_gallery_images(room, files):
+    """
+    Stage uploaded files as pending gallery images of room and schedule
+    their upload for after the current transaction commits.
+    """
+    if not files:
+        return []
+    images = RoomImage.objects.bulk_create(
+        RoomImage(room=room, status=RoomImage.STATUS_PENDING) for _ in files
+    )
+    uploads = PendingUpload.objects.bulk_create(
+        PendingUpload(room_image=image, file_name=f.name, content=f.read())
+        for image, f in zip(images, files)
+    )
+    upload_ids = [upload.pk for upload in uploads]
+    transaction.on_commit(lambda: dispatch(upload_ids))
+    return images
+
+
+def dispatch(upload_ids):
+    mode = get_upload_mode()
+    if mode == 'sync':
+        for upload_id in upload_ids:
+            # Inline retries don't wait: a sync caller can't be kept sleeping
+            for _ in range(MAX_ATTEMPTS):
+                if process_upload(upload_id) != RoomImage.STATUS_PENDING:
+                    break
+    elif mode == 'thread':
+        executor = get_executor()
+        for upload_id in upload_ids:
+            executor.submit(_run_in_thread, upload_id)
+    # 'queue': the process_uploads worker picks them up
+
+
+def _run_in_thread(upload_id, attempt=1):
+    status = None
+    try:
+        status = process_upload(upload_id)
+    except Exception:
+        logger.exception('Gallery upload %s crashed', upload_id)
+    finally:
+        # Worker threads get their own DB connections; don't leak them
+        connections.close_all()
+    if status == RoomImage.STATUS_PENDING:
+        # Back off without holding a pool thread, then queue the retry
+        retry = Timer(get_retry_delay(attempt), get_executor().submit, (_run_in_thread, upload_id, attempt + 1))
+        retry.daemon = True
+        retry.start()
+
+
+def claim(upload_id):
+    """Atomically mark an upload as ours; False if another worker has it."""
+    now = timezone.now()
+    return PendingUpload.objects.filter(
+        Q(claimed_at__isnull=True) | Q(claimed_at__lt=now - CLAIM_TIMEOUT),
+        pk=upload_id,
+    ).update(claimed_at=now, attempts=F('attempts') + 1) == 1
+
+
+def process_upload(upload_id):
+    """Push one staged file to storage. Returns the final image status."""
+    if not claim(upload_id):
+        return None
+    try:
+        upload = PendingUpload.objects.select_related('room_image').get(pk=upload_id)
+    except PendingUpload.DoesNotExist:
+        return None  # room or image deleted meanwhile
+    image = upload.room_image
+
+    try:
+        ingested = ingest_image(io.BytesIO(upload.content), upload.file_name)
+    except IngestError as e:
+        # Not an image: retrying won't help
+        logger.warning('Gallery upload %s rejected: %s', upload_id, e)
+        RoomImage.objects.filter(pk=image.pk).update(status=RoomImage.STATUS_FAILED)
+        upload.delete()
+        touch_room(image.room_id)
+        return RoomImage.STATUS_FAILED
+
+    try:
+        name = find_stored_duplicate(ingested.content_hash) or image.image.storage.save(
+            image.image.field.generate_filename(image, ingested.content.name),
+            ingested.content,
+        )
+    except Exception as e:
+        logger.warning('Gallery upload %s failed (attempt %s): %s', upload_id, upload.attempts, e)
+        if upload.attempts >= MAX_ATTEMPTS:
+            RoomImage.objects.filter(pk=image.pk).update(status=RoomImage.STATUS_FAILED)
+            upload.delete()
+            touch_room(image.room_id)
+            return RoomImage.STATUS_FAILED
+        # Release the claim so a retry can pick it up
+        PendingUpload.objects.filter(pk=upload_id).update(claimed_at=None, error=str(e)[:1000])
+        return RoomImage.STATUS_PENDING
+
+    updated = RoomImage.objects.filter(pk=image.pk).update(
+        image=name, status=RoomImage.STATUS_READY, content_hash=ingested.content_hash
+    )
+    if not updated:
+        # Image was deleted while we uploaded: don't leave an orphan behind
+        if not RoomImage.objects.filter(image=name).exists():
+            image.image.storage.delete(name)
+        return None
+    upload.delete()
+    touch_room(image.room_id)
+    return RoomImage.STATUS_READY
+
+
+def find_stored_duplicate(content_hash):
+    """Storage name of an already uploaded gallery image with these pixels."""
+    return (
+        RoomImage.objects
+        .filter(content_hash=content_hash, status=RoomImage.STATUS_READY)
+        .exclude(image='')
+        .values_list('image', flat=True)
+        .first()
+    )
+
+
+def delete_unreferenced_files(names):
+    """
+    Delete stored files that no Room or RoomImage points at any more (gallery
+    files can be shared, see find_stored_duplicate). Cloudinary gets one
+    batched API call per 100 files; other storages one delete per file.
+    """
+    names = {name for name in names if name}
+    if not names:
+        return []
+    referenced = set(
+        Room.objects.filter(image__in=names).values_list('image', flat=True)
+    ) | set(
+        RoomImage.objects.filter(image__in=names).values_list('image', flat=True)
+    )
+    orphans = sorted(names - referenced)
+    if not orphans:
+        return []
+
+    storage = RoomImage._meta.get_field('image').storage
+    backend = settings.STORAGES['default']['BACKEND']
+    try:
+        if backend in (CLOUDINARY_BACKEND, FAKE_CLOUDINARY_BACKEND):
+            if backend == CLOUDINARY_BACKEND:
+                import cloudinary.api
+                delete_resources = cloudinary.api.delete_resources
+            else:
+                delete_resources = storage.delete_resources
+            for start in range(0, len(orphans), 100):
+                delete_resources(orphans[start:start + 100], resource_type='image', invalidate=True)
+        else:
+            for name in orphans:
+                storage.delete(name)
+    except Exception:
+        # A leftover file costs a little storage; never fail the request for it
+        logger.exception('Deleting %s orphaned files failed', len(orphans))
+    return orphans
+
+
+def delete_files_after_commit(names):
+    """Schedule delete_unreferenced_files for when the current transaction commits."""
+    names = list(names)
+    if not names:
+        return
+
+    def cleanup():
+        if get_upload_mode() == 'thread':
+            get_executor().submit(_delete_in_thread, names)
+        else:
+            delete_unreferenced_files(names)
+
+    transaction.on_commit(cleanup)
+
+
+def _delete_in_thread(names):
+    try:
+        delete_unreferenced_files(names)
+    finally:
+        connections.close_all()
+
+
+def pending_upload_ids(limit=100):
+    """Uploads nobody is working on (never claimed, or claim expired)."""
+    stale = timezone.now() - CLAIM_TIMEOUT
+    return list(
+        PendingUpload.objects
+        .filter(Q(claimed_at__isnull=True) | Q(claimed_at__lt=stale))
+        .order_by('created_at')
+        .values_list('pk', flat=True)[:limit]
+    )
@@ -1,4 +1,4 @@
-from django.urls import path
+from django.urls import include, path
 from . import views
 from django.contrib.auth import views as auth_views
 
@@ -10,6 +10,10 @@ urlpatterns = [
     path('add/', views.add_room, name='add_room'),
     path('edit/<int:id>/', views.edit_room, name='edit_room'),
     path('delete/<int:id>/', views.delete_room, name='delete_room'),
+    path('renew/<int:id>/', views.renew_room, name='renew_room'),
+
+    # JSON API (read-only, versioned)
+    path('api/v1/', include('rooms.api_urls')),
 
     # AUTH
     path('register/', views.register, name='register'),
@@ -19,6 +23,12 @@ urlpatterns = [
     path('logout/', views.logout_confirm, name='logout'),
     path('dashboard/', views.dashboard, name='dashboard'),
 
-    # Debug: visit on Render to confirm Cloudinary is active (remove in production if desired)
-    path('storage-check/', views.storage_check, name='storage_check'),
+    # SAVED SEARCHES
+    path('searches/save/', views.save_search, name='save_search'),
+    path('searches/<int:id>/', views.open_saved_search, name='open_saved_search'),
+    path('searches/<int:id>/delete/', views.delete_saved_search, name='delete_saved_search'),
+
+    # Uptime checks and Prometheus scraping
+    path('healthz', views.healthz, name='healthz'),
+    path('metrics', views.prometheus_metrics, name='metrics'),
 ]
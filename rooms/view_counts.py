@@ -0,0 +1,252 @@
+"""
+Per-listing view counters.
+
+A room_detail view adds 1 to a counter in the cache and nothing touches
+the Room row. Every VIEW_COUNT_FLUSH_INTERVAL seconds one view (one per
+interval across all workers, whoever wins a cache.add) flushes: the
+buffered counts are added to Room.view_count with one
+UPDATE ... SET view_count = view_count + n per distinct n (most rooms have
+the same small count, so a flush is a few queries whatever the traffic).
+The UPDATE leaves updated_at alone, so views never invalidate cached
+cards or pages.
+
+Counters are grouped in generations (``rooms:views:<generation>:<id>``).
+A flush claims the counts by moving every worker on to a fresh generation
+with cache.incr, which hands each flusher a generation of its own, and
+then moves the generation before the one it retired: that one was retired
+a whole interval ago, so no view can still be adding to it and no two
+flushes ever read the same counts. The room ids seen in a generation are
+listed under numbered slots, so any worker can flush views it never saw.
+
+Counting in the cache needs add and incr to be atomic (locmem, redis,
+memcached). The database and file caches aren't, and every add and incr
+would be a write anyway, so with those (the db cache is the default on
+Render) each worker counts in its own Counter instead and flushes it
+every interval with the same grouped UPDATEs; a worker that exits
+cleanly flushes what it holds. With the locmem cache, counters live and
+die with the worker; views buffered in a worker that is killed are lost,
+which a view count can afford.
+
+VIEW_COUNT_FLUSH_MODE:
+    'thread' - flush in a background thread (default)
+    'sync'   - flush inline (tests, debugging)
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import F
+
+from .models import Room
+
+logger = logging.getLogger(__name__)
+
+# Room ids per UPDATE
+FLUSH_BATCH = 500
+
+# Backends whose add/incr are atomic across the workers sharing them
+ATOMIC_CACHE_BACKENDS = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.redis.RedisCache',
+    'django.core.cache.backends.memcached.PyMemcacheCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+}
+
+GENERATION_KEY = 'rooms:views:generation'
+FLUSH_GATE_KEY = 'rooms:views:flush-gate'
+
+_lock = threading.Lock()
+_pending = Counter()             # room id -> views, when the cache can't count
+_flushed_at = time.monotonic()
+
+
+def get_flush_interval():
+    return getattr(settings, 'VIEW_COUNT_FLUSH_INTERVAL', 60)
+
+
+def get_flush_mode():
+    return getattr(settings, 'VIEW_COUNT_FLUSH_MODE', 'thread')
+
+
+def counts_in_cache():
+    return settings.CACHES['default']['BACKEND'] in ATOMIC_CACHE_BACKENDS
+
+
+def view_key(generation, room_id):
+    return f'rooms:views:{generation}:{room_id}'
+
+
+def slot_count_key(generation):
+    return f'rooms:views:{generation}:slots'
+
+
+def slot_key(generation, slot):
+    return f'rooms:views:{generation}:slot:{slot}'
+
+
+def _incr(key):
+    """Atomically add 1 to key, creating it: the new value."""
+    # add() then incr(): incr() refuses a missing key. No timeout: a
+    # generation waits for the first view after a quiet spell to be retired,
+    # however long that is, and its flush deletes the keys
+    if cache.add(key, 1, None):
+        return 1
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr()
+        cache.add(key, 1, None)
+        return 1
+
+
+def current_generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        if cache.add(GENERATION_KEY, 1, None):
+            # First view ever: the first flush is an interval away
+            cache.set(FLUSH_GATE_KEY, 1, get_flush_interval())
+        generation = cache.get(GENERATION_KEY, 1)
+    return generation
+
+
+def record_view(room_id):
+    global _flushed_at
+    if counts_in_cache():
+        generation = current_generation()
+        if _incr(view_key(generation, room_id)) == 1:
+            # First view of this room in the generation: list it for the flush
+            slot = _incr(slot_count_key(generation))
+            cache.set(slot_key(generation, slot), room_id, None)
+        due = cache.add(FLUSH_GATE_KEY, 1, get_flush_interval())
+    else:
+        with _lock:
+            _pending[room_id] += 1
+            due = time.monotonic() - _flushed_at >= get_flush_interval()
+            if due:
+                _flushed_at = time.monotonic()
+
+    if due:
+        if get_flush_mode() == 'sync':
+            flush()
+        else:
+            threading.Thread(target=_flush_in_thread, name='view-count-flush', daemon=True).start()
+
+
+def claim_generation():
+    """Move every worker on to a fresh generation: the one to flush now."""
+    current_generation()
+    try:
+        retired = cache.incr(GENERATION_KEY) - 1
+    except ValueError:
+        return None
+    return retired - 1
+
+
+def add_counts(counts):
+    """counts: {room id: views}. One UPDATE per distinct count (and batch). Returns the views added."""
+    by_count = defaultdict(list)
+    for room_id, count in counts.items():
+        if count:
+            by_count[count].append(room_id)
+
+    for count, ids in by_count.items():
+        for start in range(0, len(ids), FLUSH_BATCH):
+            Room.objects.filter(pk__in=ids[start:start + FLUSH_BATCH]).update(
+                view_count=F('view_count') + count
+            )
+    return sum(count * len(ids) for count, ids in by_count.items())
+
+
+def flush_generation(generation):
+    """Move a retired generation's counts into Room.view_count. Returns the views moved."""
+    slots = cache.get(slot_count_key(generation)) or 0
+    slot_keys = [slot_key(generation, slot) for slot in range(1, slots + 1)]
+    room_ids = list(cache.get_many(slot_keys).values())
+    counts = cache.get_many([view_key(generation, room_id) for room_id in room_ids])
+    cache.delete_many([slot_count_key(generation), *slot_keys, *counts])
+    return add_counts({room_id: counts.get(view_key(generation, room_id)) for room_id in room_ids})
+
+
+def flush_pending():
+    """Move this worker's own counts into Room.view_count. Returns the views moved."""
+    with _lock:
+        counts = dict(_pending)
+        _pending.clear()
+    return add_counts(counts)
+
+
+def flush(settle=False):
+    """
+    Flush this worker's own counts and, when counting in the cache, the
+    generation retired by the previous flush. Returns the views moved.
+    settle=True also retires and flushes the live generation (tests,
+    commands), at the risk of missing a view still being recorded.
+    """
+    moved = flush_pending()
+    if not counts_in_cache():
+        return moved
+    generation = claim_generation()
+    if generation is None:
+        return moved
+    moved += flush_generation(generation)
+    if settle:
+        moved += flush_generation(generation + 1)
+    return moved
+
+
+def _flush_in_thread():
+    try:
+        flush()
+    except Exception:
+        logger.exception('Flushing view counts failed')
+    finally:
+        connections.close_all()
+
+
+def count_views(view):
+    """
+    Record a view of room `id` for every 200 GET, including responses
+    served from the anonymous page cache (apply outside cache_anonymous_page).
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, id, *args, **kwargs):
+            response = await view(request, id, *args, **kwargs)
+            if request.method == 'GET' and response.status_code == 200:
+                await sync_to_async(record_view)(id)
+            return response
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, id, *args, **kwargs):
+        response = view(request, id, *args, **kwargs)
+        if request.method == 'GET' and response.status_code == 200:
+            record_view(id)
+        return response
+    return wrapper
+
+
+def reset():
+    """Forget this worker's pending counts (tests)."""
+    global _flushed_at
+    with _lock:
+        _pending.clear()
+        _flushed_at = time.monotonic()
+
+
+@atexit.register
+def _flush_at_exit():
+    # A worker that exits cleanly hands its own counts over
+    if _pending:
+        try:
+            flush_pending()
+        except Exception:
+            logger.warning('Could not flush view counts at exit', exc_info=True)
@@ -1,46 +1,71 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import logout
 from django.contrib.auth.views import LoginView
-from django.db.models import Q
-from django.http import HttpResponse
-from django.core.files.storage import default_storage
+from django.http import Http404, HttpResponse
+from django.urls import reverse
+from django.utils.http import urlencode
 from django.conf import settings
+from django.db import transaction
 from django.contrib import messages
-from .models import Room, RoomImage
-from .forms import RoomForm, RegisterForm
+from django.db.models import Count
+from . import health, metrics, saved_searches
+from .models import Room, RoomImage, SavedSearch, default_expiry
+from .cache import aget_user, cache_anonymous_page
+from .facets import facet_summary
+from .forms import RoomForm, RegisterForm, RoomFilterForm, filter_listings
+from .pagination import apaginate_keyset, paginate_keyset, page_querystring
+from .uploads import delete_files_after_commit, delete_unreferenced_files, queue_gallery_images
+from .view_counts import count_views
+
+
+# Read views are async, for serving under ASGI (RENDER_DEPLOY.md section 4).
+# Under the default WSGI deployment (Procfile) each of them pays an
+# async_to_sync hop into an event loop and sync_to_async hops back for the
+# ORM and rendering. Rendering stays sync: context processors read the
+# session and user lazily and {% room_card %} may hit the DB cache, so
+# templates render in Django's sync thread.
+arender = sync_to_async(render)
 
 
 # 🏠 ROOM LIST + SEARCH
-def room_list(request):
-    rooms = Room.objects.all().order_by('-created_at')
-
+@cache_anonymous_page(query_params=('q', 'cursor', *RoomFilterForm.base_fields))
+async def room_list(request):
     search_query = request.GET.get('q')
-    property_type = request.GET.get('property')
-
-    if search_query and search_query.lower() != "none":
-        rooms = rooms.filter(
-            Q(title__icontains=search_query) |
-            Q(location__icontains=search_query) |
-            Q(property_type__icontains=search_query) |
-            Q(room_type__icontains=search_query)
-        )
+    # Picking the search backend may introspect the DB once
+    rooms, ordering, filter_form = await sync_to_async(filter_listings)(Room.objects.active(), request.GET)
 
-    if property_type:
-        rooms = rooms.filter(property_type__iexact=property_type)
+    rooms, next_cursor = await apaginate_keyset(rooms, request.GET.get('cursor'), ordering=ordering)
 
     context = {
         'rooms': rooms,
-        'selected_property': property_type,
+        'next_cursor': next_cursor,
+        'next_query': page_querystring(request, next_cursor),
+        'first_query': page_querystring(request, None),
+        'is_first_page': not request.GET.get('cursor'),
+        'filter_form': filter_form,
+        # Looking up a missing distance_km costs a dir(room) per card
+        'near_search': filter_form.get_near() is not None,
+        'facets': await sync_to_async(facet_summary)(filter_form.get_lookups()),
+        'selected_property': filter_form.get_lookups().get('property_type'),
         'search_query': search_query if search_query != "None" else "",
     }
-    return render(request, 'rooms/room_list.html', context)
+    return await arender(request, 'rooms/room_list.html', context)
 
 
-# 🔍 ROOM DETAIL
-def room_detail(request, id):
-    room = get_object_or_404(Room, id=id)
-    return render(request, 'rooms/room_detail.html', {'room': room})
+# 🔍 ROOM DETAIL (views are counted even when the page comes from the cache)
+@count_views
+@cache_anonymous_page()
+async def room_detail(request, id):
+    try:
+        room = await Room.objects.select_related('owner').prefetch_related('images').aget(id=id)
+    except Room.DoesNotExist:
+        raise Http404('No room with that id')
+    # Archived and expired listings stay visible to their owner only
+    if not room.is_listed and (await aget_user(request)).id != room.owner_id:
+        raise Http404('No room with that id')
+    return await arender(request, 'rooms/room_detail.html', {'room': room})
 
 
 # ➕ ADD ROOM
@@ -56,9 +81,8 @@ def add_room(request):
                 room.owner = request.user
                 room.save()
 
-                # Save gallery images
-                for img in images:
-                    RoomImage.objects.create(room=room, image=img)
+                # Gallery images upload in the background (rooms/uploads.py)
+                queue_gallery_images(room, images)
 
                 return redirect('room_list')
             except Exception as e:
@@ -84,24 +108,37 @@ def edit_room(request, id):
     room = get_object_or_404(Room, id=id, owner=request.user)
 
     if request.method == 'POST':
+        old_cover = room.image.name if room.image else None
         form = RoomForm(request.POST, request.FILES, instance=room)
         images = request.FILES.getlist('gallery_images')
 
         if form.is_valid():
             try:
-                form.save()
-
-                # Add new images
-                for img in images:
-                    RoomImage.objects.create(room=room, image=img)
-
-                # Delete checked images
-                delete_ids = request.POST.getlist('delete_images')
-                if delete_ids:
-                    RoomImage.objects.filter(id__in=delete_ids, room=room).delete()
+                # All or nothing: room fields, new images and deletions
+                with transaction.atomic():
+                    form.save()
+
+                    # Add new images (one bulk insert, uploaded in the background)
+                    queue_gallery_images(room, images)
+
+                    # Delete checked images in one query
+                    delete_ids = [i for i in request.POST.getlist('delete_images') if i.isdigit()]
+                    removed = []
+                    if delete_ids:
+                        doomed = RoomImage.objects.filter(id__in=delete_ids, room=room)
+                        removed = list(doomed.values_list('image', flat=True))
+                        doomed.delete()
+
+                    # Storage objects go only once the DB no longer points at them
+                    if room.image.name != old_cover:
+                        removed.append(old_cover)
+                    delete_files_after_commit(removed)
 
                 return redirect('room_detail', id=room.id)
             except Exception as e:
+                # Rolled back: a cover that was already uploaded is now orphaned
+                if room.image and room.image.name != old_cover:
+                    delete_unreferenced_files([room.image.name])
                 messages.error(
                     request,
                     f"Image upload failed. Check Render logs. Error: {str(e)[:200]}"
@@ -124,12 +161,29 @@ def delete_room(request, id):
     room = get_object_or_404(Room, id=id, owner=request.user)
 
     if request.method == 'POST':
-        room.delete()
+        with transaction.atomic():
+            files = [room.image.name] + list(room.images.values_list('image', flat=True))
+            room.delete()
+            delete_files_after_commit(files)
         return redirect('room_list')
 
     return render(request, 'rooms/room_confirm_delete.html', {'room': room})
 
 
+# 🔄 RENEW ROOM (relist an expired or archived listing)
+@login_required
+def renew_room(request, id):
+    room = get_object_or_404(Room, id=id, owner=request.user)
+
+    if request.method == 'POST':
+        room.is_active = True
+        room.expires_at = default_expiry()
+        room.save()
+        messages.success(request, f"\"{room.title}\" is listed again.")
+
+    return redirect('dashboard')
+
+
 # 👤 REGISTER
 def register(request):
     if request.method == 'POST':
@@ -159,26 +213,77 @@ def logout_confirm(request):
 # 📊 USER DASHBOARD
 @login_required
 def dashboard(request):
-    my_properties = Room.objects.filter(owner=request.user).order_by('-created_at')
+    my_rooms = Room.objects.filter(owner=request.user)
+    my_properties, next_cursor = paginate_keyset(my_rooms, request.GET.get('cursor'))
 
     context = {
-        'my_properties': my_properties
+        'my_properties': my_properties,
+        'next_cursor': next_cursor,
+        'next_query': page_querystring(request, next_cursor),
+        'first_query': page_querystring(request, None),
+        'is_first_page': not request.GET.get('cursor'),
+        # Totals over every listing, not just this page, in one aggregate query
+        'stats': my_rooms.stats(),
+        # New-match counts for every saved search in one grouped query
+        'saved_searches': request.user.saved_searches.annotate(new_count=Count('matches')),
     }
     return render(request, 'rooms/dashboard.html', context)
 
 
-def test_storage(request):
-    return HttpResponse(str(default_storage))
+# 🔔 SAVED SEARCHES (matched against new rooms, see rooms/saved_searches.py)
+def saved_search_url(query, property_type):
+    params = {key: value for key, value in (('q', query), ('property', property_type)) if value}
+    return reverse('room_list') + (f'?{urlencode(params)}' if params else '')
 
 
-# Debug: check if Cloudinary is active on Render (visit /storage-check/ on live site)
-def storage_check(request):
-    use_clou = getattr(settings, 'USE_CLOUDINARY', False)
-    storage_cls = default_storage.__class__.__name__
-    cloud_name = getattr(settings, 'CLOUDINARY_CLOUD_NAME', '') or '(not set)'
-    text = (
-        f"USE_CLOUDINARY: {use_clou}\n"
-        f"DEFAULT_FILE_STORAGE class: {storage_cls}\n"
-        f"CLOUDINARY_CLOUD_NAME: {cloud_name}\n"
-    )
-    return HttpResponse(text, content_type='text/plain')
\ No newline at end of file
+@login_required
+def save_search(request):
+    if request.method != 'POST':
+        return redirect('room_list')
+    # The property filter parses the same way it does on room_list
+    property_type = RoomFilterForm(request.POST).get_lookups().get('property_type', '')
+    search, created = saved_searches.save_search(request.user, request.POST.get('q'), property_type)
+    if created:
+        messages.success(request, "Search saved. New matches will show up on your dashboard.")
+    else:
+        messages.info(request, "You already saved this search.")
+    return redirect(saved_search_url(search.query, search.property_type))
+
+
+@login_required
+def open_saved_search(request, id):
+    search = get_object_or_404(SavedSearch, id=id, user=request.user)
+    saved_searches.mark_seen(search)
+    return redirect(saved_search_url(search.query, search.property_type))
+
+
+@login_required
+def delete_saved_search(request, id):
+    search = get_object_or_404(SavedSearch, id=id, user=request.user)
+    if request.method == 'POST':
+        search.delete()
+    return redirect('dashboard')
+
+
+# 🩺 HEALTH + METRICS (probes run in the background, see rooms/health.py)
+def healthz(request):
+    results, checked_at = health.get_results()
+    healthy = all(result['ok'] for result in results.values())
+    lines = ['ok' if healthy else 'unhealthy']
+    for name, result in results.items():
+        lines.append(
+            f"{name} {'ok' if result['ok'] else 'FAIL'} {result['seconds'] * 1000:.1f}ms {result['detail']}"
+        )
+    response = HttpResponse('\n'.join(lines) + '\n', content_type='text/plain', status=200 if healthy else 503)
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+def prometheus_metrics(request):
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponse('Forbidden\n', content_type='text/plain', status=403)
+    body = metrics.render(health.probe_gauges(*health.get_results()))
+    response = HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
+    response['Cache-Control'] = 'no-store'
+    return response